@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import json
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -20,7 +22,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "" # INSERT SECRET KEY HERE
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "") # INSERT SECRET KEY HERE
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -123,3 +125,45 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Routing worker pool used by the async route endpoint
+# https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+
+ROUTING_POOL_SIZE = int(os.environ.get("DJANGO_ROUTING_POOL_SIZE", os.cpu_count() or 1))
+
+# searches allowed to wait for a worker before requests are refused with 503
+ROUTING_QUEUE_DEPTH = int(os.environ.get("DJANGO_ROUTING_QUEUE_DEPTH", 32))
+
+# seconds clients are asked to wait after a 503
+ROUTING_RETRY_AFTER = 1
+
+# matrix requests with at least this many sources are split across the ROUTING_POOL_SIZE worker processes of their region
+ROUTING_MATRIX_POOL_MIN_SOURCES = 64
+
+# largest number of source-destination pairs accepted by the matrix endpoint
+ROUTING_MATRIX_MAX_SIZE = 250000
+
+# regions served by the API, a JSON list of {"name": ..., "bounds": [[x, y], [x, y]], "routes": <serialized routes>, "cache": <optional warm-up file>} objects, see saferouting.regions. Without regions, the routes object of DJANGO_SERIALIZED_ROUTES_FILEPATH serves every query
+ROUTING_REGIONS = json.loads(os.environ.get("DJANGO_ROUTING_REGIONS", "[]"))
+
+# largest estimated memory of the regions loaded at once by every process, including the worker processes of their routing pools, least recently used regions are evicted beyond it
+ROUTING_REGION_MEMORY_BUDGET = (
+    int(os.environ["DJANGO_ROUTING_REGION_MEMORY_MB"]) * 2**20
+    if "DJANGO_ROUTING_REGION_MEMORY_MB" in os.environ
+    else None
+)
+
+# comma separated names of regions loaded at startup instead of on first query
+ROUTING_REGION_PREWARM = [
+    _ for _ in os.environ.get("DJANGO_ROUTING_REGION_PREWARM", "").split(",") if _
+]
+
+# routes precomputed by python -m saferouting.warmup, loaded into the route cache of every process at startup
+ROUTING_CACHE_FILEPATH = os.environ.get("DJANGO_ROUTES_CACHE_FILEPATH")
+
+# largest k accepted by the alternatives endpoint, and the time budget in milliseconds its searches get
+ROUTING_MAX_ALTERNATIVES = 5
+ROUTING_ALTERNATIVES_TIME_BUDGET = 2000
+
+# bearer token required by the live update endpoint, updates are refused while unset
+ROUTING_UPDATE_TOKEN = os.environ.get("DJANGO_ROUTING_UPDATE_TOKEN")
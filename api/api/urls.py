@@ -16,10 +16,24 @@ Including another URLconf
 """
 from django.urls import include, path
 from tastypie.api import Api
-from routing.api import RouteResource
+from routing.api import (
+    AlternativesResource,
+    MatrixResource,
+    ReachableResource,
+    RouteResource,
+)
+from routing import views
 
 api = Api(api_name="routing")
 route_resource = RouteResource()
 api.register(route_resource)
+api.register(AlternativesResource())
+api.register(MatrixResource())
+api.register(ReachableResource())
 
-urlpatterns = [path("api/", include(api.urls))]
+urlpatterns = [
+    path("api/routing/async/route/", views.route),
+    path("api/routing/update/", views.update),
+    path("metrics", views.metrics_view),
+    path("api/", include(api.urls)),
+]
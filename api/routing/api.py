@@ -1,9 +1,164 @@
+import json
+import math
 import os
+import threading
 
+from django.conf import settings
 from django.http import HttpResponse
 from tastypie.resources import Resource
 
-from saferouting import Routes
+from saferouting.regions import RegionRegistry, footprint
+from saferouting.route import CONTENT_TYPES
+
+from .pool import RoutePool, Saturated
+
+# name of the region serving every query when ROUTING_REGIONS is empty
+DEFAULT_REGION = "default"
+
+_registry = None
+
+
+def get_registry() -> RegionRegistry:
+    """Returns the region registry shared by all resources, built on first use from ROUTING_REGIONS. Without regions, the routes object of DJANGO_SERIALIZED_ROUTES_FILEPATH and the precomputed routes of ROUTING_CACHE_FILEPATH serve every query as DEFAULT_REGION, loaded right away. Regions in ROUTING_REGION_PREWARM are loaded right away too."""
+    global _registry
+    if _registry is None:
+        registry = RegionRegistry(settings.ROUTING_REGION_MEMORY_BUDGET)
+        for region in settings.ROUTING_REGIONS:
+            registry.add(
+                region["name"],
+                region.get("bounds"),
+                region["routes"],
+                region.get("cache"),
+            )
+        prewarm = settings.ROUTING_REGION_PREWARM
+        if len(registry) == 0:
+            registry.add(
+                DEFAULT_REGION,
+                None,
+                os.environ.get("DJANGO_SERIALIZED_ROUTES_FILEPATH"),
+                settings.ROUTING_CACHE_FILEPATH,
+            )
+            prewarm = [DEFAULT_REGION]
+        registry.prewarm(prewarm)
+        _registry = registry
+    return _registry
+
+
+_pools: dict[str, RoutePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str) -> RoutePool:
+    """Returns the routing pool of a region given its name, starting it on first use and again after the region was evicted. Its workers load the routes object and precomputed routes of the region and replay the live updates it got so far, and it snaps queries with the routes object of the registry.
+
+    The region is marked as used. Its pool is attached to it in the registry, so the workers count against ROUTING_REGION_MEMORY_BUDGET and are shut down when the region is evicted.
+    """
+    registry = get_registry()
+    routes = registry.get(name)
+    region = registry.regions[name]
+    with _pools_lock:
+        pool = _pools.get(name)
+        started = pool is None or pool.closed
+        if started:
+            pool = _pools[name] = RoutePool(
+                region.serialized_filepath,
+                settings.ROUTING_POOL_SIZE,
+                settings.ROUTING_QUEUE_DEPTH,
+                region.cache_filepath,
+                region.updates.replay() if region.updates else None,
+                routes,
+            )
+    # outside _pools_lock, evicting a region releases its pool under the registry lock
+    if started:
+        registry.attach(
+            name,
+            settings.ROUTING_POOL_SIZE * footprint(region.serialized_filepath),
+            pool.shutdown,
+        )
+    return pool
+
+
+def update_pool(name: str, **update):
+    """Applies live cost updates to the routing pool of a region if it is started, see RoutePool.update."""
+    with _pools_lock:
+        pool = _pools.get(name)
+    if pool is not None:
+        pool.update(**update)
+
+
+def retry_later() -> HttpResponse:
+    """Returns the response to queries the routing pool can't take right now."""
+    response = HttpResponse("routing queue is full, retry later", status=503)
+    response["Retry-After"] = str(settings.ROUTING_RETRY_AFTER)
+    return response
+
+
+def not_in_region() -> HttpResponse:
+    """Returns the response to queries no region contains."""
+    return HttpResponse("query is not within any region", status="400")
+
+
+def numbers(request, names: list[str]) -> list[float]:
+    """Returns query parameters given their names as floats, raises ValueError unless all are finite numbers."""
+    values = []
+    for _ in names:
+        try:
+            value = float(request.GET[_])
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValueError("%s must be a finite number" % _)
+        values.append(value)
+    return values
+
+
+def points(value, name: str) -> list[tuple[float, float]]:
+    """Returns (x, y) points given a decoded JSON value, raises ValueError unless it is a list of [x, y] pairs of finite numbers."""
+    if not isinstance(value, list):
+        raise ValueError("%s must be a list of [x, y] points" % name)
+    for point in value:
+        if not (
+            isinstance(point, list)
+            and len(point) == 2
+            and all(
+                isinstance(_, (int, float))
+                and not isinstance(_, bool)
+                and math.isfinite(_)
+                for _ in point
+            )
+        ):
+            raise ValueError(
+                "%s must be a list of [x, y] points of finite numbers" % name
+            )
+    return [tuple(point) for point in value]
+
+
+def encoding_options(request) -> dict:
+    """Returns keyword arguments of Route.encode negotiated from a request, raises ValueError on invalid parameters.
+
+    The encoding is taken from the encoding parameter, else from the Accept header (application/geo+json or application/octet-stream), else JSON. nodes=0 leaves out node ids, tolerance=<meters> simplifies the path.
+    """
+    encoding = request.GET.get("encoding")
+    if encoding is None:
+        accept = request.headers.get("Accept", "")
+        encoding = "json"
+        for _ in ["geojson", "binary"]:
+            if CONTENT_TYPES[_] in accept:
+                encoding = _
+                break
+    if encoding not in CONTENT_TYPES:
+        raise ValueError("encoding must be one of %s" % ", ".join(CONTENT_TYPES.keys()))
+
+    tolerance = request.GET.get("tolerance")
+    tolerance = None if tolerance is None else float(tolerance)
+    if tolerance is not None and not tolerance >= 0:
+        raise ValueError("tolerance must be a non-negative number of meters")
+
+    return {
+        "encoding": encoding,
+        "nodes": request.GET.get("nodes", "1") not in ["0", "false"],
+        "tolerance": tolerance,
+    }
 
 
 class RouteResource(Resource):
@@ -13,9 +168,7 @@ class RouteResource(Resource):
 
     def __init__(self):
         super().__init__()
-        self.routes = Routes(
-            serialized_filepath=os.environ.get("DJANGO_SERIALIZED_ROUTES_FILEPATH")
-        )
+        self.registry = get_registry()
 
     def get_list(self, request, **kwargs):
         _c = ["x0", "y0", "x1", "y1"]
@@ -32,9 +185,177 @@ class RouteResource(Resource):
         if len(m) > 0:
             return HttpResponse("missing parameters %s" % ", ".join(m), status="400")
 
-        source = (float(c[0]), float(c[1]))
-        target = (float(c[2]), float(c[3]))
+        try:
+            c = numbers(request, _c)
+            options = encoding_options(request)
+        except ValueError as e:
+            return HttpResponse(str(e), status="400")
+
+        source = (c[0], c[1])
+        target = (c[2], c[3])
+        routes = self.registry.routes_for(source, target)
+        if routes is None:
+            return not_in_region()
+
+        return HttpResponse(
+            routes.get_path(source, target).encode(**options),
+            content_type=CONTENT_TYPES[options["encoding"]],
+        )
+
+
+class AlternativesResource(Resource):
+    class Meta:
+        resource_name = "alternatives"
+        allowed_methods = ["get"]
+
+    def __init__(self):
+        super().__init__()
+        self.registry = get_registry()
+
+    def get_list(self, request, **kwargs):
+        """Expects the parameters of RouteResource, and optionally k, max_similarity, max_stretch and time_budget (milliseconds), see Routes.get_alternatives. Responds with a JSON list of routes, or a GeoJSON FeatureCollection for encoding=geojson. The binary encoding is not supported."""
+        m = [_ for _ in ["x0", "y0", "x1", "y1"] if request.GET.get(_) is None]
+        if len(m) > 0:
+            return HttpResponse("missing parameters %s" % ", ".join(m), status="400")
+
+        try:
+            c = numbers(request, ["x0", "y0", "x1", "y1"])
+            options = encoding_options(request)
+            if options["encoding"] == "binary":
+                raise ValueError("binary encoding is not supported for alternatives")
+            k = int(request.GET.get("k", 3))
+            if not 1 <= k <= settings.ROUTING_MAX_ALTERNATIVES:
+                raise ValueError(
+                    "k must be between 1 and %d" % settings.ROUTING_MAX_ALTERNATIVES
+                )
+            time_budget = min(
+                float(request.GET.get("time_budget", "inf")),
+                settings.ROUTING_ALTERNATIVES_TIME_BUDGET,
+            )
+            if not time_budget >= 0:
+                raise ValueError("time_budget must be a non-negative number of ms")
+            limits = {
+                _: numbers(request, [_])[0]
+                for _ in ["max_similarity", "max_stretch"]
+                if _ in request.GET
+            }
+            if not 0 <= limits.get("max_similarity", 0) <= 1:
+                raise ValueError("max_similarity must be between 0 and 1")
+            if not limits.get("max_stretch", 1) >= 1:
+                raise ValueError("max_stretch must be a number of at least 1")
+        except ValueError as e:
+            return HttpResponse(str(e), status="400")
+
+        source, target = (c[0], c[1]), (c[2], c[3])
+        routes = self.registry.routes_for(source, target)
+        if routes is None:
+            return not_in_region()
+
+        routes = routes.get_alternatives(
+            source,
+            target,
+            k=k,
+            time_budget=time_budget,
+            **limits,
+        )
+        body = "[" + ",".join(route.encode(**options) for route in routes) + "]"
+        if options["encoding"] == "geojson":
+            body = '{"type":"FeatureCollection","features":' + body + "}"
+        return HttpResponse(body, content_type=CONTENT_TYPES[options["encoding"]])
+
+
+class MatrixResource(Resource):
+    class Meta:
+        resource_name = "matrix"
+        allowed_methods = ["post"]
+
+    def __init__(self):
+        super().__init__()
+        self.registry = get_registry()
+
+    def post_list(self, request, **kwargs):
+        """Expects a JSON body {"sources": [[x, y], ...], "destinations": [[x, y], ...], "paths": false}, see Routes.get_matrix."""
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return HttpResponse("body is not valid JSON", status="400")
+
+        if not isinstance(body, dict):
+            return HttpResponse("body must be a JSON object", status="400")
+        m = [_ for _ in ["sources", "destinations"] if not body.get(_)]
+        if len(m) > 0:
+            return HttpResponse("missing parameters %s" % ", ".join(m), status="400")
+
+        try:
+            sources = points(body["sources"], "sources")
+            destinations = points(body["destinations"], "destinations")
+        except ValueError as e:
+            return HttpResponse(str(e), status="400")
+        if len(sources) * len(destinations) > settings.ROUTING_MATRIX_MAX_SIZE:
+            return HttpResponse(
+                "matrix is larger than %d entries" % settings.ROUTING_MATRIX_MAX_SIZE,
+                status="400",
+            )
+
+        name = self.registry.region_of(*sources, *destinations)
+        if name is None:
+            return not_in_region()
+        # large matrices are split across the persistent worker processes of the region
+        if len(sources) >= settings.ROUTING_MATRIX_POOL_MIN_SOURCES:
+            try:
+                matrix = get_pool(name).get_matrix(
+                    sources, destinations, paths=bool(body.get("paths"))
+                )
+            except Saturated:
+                return retry_later()
+        else:
+            matrix = self.registry.get(name).get_matrix(
+                sources, destinations, paths=bool(body.get("paths"))
+            )
+
+        # unreachable pairs are null, JSON has no infinity
+        costs = matrix["costs"]
+        matrix["costs"] = [
+            [c if c != float("inf") else None for c in row] for row in costs.tolist()
+        ]
+
+        response = HttpResponse(content_type="application/json")
+        response.write(json.dumps(matrix))
+        return response
+
+
+class ReachableResource(Resource):
+    class Meta:
+        resource_name = "reachable"
+        allowed_methods = ["get"]
+
+    def __init__(self):
+        super().__init__()
+        self.registry = get_registry()
+
+    def get_list(self, request, **kwargs):
+        """Expects parameters x, y and budget, and optionally boundary=1, see Routes.get_reachable."""
+        m = [_ for _ in ["x", "y", "budget"] if request.GET.get(_) is None]
+        if len(m) > 0:
+            return HttpResponse("missing parameters %s" % ", ".join(m), status="400")
+
+        try:
+            x, y, budget = numbers(request, ["x", "y", "budget"])
+            if not budget >= 0:
+                raise ValueError("budget must be a non-negative number")
+        except ValueError as e:
+            return HttpResponse(str(e), status="400")
+
+        origin = (x, y)
+        routes = self.registry.routes_for(origin)
+        if routes is None:
+            return not_in_region()
+        reachable = routes.get_reachable(
+            origin,
+            budget,
+            boundary=request.GET.get("boundary") in ("1", "true"),
+        )
 
-        response = HttpResponse()
-        response.write(self.routes.get_path(source, target, verbose=True).json())
+        response = HttpResponse(content_type="application/json")
+        response.write(json.dumps(reachable))
         return response
@@ -0,0 +1,190 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import threading
+
+import numpy as np
+
+from saferouting import Routes, metrics
+from saferouting.regions import UpdateLog
+
+# routes object of a worker process, loaded once by the pool initializer
+_routes: Routes = None
+
+
+def _load(serialized_filepath: str, cache_filepath: str = None, update: dict = None):
+    global _routes
+    _routes = Routes(serialized_filepath=serialized_filepath)
+    if cache_filepath:
+        _routes.load_cache(cache_filepath)
+    if update:
+        _routes.update(**update)
+
+
+def _get_path(
+    source: tuple[float, float], destination: tuple[float, float], **options
+) -> tuple[str | bytes, dict]:
+    route = _routes.get_path(source, destination)
+    return route.encode(**options), route.misc
+
+
+def _matrix_rows(
+    source_ids: np.ndarray, destination_ids: np.ndarray, paths: bool
+) -> tuple[np.ndarray, list]:
+    with _routes.lock.read():
+        return _routes._matrix_rows(source_ids, destination_ids, paths)
+
+
+class Saturated(Exception):
+    """Raised when every worker is busy and the queue is full, or the pool is shut down."""
+
+
+class RoutePool:
+    """Runs route searches in worker processes, each holding its own routes object.
+
+    Concurrent requests that snap to the same endpoints share one search, and new searches are refused once pool_size + queue_depth of them are in flight, so a burst of slow queries can't pile up unbounded.
+
+    Workers load the precomputed routes of cache_filepath into their caches on start, if given. Live cost updates are kept merged in updates and replayed by every worker on start, see update.
+    """
+
+    def __init__(
+        self,
+        serialized_filepath: str,
+        pool_size: int,
+        queue_depth: int,
+        cache_filepath: str = None,
+        updates: dict = None,
+        routes: Routes = None,
+    ):
+        """Initializes pool and starts its workers.
+
+        :param1 serialized_filepath: Routes object the workers load, as written by Routes.save.
+        :param2 pool_size: Number of worker processes.
+        :param3 queue_depth: Number of searches waiting for a worker before new ones are refused.
+        :param4 cache_filepath: Precomputed routes the workers load, see saferouting.warmup (optional).
+        :param5 updates: Live cost updates applied to the routes object so far, as returned by UpdateLog.replay (optional).
+        :param6 routes: Routes object of serialized_filepath already loaded in this process, used for snapping instead of loading another one (optional).
+        """
+        # only used for snapping, searches run in the workers
+        self.routes = routes or Routes(serialized_filepath=serialized_filepath)
+        self.serialized_filepath = serialized_filepath
+        self.cache_filepath = cache_filepath
+        self.pool_size = pool_size
+        self.capacity = pool_size + queue_depth
+        self.updates = UpdateLog()
+        if updates:
+            self.updates.add(**updates)
+        self.version = 0
+        self.executor = self._start()
+        self.in_flight: dict[tuple, Future] = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __len__(self):
+        return len(self.in_flight)
+
+    def submit(
+        self, source: tuple[float, float], destination: tuple[float, float], **options
+    ) -> Future:
+        """Returns future of (encoded route, Route.misc) between two coordinates, shared with any in-flight search between the same snapped nodes and encoding options. Raises Saturated if the pool is full.
+
+        :param3 options: Keyword arguments of Route.encode (optional).
+        """
+        key = (
+            self.routes.graph.closest_index(*source, self.routes.component),
+            self.routes.graph.closest_index(*destination, self.routes.component),
+            self.routes.check_bounds(*source)
+            and self.routes.check_bounds(*destination),
+            *sorted(options.items()),
+            self.version,
+        )
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            if self.closed or len(self.in_flight) >= self.capacity:
+                raise Saturated()
+            future = self.executor.submit(_get_path, source, destination, **options)
+            self.in_flight[key] = future
+
+        future.add_done_callback(lambda future: self._done(key, future))
+        return future
+
+    def get_matrix(
+        self,
+        sources: list[tuple[float, float]],
+        destinations: list[tuple[float, float]],
+        paths=False,
+    ) -> dict:
+        """Like Routes.get_matrix, with sources split across the workers. Runs alongside submitted searches without counting against capacity, so callers should only send matrices worth the round trip. Raises Saturated if the pool is shut down."""
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        graph, component = self.routes.graph, self.routes.component
+        source_ids = graph.closest_indices(sources[:, 0], sources[:, 1], component)
+        destination_ids = graph.closest_indices(
+            destinations[:, 0], destinations[:, 1], component
+        )
+
+        chunks = np.array_split(source_ids, min(self.pool_size, len(source_ids)))
+        # submitted under the lock, so an update can't shut the executor down in between
+        with self.lock:
+            if self.closed:
+                raise Saturated()
+            futures = [
+                self.executor.submit(_matrix_rows, chunk, destination_ids, paths)
+                for chunk in chunks
+            ]
+        rows = [future.result() for future in futures]
+
+        r = {
+            "costs": np.concatenate([c for c, _ in rows]),
+            "sources": graph.ids[source_ids].tolist(),
+            "destinations": graph.ids[destination_ids].tolist(),
+        }
+        if paths:
+            r["paths"] = [p for _, chunk in rows for p in chunk]
+        return r
+
+    def update(
+        self,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ):
+        """Applies live cost updates to the workers, see Routes.update for the parameters.
+
+        Worker processes can't be reached one by one, so the pool moves to fresh workers that load the routes object and replay all updates so far. Searches already submitted finish on the old workers with the old costs, and are no longer shared with new requests. Raises KeyError on unknown nodes and edges without keeping the update, so workers never fail to replay it.
+        """
+        self.routes.check_update(multipliers, blocked, unblocked)
+        with self.lock:
+            if self.closed:
+                return
+            self.updates.add(multipliers, blocked, unblocked)
+            self.version += 1
+            old = self.executor
+            self.executor = self._start()
+        old.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stops the workers once the searches already submitted finish, later searches raise Saturated."""
+        with self.lock:
+            self.closed = True
+            executor = self.executor
+        executor.shutdown(wait=False)
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self.pool_size,
+            initializer=_load,
+            initargs=(
+                self.serialized_filepath,
+                self.cache_filepath,
+                self.updates.replay() if self.updates else None,
+            ),
+        )
+
+    def _done(self, key: tuple, future: Future):
+        with self.lock:
+            del self.in_flight[key]
+
+        # workers record into their own registry, so searches are recorded again here
+        if future.exception() is None:
+            metrics.observe(future.result()[1])
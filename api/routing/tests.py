@@ -1,3 +1,254 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from saferouting import Routes
+from saferouting.regions import RegionRegistry
+from saferouting.tests.graphs import grid_graph
+
+from . import api
+
+
+def grid_registry() -> tuple[RegionRegistry, list[list[float]]]:
+    """Returns registry serving a small grid as region "grid" bounded by its nodes, and coordinates of the nodes."""
+    graph = grid_graph(6)
+    filepath = os.path.join(tempfile.mkdtemp(), "routes")
+    Routes(graph=graph).save(filepath, arrays=True)
+    (x0, y0), (x1, y1) = graph.coords.min(axis=0), graph.coords.max(axis=0)
+    registry = RegionRegistry()
+    registry.add("grid", ((x0, y1), (x1, y0)), filepath)
+    return registry, graph.coords.tolist()
+
+
+# resources take the registry when the URL configuration is imported by the system checks, which run after test modules are imported
+api._registry, COORDS = grid_registry()
+
+
+class ApiTestCase(SimpleTestCase):
+    def query(self, path: str, **params):
+        return self.client.get("/api/routing/%s/" % path, params)
+
+    def points(self, *indices: int) -> dict:
+        """Returns x0, y0, x1, y1, ... parameters of grid nodes."""
+        params = {}
+        for k, i in enumerate(indices):
+            params["x%d" % k], params["y%d" % k] = COORDS[i]
+        return params
+
+
+class RouteTest(ApiTestCase):
+    def test_route(self):
+        response = self.query("route", **self.points(0, 35))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("path", json.loads(response.content))
+
+    def test_missing_parameters(self):
+        response = self.query("route", x0=0, y0=0)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"x1, y1", response.content)
+
+    def test_invalid_coordinates(self):
+        for value in ["abc", "nan", "inf"]:
+            response = self.query("route", **(self.points(0, 35) | {"y1": value}))
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_invalid_encoding(self):
+        response = self.query("route", encoding="xml", **self.points(0, 35))
+        self.assertEqual(response.status_code, 400)
+        response = self.query("route", tolerance="-1", **self.points(0, 35))
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_in_region(self):
+        response = self.query("route", x0=0, y0=0, x1=1, y1=1)
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_not_in_region(self):
+        response = self.client.get(
+            "/api/routing/async/route/", {"x0": 0, "y0": 0, "x1": 1, "y1": 1}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("grid", api._pools)
+
+    def test_async_route(self):
+        response = self.client.get("/api/routing/async/route/", self.points(0, 35))
+        self.addCleanup(api._pools.pop("grid").shutdown)
+        self.assertEqual(response.status_code, 200)
+        expected = api.get_registry().get("grid").get_path(COORDS[0], COORDS[35])
+        self.assertEqual(json.loads(response.content)["cost"], expected.cost)
+
+    def test_pool_evicted_with_region(self):
+        registry = api.get_registry()
+        pool = api.get_pool("grid")
+        self.assertIs(pool.routes, registry.get("grid"))
+        self.assertGreater(registry.regions["grid"].size, pool.pool_size)
+        registry.evict("grid")
+        self.assertTrue(pool.closed)
+        response = self.client.get("/api/routing/async/route/", self.points(0, 35))
+        self.addCleanup(lambda: api._pools.pop("grid").shutdown())
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNot(api._pools["grid"], pool)
+
+    def test_async_invalid_coordinates(self):
+        response = self.client.get("/api/routing/async/route/", {"x0": 0})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            "/api/routing/async/route/", self.points(0, 35) | {"x0": "abc"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AlternativesTest(ApiTestCase):
+    def test_alternatives(self):
+        response = self.query("alternatives", k=2, **self.points(0, 35))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(json.loads(response.content)), 2)
+        response = self.query(
+            "alternatives", max_similarity=0, max_stretch=1, **self.points(0, 35)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_parameters(self):
+        for params in [
+            {"k": 0},
+            {"k": "a"},
+            {"encoding": "binary"},
+            {"x0": "abc"},
+            {"time_budget": "abc"},
+            {"max_similarity": "nan"},
+            {"max_similarity": "-0.1"},
+            {"max_similarity": "1.5"},
+            {"max_stretch": "inf"},
+            {"max_stretch": "0.5"},
+            {"max_stretch": "abc"},
+        ]:
+            response = self.query("alternatives", **(self.points(0, 35) | params))
+            self.assertEqual(response.status_code, 400, params)
+
+
+class MatrixTest(ApiTestCase):
+    def post(self, body):
+        return self.client.post(
+            "/api/routing/matrix/",
+            body if isinstance(body, str) else json.dumps(body),
+            content_type="application/json",
+        )
+
+    def test_matrix(self):
+        response = self.post({"sources": [COORDS[0]], "destinations": [COORDS[35]]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["costs"]), 1)
+
+    def test_invalid_body(self):
+        self.assertEqual(self.post("{").status_code, 400)
+        self.assertEqual(self.post("[]").status_code, 400)
+        self.assertEqual(self.post({"sources": [COORDS[0]]}).status_code, 400)
+
+    def test_invalid_points(self):
+        for points in [
+            COORDS[0],
+            "abc",
+            [[1.0]],
+            [[1.0, 2.0, 3.0]],
+            [["1", "2"]],
+            [[True, 1.0]],
+            [None],
+            {"x": 1},
+        ]:
+            response = self.post({"sources": points, "destinations": [COORDS[35]]})
+            self.assertEqual(response.status_code, 400, points)
+        response = self.post('{"sources": [[NaN, 1]], "destinations": [[1, 1]]}')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ROUTING_MATRIX_POOL_MIN_SOURCES=2, ROUTING_POOL_SIZE=2)
+    def test_pool(self):
+        body = {
+            "sources": [COORDS[0], COORDS[7], COORDS[20]],
+            "destinations": [COORDS[35], COORDS[3]],
+            "paths": True,
+        }
+        response = self.post(body)
+        self.addCleanup(api._pools.pop("grid").shutdown)
+        self.assertEqual(response.status_code, 200)
+        matrix = (
+            api.get_registry()
+            .get("grid")
+            .get_matrix(body["sources"], body["destinations"], paths=True)
+        )
+        self.assertEqual(
+            json.loads(response.content)["costs"], matrix["costs"].tolist()
+        )
+        self.assertEqual(json.loads(response.content)["paths"], matrix["paths"])
+
+
+class ReachableTest(ApiTestCase):
+    def test_reachable(self):
+        x, y = COORDS[0]
+        response = self.query("reachable", x=x, y=y, budget=200)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("nodes", json.loads(response.content))
+
+    def test_missing_parameters(self):
+        response = self.query("reachable", x=0, y=0)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_parameters(self):
+        x, y = COORDS[0]
+        for params in [
+            {"x": "abc"},
+            {"y": "nan"},
+            {"budget": "abc"},
+            {"budget": "-1"},
+            {"budget": "inf"},
+            {"budget": "nan"},
+        ]:
+            response = self.query(
+                "reachable", **({"x": x, "y": y, "budget": 200} | params)
+            )
+            self.assertEqual(response.status_code, 400, params)
+
+
+class UpdateTest(ApiTestCase):
+    def test_not_allowed(self):
+        response = self.client.post(
+            "/api/routing/update/", "{}", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(ROUTING_UPDATE_TOKEN="token")
+    def test_unknown_ids(self):
+        registry = api.get_registry()
+        ids = registry.get("grid").graph.ids.tolist()
+        edges = registry.get("grid").graph.edges
+        u, v = ids[0], ids[int(edges.indices[edges.positions([0])[0]])]
+        # updates of an evicted region are checked too
+        registry.evict("grid")
+        for body in [
+            {"edges": [[u, 1, 2.0]]},
+            {"edges": [[u, v, 2.0]], "blocked": [1]},
+            {"unblocked": [1]},
+        ]:
+            response = self.update(body)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(registry.regions["grid"].updates)
+
+        pool = api.get_pool("grid")
+        self.addCleanup(lambda: api._pools.pop("grid").shutdown())
+        for body in [{"edges": [[u, 1, 2.0]]}, {"blocked": [1]}]:
+            self.assertEqual(self.update(body).status_code, 400, body)
+        self.assertFalse(pool.updates)
+        response = self.update({"edges": [[u, v, 2.0]]})
+        self.addCleanup(self.update, {"edges": [[u, v, 1.0]]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(pool.updates.multipliers, {(u, v): 2.0})
+        response = self.client.get("/api/routing/async/route/", self.points(0, 35))
+        self.assertEqual(response.status_code, 200)
+
+    def update(self, body: dict):
+        return self.client.post(
+            "/api/routing/update/",
+            json.dumps(body),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer token",
+        )
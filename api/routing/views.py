@@ -1,3 +1,97 @@
-from django.shortcuts import render
+import asyncio
+import hmac
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from saferouting import metrics
+from saferouting.route import CONTENT_TYPES
+
+from .api import (
+    encoding_options,
+    get_pool,
+    get_registry,
+    not_in_region,
+    numbers,
+    retry_later,
+    update_pool,
+)
+from .pool import Saturated
+
+
+async def route(request):
+    """Async version of RouteResource.get_list, searches run in the routing pool of the region containing both points instead of the request thread."""
+    _c = ["x0", "y0", "x1", "y1"]
+    m = [_ for _ in _c if request.GET.get(_) is None]
+    if len(m) > 0:
+        return HttpResponse("missing parameters %s" % ", ".join(m), status=400)
+
+    try:
+        c = numbers(request, _c)
+        options = encoding_options(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+
+    source, target = (c[0], c[1]), (c[2], c[3])
+    name = get_registry().region_of(source, target)
+    if name is None:
+        return not_in_region()
+
+    try:
+        future = get_pool(name).submit(source, target, **options)
+    except Saturated:
+        return retry_later()
+
+    body, _ = await asyncio.wrap_future(future)
+    return HttpResponse(body, content_type=CONTENT_TYPES[options["encoding"]])
+
+
+@csrf_exempt
+@require_POST
+def update(request):
+    """Applies live cost updates to a region of this process and to the routing pools of the region, see RegionRegistry.update. Expects a JSON body {"region": name, "edges": [[source id, target id, multiplier], ...], "blocked": [id, ...], "unblocked": [id, ...]}, all optional except region when several regions are served, and an "Authorization: Bearer <ROUTING_UPDATE_TOKEN>" header. Unknown nodes and edges answer 400 and nothing of the update is applied. Responds with the new graph version of the region."""
+    token = settings.ROUTING_UPDATE_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not token or not hmac.compare_digest(authorization, "Bearer " + token):
+        return HttpResponse("updates are not allowed", status=403)
+
+    try:
+        body = json.loads(request.body)
+        update = {
+            "multipliers": {
+                (int(u), int(v)): float(m) for u, v, m in body.get("edges", [])
+            },
+            "blocked": [int(_) for _ in body.get("blocked", [])],
+            "unblocked": [int(_) for _ in body.get("unblocked", [])],
+        }
+    except (ValueError, TypeError, AttributeError):
+        return HttpResponse("body is not a valid update", status=400)
+    if not all(m >= 0 for m in update["multipliers"].values()):
+        return HttpResponse("multipliers must be non-negative", status=400)
+
+    registry = get_registry()
+    name = body.get("region")
+    if name is None and len(registry) == 1:
+        name = next(iter(registry.regions))
+    if not isinstance(name, str) or name not in registry:
+        return HttpResponse("unknown region %s" % (name,), status=400)
+
+    try:
+        version = registry.update(name, **update)
+    except KeyError as e:
+        return HttpResponse("unknown node or edge %s" % (e.args[0],), status=400)
+    update_pool(name, **update)
+
+    response = HttpResponse(content_type="application/json")
+    response.write(json.dumps({"version": version}))
+    return response
+
+
+def metrics_view(request):
+    """Exposes query metrics of this process in the Prometheus text format."""
+    return HttpResponse(
+        metrics.REGISTRY.render(), content_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,46 @@
+"""Compares benchmark result files written by benchmarks.run.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [...]
+"""
+import argparse
+import json
+
+METRICS = [
+    ("latency_ms", "p50"),
+    ("latency_ms", "p95"),
+    ("latency_ms", "p99"),
+    ("expanded", "p50"),
+    ("memory", "max_rss_mb"),
+    ("load", "graphml_s"),
+    ("load", "arrays_s"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("baseline", help="result file to compare against")
+    parser.add_argument("candidates", nargs="+", help="result files to compare")
+    args = parser.parse_args(argv)
+
+    results = []
+    for filepath in [args.baseline] + args.candidates:
+        with open(filepath) as inp:
+            results.append(json.load(inp))
+
+    width = max(len(".".join(m)) for m in METRICS)
+    for section, key in METRICS:
+        base = results[0].get(section, {}).get(key)
+        row = ["{:<{}}".format(section + "." + key, width)]
+        for r in results:
+            value = r.get(section, {}).get(key)
+            if value is None:
+                row.append("{:>20}".format("-"))
+            elif base and r is not results[0]:
+                row.append("{:>11.3f} ({:>5.2f}x)".format(value, value / base))
+            else:
+                row.append("{:>20.3f}".format(value))
+        print(" ".join(row))
+
+
+if __name__ == "__main__":
+    main()
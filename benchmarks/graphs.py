@@ -0,0 +1,175 @@
+from saferouting.graph.spatial import EARTH_RADIUS
+
+from xml.sax.saxutils import quoteattr
+
+import math
+import numpy as np
+
+# origin of generated graphs, coordinates are (x, y) = (longitude, latitude)
+ORIGIN = (-122.45, 37.75)
+
+# same attributes osmnx writes, read_graphml only needs x, y, length and reversed
+NODE_KEYS = [("d0", "y"), ("d1", "x"), ("d2", "street_count")]
+EDGE_KEYS = [("d3", "osmid"), ("d4", "oneway"), ("d5", "reversed"), ("d6", "length")]
+
+
+def pair_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Returns great-circle distance in meters between aligned arrays of (x, y) coordinates."""
+    lon1, lat1 = np.radians(a[:, 0]), np.radians(a[:, 1])
+    lon2, lat2 = np.radians(b[:, 0]), np.radians(b[:, 1])
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(h, 1)))
+
+
+def _degrees(meters: float) -> tuple[float, float]:
+    """Returns (x, y) degrees spanned by a distance in meters at ORIGIN."""
+    dy = math.degrees(meters / EARTH_RADIUS)
+    return dy / math.cos(math.radians(ORIGIN[1])), dy
+
+
+def _edges(
+    rng: np.random.Generator,
+    coords: np.ndarray,
+    u: np.ndarray,
+    v: np.ndarray,
+    oneway: float,
+):
+    """Returns (sources, targets, lengths, oneway flags) of directed edges given undirected pairs (u, v). Lengths are great-circle distances stretched by up to 30% like real streets."""
+    lengths = pair_distances(coords[u], coords[v]) * rng.uniform(1.0, 1.3, len(u))
+    is_oneway = rng.random(len(u)) < oneway
+    two_way = ~is_oneway
+    return (
+        np.concatenate((u, v[two_way])),
+        np.concatenate((v, u[two_way])),
+        np.concatenate((lengths, lengths[two_way])),
+        np.concatenate((is_oneway, is_oneway[two_way])),
+    )
+
+
+def grid(
+    rows: int,
+    cols: int = None,
+    spacing: float = 100,
+    drop: float = 0.1,
+    oneway: float = 0.1,
+    seed: int = 0,
+):
+    """Generates a jittered street grid.
+
+    :param1 rows: Number of rows.
+    :param2 cols: Number of columns (default rows).
+    :param3 spacing: Block length in meters (default 100).
+    :param4 drop: Fraction of street segments removed (default 0.1).
+    :param5 oneway: Fraction of one-way street segments (default 0.1).
+    :param6 seed: Random seed (default 0).
+
+    :ret: tuple of (node coordinates (x, y), edge sources, edge targets, edge lengths, edge oneway flags), edges are given by node index
+    """
+    cols = rows if cols is None else cols
+    rng = np.random.default_rng(seed)
+    dx, dy = _degrees(spacing)
+
+    i, j = np.divmod(np.arange(rows * cols), cols)
+    coords = np.column_stack(
+        (
+            ORIGIN[0] + j * dx + rng.uniform(-0.2, 0.2, len(i)) * dx,
+            ORIGIN[1] + i * dy + rng.uniform(-0.2, 0.2, len(i)) * dy,
+        )
+    )
+
+    nodes = np.arange(rows * cols).reshape(rows, cols)
+    u = np.concatenate((nodes[:, :-1].ravel(), nodes[:-1, :].ravel()))
+    v = np.concatenate((nodes[:, 1:].ravel(), nodes[1:, :].ravel()))
+    kept = rng.random(len(u)) >= drop
+    return (coords, *_edges(rng, coords, u[kept], v[kept], oneway))
+
+
+def geometric(
+    n: int, degree: float = 6, spacing: float = 100, oneway: float = 0.1, seed: int = 0
+):
+    """Generates a random geometric graph, connecting every pair of uniformly placed nodes closer than a radius chosen for the given average degree.
+
+    :param1 n: Number of nodes.
+    :param2 degree: Expected average number of neighbors (default 6).
+    :param3 spacing: Average distance between neighboring nodes in meters (default 100).
+    :param4 oneway: Fraction of one-way edges (default 0.1).
+    :param5 seed: Random seed (default 0).
+
+    :ret: tuple of (node coordinates (x, y), edge sources, edge targets, edge lengths, edge oneway flags), edges are given by node index
+    """
+    rng = np.random.default_rng(seed)
+    side = spacing * math.sqrt(n)
+    radius = math.sqrt(degree / (math.pi * n)) * side
+
+    points = rng.uniform(0, side, (n, 2))
+    dx, dy = _degrees(1)
+    coords = np.column_stack(
+        (ORIGIN[0] + points[:, 0] * dx, ORIGIN[1] + points[:, 1] * dy)
+    )
+
+    # bucket points into cells of size radius, every neighbor is in the same or an adjacent cell
+    cells = np.floor(points / radius).astype(np.int64)
+    width = int(cells[:, 0].max()) + 3
+    keys = (cells[:, 1] + 1) * width + cells[:, 0] + 1
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    u, v = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            other = keys + oy * width + ox
+            starts = np.searchsorted(sorted_keys, other, side="left")
+            counts = np.searchsorted(sorted_keys, other, side="right") - starts
+            a = np.repeat(np.arange(n), counts)
+            b = order[
+                np.repeat(starts, counts)
+                + np.arange(counts.sum())
+                - np.repeat(np.cumsum(counts) - counts, counts)
+            ]
+            close = (a < b) & (
+                np.sum((points[a] - points[b]) ** 2, axis=1) < radius**2
+            )
+            u.append(a[close])
+            v.append(b[close])
+    return (coords, *_edges(rng, coords, np.concatenate(u), np.concatenate(v), oneway))
+
+
+def write_graphml(
+    filepath: str,
+    coords: np.ndarray,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    lengths: np.ndarray,
+    oneway: np.ndarray,
+    first_id: int = 1000,
+):
+    """Writes a generated graph to filepath in the GraphML layout osmnx uses, so Graph reads it like downloaded OSM data. Node i gets OSM id first_id + i."""
+    degree = np.bincount(np.concatenate((sources, targets)), minlength=len(coords))
+    with open(filepath, "w") as outp:
+        outp.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        outp.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for kind, keys in (("node", NODE_KEYS), ("edge", EDGE_KEYS)):
+            for key, name in keys:
+                outp.write(
+                    '  <key id=%s for=%s attr.name=%s attr.type="string" />\n'
+                    % (quoteattr(key), quoteattr(kind), quoteattr(name))
+                )
+        outp.write('  <graph edgedefault="directed">\n')
+
+        for i, ((x, y), count) in enumerate(zip(coords.tolist(), degree.tolist())):
+            outp.write(
+                '    <node id="%d"><data key="d0">%r</data><data key="d1">%r</data><data key="d2">%d</data></node>\n'
+                % (first_id + i, y, x, count)
+            )
+        for k, (u, v, length, is_oneway) in enumerate(
+            zip(sources.tolist(), targets.tolist(), lengths.tolist(), oneway.tolist())
+        ):
+            outp.write(
+                '    <edge source="%d" target="%d" id="0"><data key="d3">%d</data><data key="d4">%s</data><data key="d5">False</data><data key="d6">%r</data></edge>\n'
+                % (first_id + u, first_id + v, k, is_oneway, length)
+            )
+
+        outp.write("  </graph>\n</graphml>\n")
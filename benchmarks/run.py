@@ -0,0 +1,213 @@
+"""Replays a seeded query workload against Routes.get_path on a synthetic or given graph and writes latency, expansion, memory and load time statistics to a JSON file.
+
+Usage: python -m benchmarks.run --graph grid --size 150 --queries 500 --output results.json
+"""
+from saferouting import Routes
+from saferouting.cache import RouteCache
+from saferouting.graph import Graph
+from . import graphs
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def max_rss() -> float:
+    """Returns memory high-water mark of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def percentiles(values: list[float]) -> dict:
+    if len(values) == 0:
+        return {}
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def workload(graph: Graph, count: int, seed: int) -> list:
+    """Returns count seeded random (source, destination) coordinate pairs within the bounding box of graph."""
+    rng = np.random.default_rng(seed)
+    lo, hi = graph.coords.min(axis=0), graph.coords.max(axis=0)
+    points = lo + (hi - lo) * rng.random((count, 2, 2))
+    return [(tuple(s), tuple(d)) for s, d in points.tolist()]
+
+
+def generate(args, filepath: str):
+    if args.graph == "grid":
+        graph = graphs.grid(args.size, seed=args.seed)
+    else:
+        graph = graphs.geometric(args.size**2, seed=args.seed)
+    graphs.write_graphml(filepath, *graph)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(args) -> dict:
+    r = {
+        "config": vars(args),
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "load": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graphml = args.graphml
+        if graphml is None:
+            graphml = os.path.join(tmp, "graph.graphml")
+            s = time.perf_counter()
+            generate(args, graphml)
+            r["load"]["generate_s"] = time.perf_counter() - s
+
+        s = time.perf_counter()
+        graph = Graph(graphml)
+        r["load"]["graphml_s"] = time.perf_counter() - s
+        r["graph"] = {"nodes": len(graph), "edges": len(graph.edges)}
+
+        if args.chains:
+            s = time.perf_counter()
+            graph.contract_chains()
+            r["load"]["chains_s"] = time.perf_counter() - s
+            r["graph"]["contracted_edges"] = len(graph.chains)
+
+        if args.landmarks:
+            s = time.perf_counter()
+            graph.build_landmarks(args.landmarks)
+            r["load"]["landmarks_s"] = time.perf_counter() - s
+
+        routes = Routes(graph=graph, heuristic=args.heuristic)
+        if args.hierarchy:
+            s = time.perf_counter()
+            routes.build_hierarchy()
+            r["load"]["hierarchy_s"] = time.perf_counter() - s
+
+        # cold start of a server worker, from the memory mappable format
+        serialized = os.path.join(tmp, "routes")
+        routes.save(serialized, arrays=True)
+        s = time.perf_counter()
+        routes = Routes(serialized_filepath=serialized)
+        r["load"]["arrays_s"] = time.perf_counter() - s
+        routes.cache = RouteCache(max_entries=0)
+        r["memory"] = {"loaded_max_rss_mb": max_rss()}
+
+        queries = workload(routes.graph, args.queries + args.warmup, args.seed)
+        latencies, expanded, not_found, engines = [], [], 0, {}
+        for k, (source, destination) in enumerate(queries):
+            s = time.perf_counter()
+            route = routes.get_path(
+                source, destination, bidirectional=args.bidirectional
+            )
+            elapsed = (time.perf_counter() - s) * 1000
+            if k < args.warmup:
+                continue
+
+            latencies.append(elapsed)
+            engine = route.misc["engine"]
+            engines[engine] = engines.get(engine, 0) + 1
+            if "expanded" in route.misc:
+                expanded.append(route.misc["expanded"])
+            if route.cost == float("inf"):
+                not_found += 1
+
+    r["latency_ms"] = percentiles(latencies)
+    r["expanded"] = percentiles(expanded)
+    r["not_found"] = not_found
+    r["engines"] = engines
+    r["memory"]["max_rss_mb"] = max_rss()
+    return r
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--graph",
+        choices=["grid", "geometric"],
+        default="grid",
+        help="synthetic graph to generate (default grid)",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=100,
+        help="grid side, the geometric graph gets size ** 2 nodes (default 100)",
+    )
+    parser.add_argument(
+        "--graphml",
+        help="benchmark an existing .graphml file instead of generating one",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=200, help="number of timed queries (default 200)"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=10, help="untimed queries run first (default 10)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of graph and workload (default 0)"
+    )
+    parser.add_argument(
+        "--heuristic", choices=["haversine", "alt"], default="haversine"
+    )
+    parser.add_argument(
+        "--landmarks",
+        type=int,
+        default=0,
+        help="build this many ALT landmarks, needed for --heuristic alt",
+    )
+    parser.add_argument(
+        "--hierarchy", action="store_true", help="build the contraction hierarchy"
+    )
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument(
+        "--chains", action="store_true", help="contract chains of degree-2 nodes"
+    )
+    parser.add_argument(
+        "--output", default="benchmark.json", help="JSON file to write results to"
+    )
+    args = parser.parse_args(argv)
+    if args.heuristic == "alt" and not args.landmarks:
+        parser.error("--heuristic alt needs --landmarks")
+
+    r = run(args)
+    with open(args.output, "w") as outp:
+        json.dump(r, outp, indent=2)
+
+    latency = r["latency_ms"]
+    print(
+        "{nodes} nodes, {edges} edges".format(**r["graph"]),
+        "| latency ms p50 {p50:.2f} p95 {p95:.2f} p99 {p99:.2f}".format(**latency),
+        "| expanded p50 {:.0f}".format(r["expanded"].get("p50", 0)),
+        "| engines %s" % ", ".join("%s %d" % e for e in sorted(r["engines"].items())),
+        "| max rss {:.0f} MB".format(r["memory"]["max_rss_mb"]),
+        "| written to %s" % args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
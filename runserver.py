@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
+import json
 import os
+import numpy as np
 import saferouting
 from saferouting import graph
 
@@ -26,40 +28,116 @@ def dummy_handler(
     return neighbor_ids
 
 
+# vectorized level handlers receive NumPy arrays of edges instead of a list of tuples, and return a keep-mask or cost multipliers
+@saferouting.vectorized(batch=32)
+def dummy_vectorized_handler(
+    neighbors, coords, costs, current, source_id, destination_id, graph
+):
+    """Dummy vectorized level handler, keeps all neighbors. See saferouting.vectorized for the argument layout.
+
+    :ret: boolean mask of neighbors to keep, or array of cost multipliers (inf removes a neighbor)
+    """
+    return np.ones(len(neighbors), dtype=bool)
+
+
 LEVEL_HANDLER = (
     dummy_handler  # replace the dummy_handler with your own for custom pruning
 )
 
-# define map area from OSM data
-REGION_OSMID = "R111968"
-GRAPHML_FILEPATH = "data/sf.graphml"
-SERIALIZED_FILEPATH = ".serialized_routes"
-
-# from top-left to bottom-right in cartesian format
-BOUNDS = [(-122.5212, 37.8139), (-122.3482, 37.7089)]
-
-# check for serialized file existence. If not, create serialized routes object.
-if not os.path.isfile(SERIALIZED_FILEPATH):
-    print("Serialized routes not found, creating it")
+# define the map areas served from OSM data, queries go to the smallest region whose bounds contain them, see saferouting.regions
+# bounds are from top-left to bottom-right in cartesian format, cache holds routes precomputed from a query log with python -m saferouting.warmup, loaded into the route cache if present
+REGIONS = [
+    {
+        "name": "sf",
+        "osmid": "R111968",
+        "graphml": "data/sf.graphml",
+        "routes": ".serialized_routes",
+        "cache": ".route_cache.npz",
+        "bounds": [(-122.5212, 37.8139), (-122.3482, 37.7089)],
+    },
+]
+
+# largest memory in MB taken by loaded regions, least recently used regions are unloaded beyond it (None for no limit)
+REGION_MEMORY_MB = None
+
+# preprocess the graph for fast queries, see Routes.build_hierarchy
+BUILD_HIERARCHY = True
+
+# collapse street geometry nodes for A* searches, see Graph.contract_chains
+CONTRACT_CHAINS = True
+
+
+def serialized_version(filepath: str) -> int:
+    """Returns array directory format version of serialized routes, or None if filepath is missing or a pickle."""
+    header = os.path.join(filepath, saferouting.serialize.HEADER_FILE)
+    if not os.path.isfile(header):
+        return None
+    with open(header) as inp:
+        return json.load(inp).get("version")
+
+
+for region in REGIONS:
+    # reuse serialized routes only if they were written in the current format, else rebuild them from the graphml file
+    version = serialized_version(region["routes"])
+    if version == saferouting.serialize.FORMAT_VERSION:
+        print(
+            "Serialized routes of %s found in %s" % (region["name"], region["routes"])
+        )
+        continue
+    elif os.path.exists(region["routes"]):
+        print(
+            "Serialized routes of %s in %s were written by an older version, recreating them"
+            % (region["name"], region["routes"])
+        )
+        if os.path.isfile(region["routes"]):
+            os.remove(region["routes"])
+    else:
+        print("Serialized routes of %s not found, creating it" % region["name"])
 
     # check for graphml file existence. If not, created graphml file.
-    if not os.path.isfile(GRAPHML_FILEPATH):
-        print("GraphML file not found, creating it from OSMID %s" % REGION_OSMID)
-        graph.util.get_graph_from_osmid(REGION_OSMID, GRAPHML_FILEPATH)
+    if not os.path.isfile(region["graphml"]):
+        print("GraphML file not found, creating it from OSMID %s" % region["osmid"])
+        graph.util.get_graph_from_osmid(region["osmid"], region["graphml"])
     else:
-        print("GraphML file %s found" % GRAPHML_FILEPATH)
+        print("GraphML file %s found" % region["graphml"])
 
     # to use level handler, change line to include it
-    # [saferouting.Routes(graph=graph.Graph(GRAPHML_FILEPATH), bounds=BOUNDS)]
-    saferouting.Routes(graph=graph.Graph(GRAPHML_FILEPATH), bounds=BOUNDS).save(
-        SERIALIZED_FILEPATH
+    # [saferouting.Routes(graph=graph.Graph(region["graphml"]), bounds=region["bounds"], level_handler=LEVEL_HANDLER)]
+    # queries snap to the largest strongly connected component, so they never start on an isolated fragment
+    routes = saferouting.Routes(
+        graph=graph.Graph(region["graphml"]),
+        bounds=region["bounds"],
+        component="largest",
     )
 
-
-else:
-    print("Serialized routes found in %s" % SERIALIZED_FILEPATH)
-
-os.environ.setdefault("DJANGO_SERIALIZED_ROUTES_FILEPATH", SERIALIZED_FILEPATH)
+    if CONTRACT_CHAINS:
+        print("Contracting degree-2 chains")
+        routes.graph.contract_chains()
+
+    # the contraction hierarchy is only used while no level handler is set
+    if BUILD_HIERARCHY:
+        print("Building contraction hierarchy")
+        routes.build_hierarchy()
+
+    # saved as memory mapped arrays, so every server worker shares one copy of the graph
+    routes.save(region["routes"], arrays=True)
+
+os.environ.setdefault(
+    "DJANGO_ROUTING_REGIONS",
+    json.dumps(
+        [
+            {
+                "name": region["name"],
+                "bounds": region["bounds"],
+                "routes": region["routes"],
+                "cache": region["cache"] if os.path.isfile(region["cache"]) else None,
+            }
+            for region in REGIONS
+        ]
+    ),
+)
+if REGION_MEMORY_MB is not None:
+    os.environ.setdefault("DJANGO_ROUTING_REGION_MEMORY_MB", str(REGION_MEMORY_MB))
 
 # run django server
 import subprocess
@@ -1,2 +1,3 @@
 from .routes import Routes
 from .route import Route
+from .handlers import vectorized
@@ -0,0 +1,216 @@
+from .route import Route
+
+from collections import OrderedDict
+
+import numpy as np
+
+import sys
+import threading
+import time
+
+
+def route_size(route: Route) -> int:
+    """Returns approximate memory footprint of a route in bytes."""
+    size = sys.getsizeof(route) + sys.getsizeof(route.nodes) + sys.getsizeof(route.path)
+    size += sum(map(sys.getsizeof, route.nodes))
+    if route.path:
+        point = route.path[0]
+        size += len(route.path) * (
+            sys.getsizeof(point) + sum(map(sys.getsizeof, point))
+        )
+    return size
+
+
+class RouteCache:
+    """Bounded least recently used cache of routes keyed by (source index, destination index).
+
+    Entries are evicted in least recently used order once either max_entries or max_bytes is exceeded, and expire ttl seconds after they were stored. Only the bounds are kept on serialization, never the cached routes.
+
+    Lookups reorder entries, so every method holds an internal lock while touching the cache's state, and concurrent queries can share one cache.
+
+    :attr1 hits: Number of lookups that returned a route.
+
+    :attr2 misses: Number of lookups that did not, including expired entries.
+
+    :attr3 evictions: Number of entries removed to stay within bounds or because they expired.
+
+    :attr4 invalidations: Number of entries removed by invalidate.
+
+    :attr5 bytes: Approximate memory used by cached routes, see route_size.
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, max_bytes: int = None, ttl: float = None
+    ):
+        """Initializes empty cache.
+
+        :param1 max_entries: Maximum number of cached routes, 0 disables the cache (default 1024).
+        :param2 max_bytes: Maximum approximate memory used by cached routes (optional).
+        :param3 ttl: Seconds after which a cached route expires (optional).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: tuple[int, int]):
+        return key in self.entries
+
+    def __getstate__(self):
+        return {
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, key: tuple[int, int]) -> Route:
+        """Returns cached route given (source index, destination index), or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if (
+                entry is not None
+                and self.ttl is not None
+                and entry[2] < time.monotonic()
+            ):
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple[int, int], route: Route):
+        """Caches route given (source index, destination index), evicting least recently used routes as needed."""
+        if self.max_entries <= 0:
+            return
+        size = route_size(route)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (route, size, expires)
+            self.bytes += size
+            for node in set(route.nodes):
+                self.keys_by_node.setdefault(node, set()).add(key)
+
+            while len(self.entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, nodes) -> int:
+        """Removes every cached route passing through any of the given node ids, found through a reverse index from node id to keys.
+
+        :ret: number of routes removed
+        """
+        with self.lock:
+            keys = set()
+            for node in nodes:
+                keys.update(self.keys_by_node.get(node, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Removes every cached route. Counters are kept."""
+        with self.lock:
+            self.entries: OrderedDict[
+                tuple[int, int], tuple[Route, int, float]
+            ] = OrderedDict()
+            self.keys_by_node: dict[int, set[tuple[int, int]]] = {}
+            self.bytes = 0
+
+    def save(self, filepath: str, ids: np.ndarray, fingerprint: str):
+        """Writes cached routes to a compressed .npz file read by load, in least recently used order. Only node ids and costs are stored, paths are rebuilt from node coordinates on load, and routes with an error are left out.
+
+        :param2 ids: OSM id of every node index, see Graph.ids.
+        :param3 fingerprint: Identifies the graph and settings the routes were found with, load refuses files with another one.
+        """
+        with self.lock:
+            entries = list(self.entries.items())
+        keys, routes = [], []
+        for key, (route, _, _) in entries:
+            if "error" not in route.misc:
+                keys.append(key)
+                routes.append(route)
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1, 2)
+        lengths = np.fromiter(map(len, routes), dtype=np.int64, count=len(routes))
+        np.savez_compressed(
+            filepath,
+            fingerprint=np.asarray(fingerprint),
+            keys=ids[keys],
+            costs=np.fromiter((r.cost for r in routes), dtype=np.float64),
+            ptr=np.concatenate([[0], np.cumsum(lengths)]),
+            nodes=np.fromiter(
+                (n for r in routes for n in r.nodes),
+                dtype=np.int64,
+                count=lengths.sum(),
+            ),
+        )
+
+    def load(self, filepath: str, graph, fingerprint: str) -> int:
+        """Adds routes written by save, keeping their recency order. Prints a warning and loads nothing if the file was written with another fingerprint.
+
+        :param2 graph: Graph the routes belong to.
+
+        :ret: number of routes added
+        """
+        with np.load(filepath) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                print(
+                    "Warning: Not loading cached routes from {0}, they were computed with another graph, edge values, avoidance zones or level_handler".format(
+                        filepath
+                    )
+                )
+                return 0
+            keys = graph.indices_of(data["keys"]).reshape(-1, 2).tolist()
+            costs, ptr, nodes = data["costs"].tolist(), data["ptr"], data["nodes"]
+
+        indices = graph.indices_of(nodes)
+        coords = list(map(tuple, graph.coords[indices].tolist()))
+        nodes = nodes.tolist()
+        for k, (key, cost) in enumerate(zip(keys, costs)):
+            s, e = ptr[k], ptr[k + 1]
+            self.put(tuple(key), Route(coords[s:e], nodes[s:e], cost))
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Returns counters and current size as a dict."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+            }
+
+    def _remove(self, key: tuple[int, int]):
+        """Removes an entry, the caller holds the lock."""
+        route, size, _ = self.entries.pop(key)
+        self.bytes -= size
+        for node in set(route.nodes):
+            keys = self.keys_by_node[node]
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_node[node]
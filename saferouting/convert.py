@@ -0,0 +1,52 @@
+from .graph import Graph
+from .routes import Routes
+from . import serialize
+
+import argparse
+
+
+def convert(
+    source: str,
+    destination: str,
+    hierarchy=False,
+    landmarks: int = 0,
+    chains=False,
+):
+    """Converts a pickled routes object or a .graphml file to an array directory.
+
+    :param1 source: Pickle file written by save, or .graphml file.
+    :param2 destination: Directory to write to.
+    :param3 hierarchy: If True, builds the contraction hierarchy before saving (default False).
+    :param4 landmarks: If positive, builds this many ALT landmarks before saving (default 0).
+    :param5 chains: If True, contracts degree-2 chains before saving, see Graph.contract_chains (default False).
+    """
+    if source.endswith(".graphml"):
+        routes = Routes(graph=Graph(source))
+    else:
+        routes = serialize.load(source)
+    if chains:
+        routes.graph.contract_chains()
+    if landmarks > 0:
+        routes.graph.build_landmarks(landmarks)
+    if hierarchy:
+        routes.build_hierarchy()
+    serialize.save_arrays(routes, destination)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Converts a pickled routes object or a .graphml file to a memory mappable array directory."
+    )
+    parser.add_argument("source", help="pickle file or .graphml file")
+    parser.add_argument("destination", help="directory to write")
+    parser.add_argument(
+        "--hierarchy", action="store_true", help="build the contraction hierarchy"
+    )
+    parser.add_argument(
+        "--landmarks", type=int, default=0, help="number of ALT landmarks to build"
+    )
+    parser.add_argument(
+        "--chains", action="store_true", help="contract chains of degree-2 nodes"
+    )
+    args = parser.parse_args()
+    convert(args.source, args.destination, args.hierarchy, args.landmarks, args.chains)
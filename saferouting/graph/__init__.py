@@ -1,2 +1,4 @@
 from .graph import Graph
+from .hierarchy import Hierarchy
+from .compiled import CompiledGraph
 from . import util
@@ -0,0 +1,192 @@
+from .edge import CSR, expand_ranges
+
+import numpy as np
+
+
+class Chains:
+    """Degree-2 chains of a Graph collapsed into shortcut edges, so searches skip nodes that only carry geometry.
+
+    A node is interior if it is adjacent to exactly two other nodes, ignoring direction. Interior nodes form chains between two junctions (every other node), and each direction a chain can be traversed in becomes one shortcut edge valued at the sum of its hops. Chains without a junction (isolated cycles) are left as they are. Node indices are unchanged, so coordinates, heuristics and avoidance masks of the graph still apply.
+
+    :attr1 interior: Boolean mask of interior nodes. They have no edges in the contracted adjacency, searches only reach them as source or destination through virtual_edges.
+
+    :attr2 edges: Contracted adjacency over all nodes, holding the original edges between junctions and the shortcuts.
+
+    :attr3 hop_ptr: Hops of contracted edge k are hops[hop_ptr[k]:hop_ptr[k + 1]].
+
+    :attr4 hops: Positions in graph.edges of the original edges making up every contracted edge, in travel order. Original edges are a single hop.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        n = len(graph)
+        sources = graph.edges.sources().astype(np.int64)
+        targets = graph.edges.indices.astype(np.int64)
+
+        # distinct neighbors of every node, ignoring direction and self-loops
+        loop = sources == targets
+        s, t = sources[~loop], targets[~loop]
+        tails, heads = np.divmod(np.unique(np.concatenate([s * n + t, t * n + s])), n)
+        degree = np.bincount(tails, minlength=n)
+        ptr = np.concatenate([[0], np.cumsum(degree)]).tolist()
+        adjacent = heads.tolist()
+        interior = (degree == 2).tolist()
+
+        # walk every chain once, starting from one of its ends
+        visited = [False] * n
+        chains = []
+        for a in np.flatnonzero((degree > 0) & (degree != 2)).tolist():
+            for v in adjacent[ptr[a] : ptr[a + 1]]:
+                if not interior[v] or visited[v]:
+                    continue
+                chain, prev = [a], a
+                while interior[v]:
+                    visited[v] = True
+                    chain.append(v)
+                    x, y = adjacent[ptr[v]], adjacent[ptr[v] + 1]
+                    prev, v = v, y if x == prev else x
+                chains.append(chain + [v])
+
+        # interior nodes not reached from any junction lie on isolated cycles
+        self.interior = np.asarray(interior) & np.asarray(visited, dtype=bool)
+
+        junction = np.flatnonzero(~self.interior[sources] & ~self.interior[targets])
+        shortcuts = []
+        for chain in chains:
+            if chain[0] == chain[-1]:
+                continue  # loops back to its junction, never part of a shortest path
+            for nodes in (chain, chain[::-1]):
+                hops = [self._hop(x, y) for x, y in zip(nodes, nodes[1:])]
+                if min(hops) >= 0:
+                    shortcuts.append((nodes[0], nodes[-1], hops))
+
+        def column(values) -> np.ndarray:
+            return np.fromiter(values, dtype=np.int64)
+
+        tails = np.concatenate([sources[junction], column(c[0] for c in shortcuts)])
+        heads = np.concatenate([targets[junction], column(c[1] for c in shortcuts)])
+        counts = np.concatenate(
+            [
+                np.ones(len(junction), dtype=np.int64),
+                column(len(c[2]) for c in shortcuts),
+            ]
+        )
+        hops = np.concatenate([junction, column(h for c in shortcuts for h in c[2])])
+        starts = np.cumsum(counts) - counts
+        weights = (
+            np.add.reduceat(graph.edges.weights[hops], starts)
+            if len(hops)
+            else np.zeros(0)
+        )
+
+        order = np.argsort(tails, kind="stable")
+        self.edges = CSR.from_edges(n, tails[order], heads[order], weights[order])
+        self.hop_ptr = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts[order], out=self.hop_ptr[1:])
+        self.hops = hops[expand_ranges(starts[order], counts[order])]
+        self._reverse_edges = None
+
+    def __len__(self):
+        return len(self.edges)
+
+    @property
+    def reverse_edges(self) -> CSR:
+        """Contracted adjacency with every edge reversed, built on first use."""
+        if self._reverse_edges is None:
+            self._reverse_edges = self.edges.transpose()
+        return self._reverse_edges
+
+    def reweight(self):
+        """Recomputes values of the contracted edges from the current values of graph.edges, after Graph.update."""
+        if len(self.hops):
+            self.edges.weights[:] = np.add.reduceat(
+                self.graph.edges.weights[self.hops], self.hop_ptr[:-1]
+            )
+        if self._reverse_edges is not None:
+            self._reverse_edges.weights[:] = self.edges.weights[
+                self._reverse_edges.edge_ids
+            ]
+
+    def edges_from(
+        self, i: int, reverse=False
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (neighbor indices, values, contracted edge ids) given node index, or (predecessor indices, values, contracted edge ids) if reverse."""
+        edges = self.reverse_edges if reverse else self.edges
+        s, e = edges.indptr[i], edges.indptr[i + 1]
+        ids = edges.edge_ids[s:e] if reverse else np.arange(s, e)
+        return edges.indices[s:e], edges.weights[s:e], ids
+
+    def hops_of(self, edge_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (hops, hop counts) of contracted edges, with the hops of all edges concatenated."""
+        starts = self.hop_ptr[edge_ids]
+        counts = self.hop_ptr[edge_ids + 1] - starts
+        return self.hops[expand_ranges(starts, counts)], counts
+
+    def lowest_hops(self, tail: int, head: int, virtual: dict) -> np.ndarray:
+        """Returns hops of the lowest valued edge from tail to head among the contracted edges and the given virtual edges."""
+        value, hops = np.inf, None
+        indices, weights, ids = self.edges_from(tail)
+        for n, w, k in zip(indices.tolist(), weights.tolist(), ids.tolist()):
+            if n == head and w < value:
+                value, hops = w, self.hops[self.hop_ptr[k] : self.hop_ptr[k + 1]]
+        for n, w, h in virtual.get((tail, False), []):
+            if n == head and w < value:
+                value, hops = w, h
+        return hops
+
+    def virtual_edges(self, source: int, destination: int) -> dict:
+        """Returns the edges a search between two node indices needs on top of the contracted adjacency: from an interior source to the ends of its chain, and from the ends of its chain into an interior destination. Walks stop early at the other endpoint if both lie on the same chain.
+
+        :ret: dict mapping (node index, reverse) to lists of (other node index, value, hops), such that (i, False) holds edges leaving i and (i, True) edges entering i
+        """
+        edges = []
+        if self.interior[source]:
+            edges += [
+                (source, end, hops) for end, hops in self._walk(source, destination)
+            ]
+        if self.interior[destination] and destination != source:
+            edges += [
+                (end, destination, hops)
+                for end, hops in self._walk(destination, source, reverse=True)
+                if end != source or not self.interior[source]
+            ]
+
+        virtual = {}
+        for tail, head, hops in edges:
+            weight = float(self.graph.edges.weights[hops].sum())
+            virtual.setdefault((tail, False), []).append((head, weight, hops))
+            virtual.setdefault((head, True), []).append((tail, weight, hops))
+        return virtual
+
+    def _walk(self, i: int, stop: int, reverse=False) -> list[tuple[int, np.ndarray]]:
+        """Returns (end node index, hops) of every way along the chain of interior node i, following edges backwards if reverse. Walks end at the first junction or at stop, hops are in travel order."""
+        edges = self.graph.reverse_edges if reverse else self.graph.edges
+        walks = []
+        for first in np.unique(edges.neighbors(i)[0]).tolist():
+            if first == i:
+                continue
+            nodes = [i, first]
+            while nodes[-1] != stop and nodes[-1] != i and self.interior[nodes[-1]]:
+                ahead = [
+                    v
+                    for v in edges.neighbors(nodes[-1])[0].tolist()
+                    if v not in nodes[-2:]
+                ]
+                if not ahead:
+                    break  # one-way street pointing the other way
+                nodes.append(ahead[0])
+            else:
+                if nodes[-1] != i:
+                    if reverse:
+                        nodes.reverse()
+                    hops = [self._hop(x, y) for x, y in zip(nodes, nodes[1:])]
+                    walks.append((nodes[0] if reverse else nodes[-1], np.asarray(hops)))
+        return walks
+
+    def _hop(self, x: int, y: int) -> int:
+        """Returns position in graph.edges of the lowest valued edge from x to y, or -1 if there is none."""
+        indices, weights = self.graph.edges.neighbors(x)
+        found = np.flatnonzero(indices == y)
+        if len(found) == 0:
+            return -1
+        return int(self.graph.edges.indptr[x] + found[np.argmin(weights[found])])
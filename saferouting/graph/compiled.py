@@ -0,0 +1,72 @@
+from .edge import CSR
+
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:
+    csr_matrix = dijkstra = None
+
+
+class CompiledGraph:
+    """Edges of a Graph as a scipy sparse matrix, searched with the compiled Dijkstra of scipy.sparse.csgraph instead of a Python search loop. Only searches without a level_handler can run on it, since the handler is called while expanding nodes.
+
+    The matrix is built on first use and rebuilt whenever the key passed to prepare changes, such as after a live update or a change to the avoidance zones. It is not saved along with its owner.
+
+    :attr1 built: Tuple of (key, matrix) of the last build, or None.
+    """
+
+    def __init__(self):
+        self.built = None
+
+    @staticmethod
+    def available() -> bool:
+        """Returns whether scipy is installed, which searches on a compiled graph need."""
+        return dijkstra is not None
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def prepare(self, edges: CSR, removed: np.ndarray, key):
+        """Builds the matrix from an adjacency unless it was already built for key. Edges with an infinite value are left out, and so are parallel edges but the lowest valued one.
+
+        :param1 edges: Adjacency to search.
+        :param2 removed: Boolean mask aligned with edges, True for edges to leave out, such as edges entering an avoidance zone.
+        :param3 key: Hashable value identifying edge values and removed edges, e.g. (graph version, zones version).
+        """
+        if self.built is not None and self.built[0] == key:
+            return
+        n = len(edges.indptr) - 1
+        keep = np.isfinite(edges.weights) & ~removed
+        sources = edges.sources()[keep]
+        targets, weights = edges.indices[keep], edges.weights[keep]
+
+        order = np.lexsort((weights, targets, sources))
+        sources, targets, weights = sources[order], targets[order], weights[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+
+        csr = CSR.from_edges(n, sources[first], targets[first], weights[first])
+        # explicitly stored zeros are kept as zero valued edges by csgraph
+        matrix = csr_matrix((csr.weights, csr.indices, csr.indptr), shape=(n, n))
+        self.built = (key, matrix)
+
+    def search(self, source: int, limit=np.inf) -> tuple[np.ndarray, np.ndarray]:
+        """Runs Dijkstra from a node index over the matrix of the last prepare call.
+
+        :param1 source: Source node index.
+        :param2 limit: Largest cost to search up to, nodes further away are left unreached (default inf).
+
+        :ret: tuple of (cost of every node, inf if unreached, predecessor index of every node, negative for the source and unreached nodes)
+        """
+        return dijkstra(
+            self.built[1],
+            directed=True,
+            indices=source,
+            return_predecessors=True,
+            limit=limit,
+        )
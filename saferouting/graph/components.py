@@ -0,0 +1,82 @@
+from .edge import CSR
+
+import numpy as np
+
+
+def strongly_connected(edges: CSR) -> np.ndarray:
+    """Returns strongly connected component label of every node, numbered in order of decreasing size, so the largest component is 0.
+
+    Runs Tarjan's algorithm with an explicit stack, so long chains of nodes don't hit the recursion limit.
+    """
+    n = len(edges.indptr) - 1
+    indptr, indices = edges.indptr.tolist(), edges.indices.tolist()
+    index, low = [-1] * n, [0] * n
+    on_stack = [False] * n
+    labels = [-1] * n
+    stack = []
+    counter = count = 0
+
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, indptr[root]]]
+        while work:
+            frame = work[-1]
+            v, k = frame
+            if k < indptr[v + 1]:
+                frame[1] = k + 1
+                w = indices[k]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, indptr[w]])
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    labels[w] = count
+                    if w == v:
+                        break
+                count += 1
+
+    return _by_size(np.asarray(labels, dtype=np.int64))
+
+
+def weakly_connected(edges: CSR) -> np.ndarray:
+    """Returns weakly connected component label of every node, i.e. components ignoring edge direction, numbered in order of decreasing size."""
+    sources, targets = edges.sources(), edges.indices
+    both = CSR.from_edges(
+        len(edges.indptr) - 1,
+        np.concatenate([sources, targets]),
+        np.concatenate([targets, sources]),
+        np.zeros(2 * len(targets)),
+    )
+    return strongly_connected(both)
+
+
+def condense(edges: CSR, labels: np.ndarray) -> CSR:
+    """Returns adjacency between components given their labels, with one edge for every pair of distinct components joined by at least one edge."""
+    count = int(labels.max(initial=-1)) + 1
+    a, b = labels[edges.sources()], labels[edges.indices]
+    pairs = np.unique(a[a != b] * count + b[a != b])
+    return CSR.from_edges(count, pairs // count, pairs % count, np.zeros(len(pairs)))
+
+
+def _by_size(labels: np.ndarray) -> np.ndarray:
+    sizes = np.bincount(labels)
+    rank = np.empty(len(sizes), dtype=np.int32)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return rank[labels]
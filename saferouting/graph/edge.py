@@ -1,29 +1,72 @@
-class Edge:
-    def __init__(self, a, b, value):
-        self.edge = (a, b)
-        self.value = value
+import numpy as np
 
 
-class Edges:
-    adj: dict[int, Edge] = {}
-    len = 0
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Returns the concatenation of ranges [starts[k], starts[k] + counts[k])."""
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
 
-    def __init__(self, list_of_edges: list[Edge] = []):
-        for e in list_of_edges:
-            self.insert(e)
+
+class CSR:
+    """Compressed sparse row adjacency over dense node indices.
+
+    :attr1 indptr: Array of length n + 1, edges leaving node i are stored in [indptr[i], indptr[i + 1]).
+
+    :attr2 indices: Target node index of every edge, grouped by source node.
+
+    :attr3 weights: Value of every edge, aligned with indices.
+
+    :attr4 edge_ids: For adjacencies built by transpose, position of every edge in the original adjacency, else None.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.edge_ids: np.ndarray = None
+
+    @classmethod
+    def from_edges(
+        cls, n: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray
+    ):
+        """Builds adjacency for n nodes given parallel arrays of source indices, target indices and values."""
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+
+        return cls(
+            indptr,
+            np.asarray(targets, dtype=np.int32)[order],
+            np.asarray(weights, dtype=np.float64)[order],
+        )
 
     def __len__(self):
-        return self.len
+        return len(self.indices)
+
+    def neighbors(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (target indices, values) of edges leaving node i as views into the adjacency arrays."""
+        s, e = self.indptr[i], self.indptr[i + 1]
+        return self.indices[s:e], self.weights[s:e]
+
+    def degree(self) -> np.ndarray:
+        """Returns out-degree of every node."""
+        return np.diff(self.indptr)
 
-    def __getitem__(self, i: int):
-        return self.adj[i]
+    def sources(self) -> np.ndarray:
+        """Returns source node index of every edge, aligned with indices."""
+        return np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), self.degree())
 
-    def insert(self, e: Edge):
-        source, _ = e.edge
-        if source not in self.adj:
-            self.adj[source] = []
-        self.adj[source].append(e)
-        self.len += 1
+    def positions(self, nodes: np.ndarray) -> np.ndarray:
+        """Returns positions of every edge leaving the given nodes."""
+        starts = self.indptr[nodes]
+        return expand_ranges(starts, self.indptr[np.asarray(nodes) + 1] - starts)
 
-    def get_neighbors(self, id: int):
-        return [(e.edge[1], e.value) for e in self.adj[id]]
+    def transpose(self) -> "CSR":
+        """Returns adjacency with every edge reversed, such that neighbors(i) lists the nodes with an edge into i."""
+        reverse = CSR.from_edges(
+            len(self.indptr) - 1, self.indices, self.sources(), self.weights
+        )
+        reverse.edge_ids = np.argsort(self.indices.astype(np.int64), kind="stable")
+        return reverse
@@ -1,4 +1,9 @@
 from .util import *
+from .edge import CSR
+from .spatial import GridIndex, project
+from .landmarks import select_landmarks
+from .chains import Chains
+from .components import strongly_connected, weakly_connected, condense
 import numpy as np
 
 
@@ -6,25 +11,305 @@ class Graph:
     def __init__(self, graphmlFile: str):
         """Creates a graph given a graphml file with coordinate data from OSM.
 
+        Nodes are stored under dense indices 0..n-1 (sorted by OSM id) and edges are compiled into a CSR adjacency over those indices. Methods taking an `id` expect OSM ids, methods taking an `i` expect dense indices.
+
+        Strongly connected components are labeled on construction, largest first, see reachable. Methods snapping coordinates to nodes take a component, either a label of the component attribute or "largest", to only snap to nodes within it.
+
+        Edge values can be changed in place after construction with update, which bumps the version attribute.
+
         :param1 graphmlFile: filepath to .graphml file (default creates graph from 'data/sf.graphml')
         """
-        self.d = xml_to_dict(graphmlFile)
+        ids, coords, sources, targets, values = read_graphml(graphmlFile)
+
+        order = np.argsort(ids, kind="stable")
+        self.ids = ids[order]
+        self.coords = coords[order]
+
+        self.edges = self._compile_edges(sources, targets, values)
+        self.spatial = GridIndex(self.coords)
+        self.projected = project(self.coords)
+        self._reverse_edges = None
+
+        self.component = strongly_connected(self.edges)
+        self.weak_component = weakly_connected(self.edges)
+        self.component_edges = condense(self.edges, self.component)
+
+        self.landmarks: np.ndarray = None
+        self.landmark_from: np.ndarray = None
+        self.landmark_to: np.ndarray = None
+        self.landmark_tolerance = 0.0
+
+        self.chains: Chains = None
+
+        # live updates, see update
+        self.version = 0
+        self.base_weights: np.ndarray = None
+        self.multipliers: np.ndarray = None
+        self.blocked: np.ndarray = None
+        self.penalties: np.ndarray = None
+        self.avoided: np.ndarray = None
+        self.weight_floor = 1.0
+        self.landmark_floor = 1.0
+        self._landmark_multipliers: np.ndarray = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _compile_edges(self, sources, targets, values) -> CSR:
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        s, s_found = self._lookup(sources)
+        t, t_found = self._lookup(targets)
+        found = s_found & t_found
+        if not found.all():
+            print(
+                "Warning: Skipping {0} edges with endpoints missing from nodes".format(
+                    np.count_nonzero(~found)
+                )
+            )
+
+        return CSR.from_edges(len(self), s[found], t[found], values[found])
+
+    def _lookup(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (indices, found mask) given an array of OSM ids."""
+        i = np.searchsorted(self.ids, ids)
+        i[i == len(self.ids)] = 0
+        return i, self.ids[i] == ids
+
+    def index(self, id: int) -> int:
+        """Returns dense node index given OSM node id."""
+        return int(self.indices_of([id])[0])
+
+    def indices_of(self, ids) -> np.ndarray:
+        """Returns array of dense node indices given a sequence of OSM node ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        i, found = self._lookup(ids)
+        if not found.all():
+            raise KeyError(ids[~found][0])
+        return i
+
+    def closest_index(self, x: float, y: float, component: int | str = None) -> int:
+        """Returns dense node index given x, y cartesian coordinates, restricted to the given component if any."""
+        return int(self.closest_indices(x, y, component)[0])
+
+    def closest_indices(self, xs, ys, component: int | str = None) -> np.ndarray:
+        """Returns array of dense node indices given arrays of x and y cartesian coordinates, restricted to the given component if any."""
+        if component is None:
+            return self.spatial.nearest(xs, ys)
+
+        label = 0 if component == "largest" else component
+        if not 0 <= label < len(self.component_edges.indptr) - 1:
+            raise Exception("Unknown component %s." % component)
+        return self.spatial.nearest(xs, ys, self.component, label)
+
+    def closest_node(self, x: float, y: float, component: int | str = None) -> int:
+        """Returns node id given x, y cartesian coordinates, restricted to the given component if any."""
+        return int(self.ids[self.closest_index(x, y, component)])
+
+    def closest_nodes(self, xs, ys, component: int | str = None) -> np.ndarray:
+        """Returns array of node ids given arrays of x and y cartesian coordinates, restricted to the given component if any. Snaps all points in one vectorized lookup."""
+        return self.ids[self.closest_indices(xs, ys, component)]
+
+    def edge_positions(self, sources, targets) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (positions in edges, pair numbers) of every edge from sources[k] to targets[k] given arrays of node indices, including parallel edges. Raises KeyError with the OSM ids of the first pair without an edge."""
+        sources = np.asarray(sources, dtype=np.int64).reshape(-1)
+        targets = np.asarray(targets, dtype=np.int64).reshape(-1)
+        positions = self.edges.positions(sources)
+        pairs = np.repeat(np.arange(len(sources)), self.edges.degree()[sources])
+        match = self.edges.indices[positions] == targets[pairs]
+
+        found = np.zeros(len(sources), dtype=bool)
+        found[pairs[match]] = True
+        if not found.all():
+            k = np.flatnonzero(~found)[0]
+            raise KeyError((int(self.ids[sources[k]]), int(self.ids[targets[k]])))
+        return positions[match], pairs[match]
+
+    def update(
+        self,
+        edges: np.ndarray = None,
+        multipliers: np.ndarray = None,
+        block: np.ndarray = None,
+        unblock: np.ndarray = None,
+        penalties: np.ndarray = None,
+        avoided: np.ndarray = None,
+    ) -> tuple[np.ndarray, bool]:
+        """Changes edge values in place and bumps version, for live cost data such as danger levels that changes while the graph is in use. Reverse and contracted adjacencies are updated along, and lower bounds are scaled down if an edge became cheaper than it was when the graph (or the landmark tables) was built, so heuristics stay admissible.
+
+        Callers are responsible for keeping searches from running during an update, see Routes.update.
+
+        :param1 edges: Positions in edges of the edges to set multipliers of, see edge_positions (optional).
+        :param2 multipliers: Multiplier of each edge in edges relative to its value when the graph was created, replacing the multiplier set before. inf removes the edge (optional).
+        :param3 block: Node indices to block, every edge into or out of them is removed until they are unblocked (optional).
+        :param4 unblock: Node indices to unblock (optional).
+        :param5 penalties: Multiplier over nodes applied to the value of every edge into that node, replacing the penalties set before, see Routes.customize (optional).
+        :param6 avoided: Boolean mask over nodes, every edge into or out of them is removed, replacing the mask set before. Kept apart from blocked, so unblock never lifts it (optional).
+
+        :ret: tuple of (indices of nodes with a changed edge, True if any edge got cheaper)
+        """
+        if self.base_weights is None:
+            self.base_weights = self.edges.weights.copy()
+            self.multipliers = np.ones(len(self.edges))
+            self.blocked = np.zeros(len(self), dtype=bool)
+            self.penalties = np.ones(len(self))
+            self.avoided = np.zeros(len(self), dtype=bool)
+
+        if edges is not None:
+            multipliers = np.broadcast_to(
+                np.asarray(multipliers, dtype=np.float64), np.shape(edges)
+            )
+            if not (multipliers >= 0).all():
+                raise Exception("Edge multipliers must be non-negative numbers.")
+            self.multipliers[edges] = multipliers
+        if block is not None:
+            self.blocked[block] = True
+        if unblock is not None:
+            self.blocked[unblock] = False
+        if penalties is not None:
+            penalties = np.asarray(penalties, dtype=np.float64)
+            if not (penalties >= 0).all():
+                raise Exception("Node penalties must be non-negative numbers.")
+            self.penalties = penalties.copy()
+        if avoided is not None:
+            self.avoided = np.asarray(avoided, dtype=bool).copy()
 
-        self.points = get_points(self.d)
-        self.np_points = np.array([list(x) for x in self.points.values()])
-        self.np_ids = list(self.points.keys())
+        sources, targets = self.edges.sources(), self.edges.indices
+        multipliers = self._edge_multipliers()
+        with np.errstate(invalid="ignore"):
+            weights = np.where(
+                np.isinf(multipliers), np.inf, self.base_weights * multipliers
+            )
+        removed = self.blocked | self.avoided
+        weights[removed[sources] | removed[targets]] = np.inf
 
-        self.edges = get_edges(self.d)
+        old = self.edges.weights
+        changed = np.flatnonzero(weights != old)
+        cheaper = bool((weights[changed] < old[changed]).any())
+        old[:] = weights
+        if self._reverse_edges is not None:
+            self._reverse_edges.weights[:] = weights[self._reverse_edges.edge_ids]
+        if self.chains is not None:
+            self.chains.reweight()
+
+        self.weight_floor = min(1.0, float(multipliers.min(initial=1)))
+        self.landmark_floor = self._landmark_floor(multipliers)
+        self.version += 1
+        return np.unique(np.concatenate([sources[changed], targets[changed]])), cheaper
+
+    def _edge_multipliers(self) -> np.ndarray:
+        """Returns multiplier of every edge relative to its value when the graph was created, combining edge multipliers and penalties of the target nodes. inf where either removes the edge."""
+        penalties = self.penalties[self.edges.indices]
+        with np.errstate(invalid="ignore"):
+            multipliers = self.multipliers * penalties
+        multipliers[np.isinf(self.multipliers) | np.isinf(penalties)] = np.inf
+        return multipliers
+
+    def _landmark_floor(self, multipliers: np.ndarray) -> float:
+        """Returns smallest ratio between given edge multipliers and those the landmark tables were built with, capped at 1."""
+        if self._landmark_multipliers is None:
+            return self.weight_floor
+        ratio = np.divide(
+            multipliers,
+            self._landmark_multipliers,
+            out=np.ones(len(multipliers)),
+            where=self._landmark_multipliers > 0,
+        )
+        return min(1.0, float(np.nan_to_num(ratio, nan=1).min(initial=1)))
+
+    def reachable(self, i: int, j: int) -> bool:
+        """Returns whether there is a path from node index i to node index j, ignoring avoidance.
+
+        Components are labeled on construction, so this ignores edges removed by update and only rules pairs out. Answered in constant time from component labels, unless i and j lie in different strongly connected components of the same weakly connected one (one-way streets between them), which needs a search over the much smaller graph of components.
+        """
+        a, b = self.component[i], self.component[j]
+        if a == b:
+            return True
+        if self.weak_component[i] != self.weak_component[j]:
+            return False
+        return bool(self.reachable_components(a)[b])
 
-    def closest_node(self, x: float, y: float) -> int:
-        """Returns node id given x, y cartesian coordinates."""
-        dists = np.sum((self.np_points - np.asarray([[x, y]])) ** 2, axis=1)
-        return self.np_ids[np.argmin(dists)]
+    def reachable_components(self, label: int) -> np.ndarray:
+        """Returns boolean mask over component labels of the components reachable from the given one, including itself."""
+        edges = self.component_edges
+        seen = np.zeros(len(edges.indptr) - 1, dtype=bool)
+        seen[label] = True
+        frontier = np.asarray([label])
+        while len(frontier) > 0:
+            frontier = np.unique(edges.indices[edges.positions(frontier)])
+            frontier = frontier[~seen[frontier]]
+            seen[frontier] = True
+        return seen
 
     def get_coordinate(self, id: int) -> tuple[float, float]:
         """Returns coordinate of node in cartesian format (x, y) given node id."""
-        return self.points[id]
+        return tuple(self.coords[self.index(id)].tolist())
 
     def get_neighbors(self, id: int) -> list[tuple[int, float]]:
         """Returns list of tuples in the format (neighbor_id, value) given node id."""
-        return self.edges.get_neighbors(id)
+        indices, weights = self.neighbors(self.index(id))
+        return list(zip(self.ids[indices].tolist(), weights.tolist()))
+
+    def neighbors(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (neighbor indices, values) given node index. Both are views into the edge arrays and must not be modified."""
+        return self.edges.neighbors(i)
+
+    @property
+    def reverse_edges(self) -> CSR:
+        """Adjacency with every edge reversed. Built on first use and kept for the lifetime of the graph."""
+        if self._reverse_edges is None:
+            self._reverse_edges = self.edges.transpose()
+        return self._reverse_edges
+
+    def reverse_neighbors(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (predecessor indices, values) given node index, i.e. the nodes with an edge into i. Both are views into the reverse edge arrays."""
+        return self.reverse_edges.neighbors(i)
+
+    def straight_line_bound(self, target: int) -> np.ndarray:
+        """Returns lower bounds on the cost between every node and target from projected coordinates, in meters, scaled down by weight_floor if update made edges cheaper than their original values."""
+        delta = self.projected - self.projected[target]
+        bounds = np.hypot(delta[:, 0], delta[:, 1])
+        if self.weight_floor < 1:
+            bounds *= self.weight_floor
+        return bounds
+
+    def build_landmarks(self, count: int = 8):
+        """Picks count landmarks and stores float32 tables of distances from and to each of them, used for ALT (A*, landmarks, triangle inequality) lower bounds. Tables take 8 * count bytes per node and are saved with the graph."""
+        self.landmarks, self.landmark_from, self.landmark_to = select_landmarks(
+            self, count
+        )
+
+        # tables are float32, bounds give up a few ulps so they never overestimate
+        finite = self.landmark_from[np.isfinite(self.landmark_from)]
+        self.landmark_tolerance = 4 * float(np.spacing(finite.max(initial=0)))
+
+        # bounds hold until an update makes edges cheaper than they are now
+        if self.multipliers is not None:
+            self._landmark_multipliers = self._edge_multipliers()
+        self.landmark_floor = 1.0
+
+    def contract_chains(self):
+        """Collapses chains of degree-2 nodes into shortcut edges, which A* searches of Routes use instead of expanding every node along a street. Paths are unpacked back to the original nodes, and avoidance is still checked on every node of a shortcut. The contracted adjacency is saved with the graph."""
+        self.chains = Chains(self)
+
+    def landmark_bound(self, target: int, reverse=False) -> np.ndarray:
+        """Returns lower bounds on the cost from every node to target, or from target to every node if reverse, via the triangle inequality over landmarks. inf marks nodes with no path."""
+        if self.landmarks is None:
+            raise Exception("Need to call build_landmarks before using ALT bounds.")
+
+        d_from = self.landmark_from.astype(np.float64)
+        d_to = self.landmark_to.astype(np.float64)
+        with np.errstate(invalid="ignore"):
+            if reverse:
+                bounds = np.fmax(d_from - d_from[:, [target]], d_to[:, [target]] - d_to)
+            else:
+                bounds = np.fmax(d_from[:, [target]] - d_from, d_to - d_to[:, [target]])
+            bounds = np.fmax.reduce(bounds, axis=0)
+
+        bounds = np.maximum(
+            np.nan_to_num(bounds - self.landmark_tolerance, nan=0, posinf=np.inf), 0
+        )
+        if self.landmark_floor < 1:
+            bounds *= self.landmark_floor
+        return bounds
@@ -0,0 +1,243 @@
+import heapq
+import numpy as np
+
+
+class Hierarchy:
+    """Customizable contraction hierarchy over a Graph.
+
+    Building the hierarchy only depends on the graph's topology: nodes are ordered by greedy minimum degree and contracted in that order, connecting all higher ranked neighbors of each contracted node with a shortcut arc. Edge values are applied afterwards by customize, which is cheap enough to rerun whenever blocked or penalized nodes change, so avoidance updates never require re-contraction.
+
+    Every arc connects a lower ranked node u to a higher ranked node w and carries two values, up (u -> w) and down (w -> u), so one-way edges are preserved.
+
+    :attr1 rank: Contraction order of every node.
+
+    :attr2 up_ptr: Arcs of node u are up_idx[up_ptr[u]:up_ptr[u + 1]], sorted by rank of the higher node.
+
+    :attr3 parent: Lowest ranked higher neighbor of every node (elimination tree parent), -1 for roots.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        n = len(graph)
+
+        sources, targets = graph.edges.sources(), graph.edges.indices
+        adj = [set() for _ in range(n)]
+        for u, v in zip(sources.tolist(), targets.tolist()):
+            if u != v:
+                adj[u].add(v)
+                adj[v].add(u)
+
+        self.rank = np.full(n, -1, dtype=np.int64)
+        up = [None] * n
+        heap = [(len(a), v) for v, a in enumerate(adj)]
+        heapq.heapify(heap)
+        step = 0
+        while heap:
+            degree, v = heapq.heappop(heap)
+            if self.rank[v] >= 0 or degree != len(adj[v]):
+                continue
+            self.rank[v] = step
+            step += 1
+
+            up[v] = adj[v]
+            for u in up[v]:
+                a = adj[u]
+                a.discard(v)
+                a |= up[v]
+                a.discard(u)
+                heapq.heappush(heap, (len(a), u))
+            adj[v] = None
+
+        up = [sorted(a, key=self.rank.__getitem__) for a in up]
+        self.up_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in up], out=self.up_ptr[1:])
+        self.up_idx = np.fromiter(
+            (w for a in up for w in a), dtype=np.int32, count=self.up_ptr[-1]
+        )
+
+        lower = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.up_ptr))
+        keys = lower * n + self.up_idx
+        self.arc_perm = np.argsort(keys)
+        self.arc_keys = keys[self.arc_perm]
+
+        self.parent = np.full(n, -1, dtype=np.int64)
+        has_parent = np.diff(self.up_ptr) > 0
+        self.parent[has_parent] = self.up_idx[self.up_ptr[:-1][has_parent]]
+
+        # arcs of a node are final once every node below it in the elimination tree has been processed
+        level = np.zeros(n, dtype=np.int64)
+        for v in np.argsort(self.rank).tolist():
+            p = self.parent[v]
+            if p >= 0 and level[p] <= level[v]:
+                level[p] = level[v] + 1
+        self.level_nodes = np.argsort(level, kind="stable")
+        self.level_ptr = np.zeros(level.max(initial=0) + 2, dtype=np.int64)
+        np.cumsum(
+            np.bincount(level, minlength=len(self.level_ptr) - 1),
+            out=self.level_ptr[1:],
+        )
+
+        self.customize()
+
+    def __len__(self):
+        return len(self.up_idx)
+
+    def _arc(self, lower: np.ndarray, higher: np.ndarray) -> np.ndarray:
+        """Returns arc index given arrays of lower and higher ranked endpoints. Arcs must exist."""
+        keys = np.asarray(lower, dtype=np.int64) * len(self.rank) + higher
+        return self.arc_perm[np.searchsorted(self.arc_keys, keys)]
+
+    def customize(
+        self,
+        weights: np.ndarray = None,
+        blocked: np.ndarray = None,
+        penalties: np.ndarray = None,
+    ):
+        """Applies edge values to the hierarchy. New arc values are computed aside and replace the old ones once complete, so a query never sees a partly customized hierarchy's arrays being filled in.
+
+        :param1 weights: Value of every graph edge, aligned with graph.edges (default graph.edges.weights).
+        :param2 blocked: Boolean mask over nodes, edges into or out of a blocked node are removed (optional).
+        :param3 penalties: Multiplier over nodes, applied to the value of every edge into that node (optional).
+        """
+        sources, targets = self.graph.edges.sources(), self.graph.edges.indices
+        weights = self.graph.edges.weights if weights is None else weights
+        if penalties is not None:
+            weights = weights * penalties[targets]
+        if blocked is not None:
+            weights = np.where(blocked[sources] | blocked[targets], np.inf, weights)
+
+        up_w = np.full(len(self), np.inf)
+        down_w = np.full(len(self), np.inf)
+        up_mid = np.full(len(self), -1, dtype=np.int32)
+        down_mid = np.full(len(self), -1, dtype=np.int32)
+
+        loops = sources == targets
+        sources, targets, weights = sources[~loops], targets[~loops], weights[~loops]
+        is_up = self.rank[sources] < self.rank[targets]
+        arcs = self._arc(
+            np.where(is_up, sources, targets), np.where(is_up, targets, sources)
+        )
+        np.minimum.at(up_w, arcs[is_up], weights[is_up])
+        np.minimum.at(down_w, arcs[~is_up], weights[~is_up])
+
+        for l in range(len(self.level_ptr) - 1):
+            nodes = self.level_nodes[self.level_ptr[l] : self.level_ptr[l + 1]]
+            self._customize_triangles(nodes, up_w, down_w, up_mid, down_mid)
+        self.up_w, self.down_w = up_w, down_w
+        self.up_mid, self.down_mid = up_mid, down_mid
+
+    def _customize_triangles(
+        self,
+        nodes: np.ndarray,
+        up_w: np.ndarray,
+        down_w: np.ndarray,
+        up_mid: np.ndarray,
+        down_mid: np.ndarray,
+    ):
+        """Relaxes every arc (v, w) through u for each u in nodes and each pair v, w of its higher neighbors, in the given arc value and middle node arrays."""
+        starts, ends = self.up_ptr[nodes], self.up_ptr[nodes + 1]
+        counts = ends - starts
+        a = np.repeat(starts, counts) + (
+            np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        )
+
+        # pair every arc (u, v) with the arcs (u, w) after it, so rank v < rank w
+        partners = np.repeat(ends, counts) - 1 - a
+        b = (
+            np.repeat(a, partners)
+            + 1
+            + (
+                np.arange(partners.sum())
+                - np.repeat(np.cumsum(partners) - partners, partners)
+            )
+        )
+        a = np.repeat(a, partners)
+        if len(a) == 0:
+            return
+        c = self._arc(self.up_idx[a], self.up_idx[b])
+        u = np.repeat(np.repeat(nodes, counts), partners).astype(np.int32)
+
+        for w, mid, via in (
+            (up_w, up_mid, down_w[a] + up_w[b]),
+            (down_w, down_mid, down_w[b] + up_w[a]),
+        ):
+            improved = via < w[c]
+            np.minimum.at(w, c, via)
+            best = improved & (via == w[c])
+            mid[c[best]] = u[best]
+
+    def _ancestors(self, i: int) -> list[int]:
+        chain = []
+        while i >= 0:
+            chain.append(i)
+            i = int(self.parent[i])
+        return chain
+
+    def _upward(self, i: int, weights: np.ndarray):
+        """Returns (ancestors, distances, predecessor arcs) of the upward search from node i. Every node an upward search reaches is an ancestor of i, so the chain is relaxed in order without a priority queue."""
+        chain = self._ancestors(i)
+        dist = np.full(len(self.rank), np.inf)
+        dist[i] = 0
+        pred = np.full(len(self.rank), -1, dtype=np.int64)
+        for v in chain:
+            if dist[v] == np.inf:
+                continue
+            s, e = self.up_ptr[v], self.up_ptr[v + 1]
+            targets = self.up_idx[s:e]
+            via = dist[v] + weights[s:e]
+            better = np.flatnonzero(via < dist[targets])
+            dist[targets[better]] = via[better]
+            pred[targets[better]] = s + better
+        return np.asarray(chain), dist, pred
+
+    def query(self, source_id: int, destination_id: int):
+        """Returns (cost, list of node indices) of the best path between two node indices, or (inf, None) if there is none."""
+        _, dist_f, pred_f = self._upward(source_id, self.up_w)
+        chain, dist_b, pred_b = self._upward(destination_id, self.down_w)
+
+        # both upward searches only reach ancestors, so they can only meet on the destination's chain
+        costs = dist_f[chain] + dist_b[chain]
+        meet = int(chain[np.argmin(costs)])
+        best = float(costs.min())
+        if best == np.inf:
+            return np.inf, None
+
+        segments = []
+        v = meet
+        while v != source_id:
+            segments.append(self._unpack(pred_f[v], True))
+            v = segments[-1][0]
+        nodes = [source_id]
+        for segment in reversed(segments):
+            nodes += segment[1:]
+
+        v = meet
+        while v != destination_id:
+            segment = self._unpack(pred_b[v], False)
+            nodes += segment[1:]
+            v = segment[-1]
+        return best, nodes
+
+    def _lower(self, arc: int) -> int:
+        return int(np.searchsorted(self.up_ptr, arc, side="right") - 1)
+
+    def _unpack(self, arc: int, up: bool) -> list[int]:
+        """Returns original node indices along an arc in travel direction, from lower to higher node if up, else from higher to lower node."""
+        nodes = []
+        stack = [(arc, up)]
+        while stack:
+            arc, up = stack.pop()
+            lower, higher = self._lower(arc), int(self.up_idx[arc])
+            mid = int((self.up_mid if up else self.down_mid)[arc])
+            if mid < 0:
+                if not nodes:
+                    nodes.append(lower if up else higher)
+                nodes.append(higher if up else lower)
+                continue
+
+            to_lower, to_higher = self._arc([mid, mid], [lower, higher]).tolist()
+            if up:  # lower -> mid -> higher
+                stack += [(to_higher, True), (to_lower, False)]
+            else:  # higher -> mid -> lower
+                stack += [(to_lower, True), (to_higher, False)]
+        return nodes
@@ -0,0 +1,60 @@
+from .edge import CSR
+
+import heapq
+import math
+import numpy as np
+
+
+def dijkstra(edges: CSR, source: int) -> np.ndarray:
+    """Returns array of shortest distances from source to every node, inf if unreachable."""
+    indptr, indices, weights = (
+        edges.indptr.tolist(),
+        edges.indices.tolist(),
+        edges.weights.tolist(),
+    )
+    dist = [math.inf] * (len(indptr) - 1)
+    dist[source] = 0.0
+
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(indptr[u], indptr[u + 1]):
+            v, nd = indices[k], d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return np.asarray(dist)
+
+
+def select_landmarks(graph, count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Picks landmarks by farthest selection and computes their distance tables.
+
+    The first landmark is the node farthest from the graph's center, every following one is the node whose closest landmark is farthest away, which spreads landmarks over the periphery where they give the tightest bounds.
+
+    :ret: tuple of (landmark indices, float32 distances from each landmark to every node, float32 distances from every node to each landmark), tables have shape (count, n)
+    """
+    center = graph.coords.mean(axis=0)
+    reverse = graph.reverse_edges
+
+    landmarks = [int(np.argmax(np.sum((graph.coords - center) ** 2, axis=1)))]
+    d_from, d_to = [], []
+    closest = np.full(len(graph), np.inf)
+    while True:
+        d_from.append(dijkstra(graph.edges, landmarks[-1]))
+        d_to.append(dijkstra(reverse, landmarks[-1]))
+        if len(landmarks) >= min(count, len(graph)):
+            break
+
+        # distance to the closest landmark, in either direction
+        closest = np.minimum(closest, np.minimum(d_from[-1], d_to[-1]))
+        candidates = np.where(np.isfinite(closest), closest, -np.inf)
+        candidates[landmarks] = -np.inf
+        landmarks.append(int(np.argmax(candidates)))
+
+    return (
+        np.asarray(landmarks, dtype=np.int32),
+        np.asarray(d_from, dtype=np.float32),
+        np.asarray(d_to, dtype=np.float32),
+    )
@@ -0,0 +1,148 @@
+from .edge import expand_ranges
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8  # mean earth radius in meters
+
+# absorbs rounding of edge lengths and differences in earth radius between data sources
+PROJECTION_SLACK = 0.999
+
+
+def project(coords: np.ndarray) -> np.ndarray:
+    """Projects (x, y) geographic coordinates to planar (x, y) meters, such that straight-line distance between projected points never exceeds great-circle distance.
+
+    Uses an equirectangular projection scaled by the cosine of the latitude farthest from the equator, where meridians are closest together.
+    """
+    if len(coords) == 0:
+        return np.zeros((0, 2))
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    scale = EARTH_RADIUS * PROJECTION_SLACK
+    return np.column_stack((lon * np.cos(np.abs(lat).max()) * scale, lat * scale))
+
+
+class GridIndex:
+    """Uniform grid over node coordinates for nearest-node lookups.
+
+    Nodes are bucketed into square cells sized to hold a few nodes each. A lookup scans a block of cells around the query point and widens the block only while a closer node could still lie outside of it, so queries touch a near constant number of nodes regardless of graph size.
+
+    :attr1 coords: Array of node coordinates (x, y), indexed by dense node index.
+
+    :attr2 order: Node indices sorted by cell.
+
+    :attr3 cell_ptr: Nodes in flat cell c are order[cell_ptr[c]:cell_ptr[c + 1]]. Cells are flattened row-major, row = y.
+    """
+
+    def __init__(self, coords: np.ndarray, nodes_per_cell: float = 2):
+        self.coords = coords
+
+        self.origin = coords.min(axis=0) if len(coords) else np.zeros(2)
+        extent = (coords.max(axis=0) if len(coords) else np.ones(2)) - self.origin
+        extent = np.maximum(extent, np.finfo(np.float64).eps)
+
+        self.cell = max(
+            float(
+                np.sqrt(extent[0] * extent[1] * nodes_per_cell / max(len(coords), 1))
+            ),
+            float(extent.max()) / 4096,
+        )
+        self.shape = np.maximum(np.ceil(extent / self.cell).astype(np.int64), 1)
+
+        cells = self._flat(*self._cell(coords[:, 0], coords[:, 1]))
+        self.order = np.argsort(cells, kind="stable").astype(np.int32)
+        self.cell_ptr = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(cells, minlength=len(self.cell_ptr) - 1), out=self.cell_ptr[1:]
+        )
+
+    def _cell(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (column, row) of the cell containing each point, clipped to the grid."""
+        cx = np.floor((xs - self.origin[0]) / self.cell).astype(np.int64)
+        cy = np.floor((ys - self.origin[1]) / self.cell).astype(np.int64)
+        return np.clip(cx, 0, self.shape[0] - 1), np.clip(cy, 0, self.shape[1] - 1)
+
+    def _flat(self, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        return cy * self.shape[0] + cx
+
+    def _block(self, cx, cy, r) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (owner, node index) pairs for every node within r cells of each query cell."""
+        rows = cy[:, None] + np.arange(-r, r + 1)[None, :]
+        valid = (rows >= 0) & (rows < self.shape[1])
+        rows = np.clip(rows, 0, self.shape[1] - 1)
+
+        # cells in a row of the block are contiguous in flat order, so each row is a single range
+        lo = np.clip(cx - r, 0, self.shape[0] - 1)[:, None]
+        hi = np.clip(cx + r, 0, self.shape[0] - 1)[:, None]
+        starts = self.cell_ptr[self._flat(lo, rows)]
+        counts = np.where(valid, self.cell_ptr[self._flat(hi, rows) + 1] - starts, 0)
+
+        starts, counts = starts.ravel(), counts.ravel()
+        owner = np.repeat(np.repeat(np.arange(len(cx)), rows.shape[1]), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        return owner, self.order[np.repeat(starts, counts) + offsets]
+
+    def _clearance(self, xs, ys, cx, cy, r) -> np.ndarray:
+        """Returns squared distance from each point to the closest grid cell outside of its block. Every node outside of the block is at least this far away."""
+        hi = self.origin + self.shape * self.cell
+        outside = (
+            np.maximum(np.maximum(self.origin[0] - xs, xs - hi[0]), 0),
+            np.maximum(np.maximum(self.origin[1] - ys, ys - hi[1]), 0),
+        )
+
+        clearance = np.full(len(xs), np.inf)
+        for axis, (c, v) in enumerate(((cx, xs), (cy, ys))):
+            o, size = self.origin[axis], self.shape[axis]
+            across = outside[1 - axis] ** 2
+            below = np.maximum(v - (o + (c - r) * self.cell), 0) ** 2 + across
+            above = np.maximum(o + (c + r + 1) * self.cell - v, 0) ** 2 + across
+            clearance = np.minimum(clearance, np.where(c - r > 0, below, np.inf))
+            clearance = np.minimum(clearance, np.where(c + r < size - 1, above, np.inf))
+        return clearance
+
+    def box(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Returns indices of nodes in cells overlapping the box, a superset of the nodes inside of it."""
+        (cx0, cx1), (cy0, cy1) = self._cell(
+            np.asarray([xmin, xmax], dtype=np.float64),
+            np.asarray([ymin, ymax], dtype=np.float64),
+        )
+        rows = np.arange(cy0, cy1 + 1)
+        starts = self.cell_ptr[self._flat(cx0, rows)]
+        return self.order[
+            expand_ranges(starts, self.cell_ptr[self._flat(cx1, rows) + 1] - starts)
+        ]
+
+    def nearest(
+        self, xs, ys, labels: np.ndarray = None, label: int = None
+    ) -> np.ndarray:
+        """Returns index of the closest node to each point given arrays of x and y coordinates. If labels is given, only nodes with labels[node] == label are considered, and points get -1 if there are none."""
+        xs = np.atleast_1d(np.asarray(xs, dtype=np.float64))
+        ys = np.atleast_1d(np.asarray(ys, dtype=np.float64))
+        cx, cy = self._cell(xs, ys)
+
+        result = np.full(len(xs), -1, dtype=np.int64)
+        best = np.full(len(xs), np.inf)
+        pending = np.arange(len(xs))
+
+        r = 1
+        while len(pending) > 0:
+            owner, nodes = self._block(cx[pending], cy[pending], r)
+            if labels is not None:
+                candidate = labels[nodes] == label
+                owner, nodes = owner[candidate], nodes[candidate]
+            q = pending[owner]
+            dists = (self.coords[nodes, 0] - xs[q]) ** 2 + (
+                self.coords[nodes, 1] - ys[q]
+            ) ** 2
+
+            np.minimum.at(best, q, dists)
+            closest = dists == best[q]
+            result[q[closest]] = nodes[closest]
+
+            done = best[pending] <= self._clearance(
+                xs[pending], ys[pending], cx[pending], cy[pending], r
+            )
+            pending = pending[~done]
+            r *= 2
+
+        return result
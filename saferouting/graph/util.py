@@ -1,8 +1,8 @@
-from xml.dom import minidom
-from .edge import *
+from xml.etree import ElementTree
+from array import array
 
+import numpy as np
 import osmnx as ox
-import xmltodict
 
 
 def get_graph_from_osmid(osmid, filepath):
@@ -19,55 +19,110 @@ def get_graph_from_osmid(osmid, filepath):
     ox.save_graphml(graph, filepath)
 
 
-def xml_to_dict(graphmlFile):
-    d = {}
-    with open(graphmlFile) as fd:
-        d = xmltodict.parse(fd.read())
-    return d
-
-
-def get_points(d: dict) -> dict[int, tuple[float, float]]:
-    points = {}
-    nodes = d["graphml"]["graph"]["node"]
-    for node in nodes:
-        id = int(node["@id"])
-        x, y = None, None
-        for data in node["data"]:
-            if data["@key"] == "d5":
-                x = float(data["#text"])
-            elif data["@key"] == "d4":
-                y = float(data["#text"])
-        if x == None or y == None:
-            print(
-                "Warning: Skipping node {0} due to missing {1} coordinate".format(
-                    id, "x" if x == None else "" + "y" if y == None else ""
+# (element, attribute) pairs read from the file's <key> declarations
+GRAPHML_KEYS = {
+    "x": ("node", "x"),
+    "y": ("node", "y"),
+    "length": ("edge", "length"),
+}
+
+# optional, files without it get no reverse edges
+REVERSED_KEY = ("edge", "reversed")
+
+
+def _local(tag: str) -> str:
+    """Strips the XML namespace from a tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_graphml(graphmlFile):
+    """Reads an OSM graphml file in a single streaming pass.
+
+    Attribute ids are resolved from the file's <key> declarations, x, y and length are required and edges are only added in reverse as well if the file declares a reversed key. Each node and edge element is discarded once read, so memory is bounded by the output arrays.
+
+    :ret: tuple of (node ids, node coordinates (x, y), edge source ids, edge target ids, edge values) as numpy arrays, one edge entry per directed edge
+    """
+    keys = {}
+    ids, xs, ys = array("q"), array("d"), array("d")
+    sources, targets, values = array("q"), array("q"), array("d")
+
+    graph = None
+    for event, elem in ElementTree.iterparse(graphmlFile, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "graph":
+                graph = elem
+                missing = [k for k in GRAPHML_KEYS.values() if k not in keys]
+                if missing:
+                    raise Exception(
+                        "GraphML file is missing key declarations for {0}".format(
+                            ", ".join("{0} {1}".format(*k) for k in missing)
+                        )
+                    )
+                x_key, y_key, length_key = (
+                    keys[GRAPHML_KEYS[k]] for k in ("x", "y", "length")
                 )
-            )
+                reversed_key = keys.get(REVERSED_KEY)
             continue
-        points[id] = (x, y)
-    return points
-
-
-def get_edges(d: dict) -> Edges:
-    edges = []
-    d_edges = d["graphml"]["graph"]["edge"]
-    for edge in d_edges:
-        source, target = int(edge["@source"]), int(edge["@target"])
-        value = None
-        reversed = False
-        for data in edge["data"]:
-            if data["@key"] == "d13":
-                value = float(data["#text"])
-            if data["@key"] == "d12" and data["#text"] == "True":
-                reversed = True
-        if value == None:
-            print(
-                "Warning: Skipping edge ({0}, {1}) due to missing value".format(
-                    source, target
+
+        if tag == "key":
+            keys[(elem.get("for"), elem.get("attr.name"))] = elem.get("id")
+
+        elif tag == "node":
+            id = int(elem.get("id"))
+            x, y = None, None
+            for data in elem:
+                key = data.get("key")
+                if key == x_key:
+                    x = float(data.text)
+                elif key == y_key:
+                    y = float(data.text)
+            if x == None or y == None:
+                print(
+                    "Warning: Skipping node {0} due to missing {1} coordinate".format(
+                        id, "x" if x == None else "y"
+                    )
                 )
-            )
-            continue
-        edges.append(Edge(source, target, value))
-        if reversed:
-            edges.append(Edge(target, source, value))
-    return Edges(edges)
+            else:
+                ids.append(id)
+                xs.append(x)
+                ys.append(y)
+            graph.clear()
+
+        elif tag == "edge":
+            source, target = int(elem.get("source")), int(elem.get("target"))
+            value = None
+            reversed = False
+            for data in elem:
+                key = data.get("key")
+                if key == length_key:
+                    value = float(data.text)
+                elif (
+                    reversed_key is not None
+                    and key == reversed_key
+                    and data.text == "True"
+                ):
+                    reversed = True
+            if value == None:
+                print(
+                    "Warning: Skipping edge ({0}, {1}) due to missing value".format(
+                        source, target
+                    )
+                )
+            else:
+                sources.append(source)
+                targets.append(target)
+                values.append(value)
+                if reversed:
+                    sources.append(target)
+                    targets.append(source)
+                    values.append(value)
+            graph.clear()
+
+    return (
+        np.frombuffer(ids, dtype=np.int64),
+        np.column_stack((np.frombuffer(xs), np.frombuffer(ys))),
+        np.frombuffer(sources, dtype=np.int64),
+        np.frombuffer(targets, dtype=np.int64),
+        np.frombuffer(values),
+    )
@@ -0,0 +1,21 @@
+def vectorized(handler=None, batch: int = None):
+    """Marks a level handler as vectorized. Use as @vectorized or @vectorized(batch=64).
+
+    Vectorized handlers are called as handler(neighbors, coords, costs, current, source_id, destination_id, graph), where every position k describes one edge from node index current[k] to node index neighbors[k] with value costs[k], and coords holds the (x, y) coordinates of neighbors. source_id and destination_id are node indices, use graph.ids to translate indices to OSM ids.
+
+    The handler returns either a boolean mask of neighbors to keep or an array of cost multipliers, where an infinite multiplier removes the neighbor. Multipliers below 1 can make A* return suboptimal routes.
+
+    :param1 handler: Function to mark.
+    :param2 batch: If given, the handler is called once for up to batch queued nodes at a time instead of once per expanded node, so current can hold several node indices (optional).
+    """
+
+    def mark(handler):
+        handler.vectorized = True
+        handler.batch = batch
+        return handler
+
+    return mark if handler is None else mark(handler)
+
+
+def is_vectorized(handler) -> bool:
+    return getattr(handler, "vectorized", False)
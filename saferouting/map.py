@@ -23,9 +23,8 @@ class Map:
         self.points += points
 
     def check_bounds(self, x, y):
-        if self.bounds == None or (
-            self.bounds[0][0] <= x <= self.bounds[1][0]
-            or self.bounds[0][1] <= y <= self.bounds[1][1]
-        ):
+        """Returns whether (x, y) lies within bounds, or True if there are none. Corners may be given in any order, though bounds are meant to go from top-left to bottom-right."""
+        if self.bounds == None:
             return True
-        return False
+        (x0, y0), (x1, y1) = self.bounds
+        return min(x0, x1) <= x <= max(x0, x1) and min(y0, y1) <= y <= max(y0, y1)
@@ -0,0 +1,160 @@
+from bisect import bisect_left
+
+import math
+import threading
+
+# upper bounds of latency buckets, in seconds
+TIME_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# upper bounds of node count buckets
+COUNT_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def render(self) -> list[str]:
+        return [
+            "# HELP %s %s" % (self.name, self.help),
+            "# TYPE %s counter" % self.name,
+            "%s %s" % (self.name, _format(self.value)),
+        ]
+
+
+class Histogram:
+    """Counts observations into cumulative buckets given by their upper bounds."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float]):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    def render(self) -> list[str]:
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        lines = [
+            "# HELP %s %s" % (self.name, self.help),
+            "# TYPE %s histogram" % self.name,
+        ]
+        cumulative = 0
+        for bound, count in zip(self.buckets + [math.inf], counts):
+            cumulative += count
+            lines.append(
+                '%s_bucket{le="%s"} %d' % (self.name, _format(bound), cumulative)
+            )
+        lines.append("%s_sum %s" % (self.name, _format(total)))
+        lines.append("%s_count %d" % (self.name, cumulative))
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text exposition format. Metrics are created on first use and returned by name afterwards."""
+
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram] = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(name, lambda: Counter(name, help))
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple[float] = TIME_BUCKETS
+    ) -> Histogram:
+        return self._get(name, lambda: Histogram(name, help, buckets))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+    def _get(self, name: str, create):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = create()
+            return self.metrics[name]
+
+
+# registry routes record into, exposed by the API's /metrics endpoint
+REGISTRY = Registry()
+
+
+def observe(misc: dict, registry: Registry = REGISTRY):
+    """Records the stats of one answered query given Route.misc."""
+    registry.counter("routing_queries_total", "Answered route queries.").inc()
+    if misc.get("cache_hit"):
+        registry.counter(
+            "routing_cache_hits_total", "Queries served from the route cache."
+        ).inc()
+    else:
+        registry.counter(
+            "routing_cache_misses_total", "Queries that ran a search."
+        ).inc()
+    if "error" in misc:
+        registry.counter(
+            "routing_errors_total", "Queries answered with an error."
+        ).inc()
+
+    for key, name, help in (
+        (
+            "snap_ms",
+            "routing_snap_seconds",
+            "Time spent snapping coordinates to nodes.",
+        ),
+        (
+            "search_ms",
+            "routing_search_seconds",
+            "Time spent searching, excluding snapping.",
+        ),
+        ("handler_ms", "routing_handler_seconds", "Time spent inside level_handler."),
+    ):
+        if key in misc:
+            registry.histogram(name, help).observe(misc[key] / 1000)
+
+    if "path_nodes" in misc:
+        registry.histogram(
+            "routing_path_nodes", "Nodes on the returned path.", COUNT_BUCKETS
+        ).observe(misc["path_nodes"])
+
+    for key, name, help in (
+        ("expanded", "routing_expanded_nodes", "Nodes expanded per search."),
+        ("pushes", "routing_heap_pushes", "Heap pushes per search."),
+    ):
+        if key in misc and not misc.get("cache_hit"):
+            registry.histogram(name, help, COUNT_BUCKETS).observe(misc[key])
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
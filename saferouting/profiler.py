@@ -0,0 +1,104 @@
+from collections import Counter
+from contextlib import contextmanager
+
+import itertools
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """Samples the call stack of a thread while it answers a query, and reports queries slower than a threshold.
+
+    Samples are taken from one background thread, started with the first query and shared by all queries running at once, so the query itself runs unmodified and profiling costs no thread per query. Reports are in collapsed stack format, one "outer;...;inner count" line per distinct stack, which flame graph tools read directly.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 500,
+        interval_ms: float = 5,
+        report=None,
+        max_depth: int = 64,
+    ):
+        """Initializes profiler, pass it to Routes to profile get_path.
+
+        :param1 threshold_ms: Queries taking at least this long are reported (default 500).
+        :param2 interval_ms: Time between samples (default 5).
+        :param3 report: Function called with (name, elapsed ms, collapsed stacks) for every slow query (default prints the report).
+        :param4 max_depth: Frames kept per sample, innermost first (default 64).
+        """
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.interval = interval_ms / 1000
+        self._report = report
+        self.report = report or self.print_report
+        self.max_depth = max_depth
+        # queries being sampled, by a key of their own: (thread id, samples)
+        self.active: dict[int, tuple[int, Counter]] = {}
+        self.keys = itertools.count()
+        self.lock = threading.Condition()
+        self.sampler: threading.Thread = None
+
+    def __getstate__(self):
+        return {
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": self.interval_ms,
+            "report": self._report,
+            "max_depth": self.max_depth,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @contextmanager
+    def sample(self, name: str = "query"):
+        """Samples the calling thread for the duration of the with block."""
+        key, samples = next(self.keys), Counter()
+        with self.lock:
+            self.active[key] = (threading.get_ident(), samples)
+            # a forked process inherits the thread object but not the thread
+            if self.sampler is None or not self.sampler.is_alive():
+                self.sampler = threading.Thread(target=self._run, daemon=True)
+                self.sampler.start()
+            self.lock.notify()
+        s = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - s) * 1000
+            with self.lock:
+                del self.active[key]
+            if elapsed >= self.threshold_ms:
+                self.report(name, elapsed, self.collapse(samples))
+
+    def _run(self):
+        """Samples every active query once per interval, and sleeps while there are none."""
+        while True:
+            with self.lock:
+                while not self.active:
+                    self.lock.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, samples in self.active.values():
+                    samples[self._stack(frames.get(thread_id))] += 1
+
+    def _stack(self, frame) -> str:
+        """Returns collapsed stack of a frame, outermost first."""
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append("%s:%s" % (os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    @staticmethod
+    def collapse(samples: Counter) -> str:
+        return "\n".join("%s %d" % s for s in samples.most_common())
+
+    @staticmethod
+    def print_report(name: str, elapsed: float, stacks: str):
+        print(
+            "Slow {} took {:.3f} ms, sampled stacks:\n{}".format(name, elapsed, stacks)
+        )
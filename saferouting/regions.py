@@ -0,0 +1,277 @@
+from .map import Map
+from .routes import Routes
+
+from collections import OrderedDict
+from typing import Callable
+
+import os
+import threading
+
+
+def footprint(filepath: str) -> int:
+    """Returns size in bytes of a serialized routes object, either a pickle or an array directory, used as an estimate of the memory it takes once loaded."""
+    if not os.path.isdir(filepath):
+        return os.path.getsize(filepath)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(filepath)
+        for name in names
+    )
+
+
+class UpdateLog:
+    """Live cost updates merged into the state they leave behind, so a routes object loaded after them can catch up with a single Routes.update call.
+
+    :attr1 multipliers: Latest multiplier of every updated edge, keyed by (source node id, target node id).
+
+    :attr2 blocked: Node ids blocked and not unblocked since.
+
+    :attr3 unblocked: Node ids unblocked and not blocked since.
+    """
+
+    def __init__(self):
+        self.multipliers: dict[tuple[int, int], float] = {}
+        self.blocked: set[int] = set()
+        self.unblocked: set[int] = set()
+
+    def __bool__(self):
+        return bool(self.multipliers or self.blocked or self.unblocked)
+
+    def add(
+        self,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ):
+        """Merges an update, see Routes.update for the parameters."""
+        blocked, unblocked = set(blocked or []), set(unblocked or [])
+        self.multipliers |= multipliers or {}
+        self.blocked = (self.blocked | blocked) - unblocked
+        self.unblocked = (self.unblocked | unblocked) - blocked
+
+    def replay(self) -> dict:
+        """Returns keyword arguments of Routes.update applying every update so far."""
+        return {
+            "multipliers": dict(self.multipliers),
+            "blocked": sorted(self.blocked),
+            "unblocked": sorted(self.unblocked),
+        }
+
+
+class Region:
+    """Region served by a RegionRegistry.
+
+    :attr1 name: Name of the region.
+
+    :attr2 map: Map without a graph holding the bounds of the region, used to dispatch queries before the region is loaded.
+
+    :attr3 serialized_filepath: Routes object of the region, as written by Routes.save.
+
+    :attr4 cache_filepath: Precomputed routes loaded on load, see Routes.load_cache (optional).
+
+    :attr5 routes: Routes object while the region is loaded, else None.
+
+    :attr6 size: Estimated memory taken by the loaded region, see footprint, and by resources attached to it, see RegionRegistry.attach.
+
+    :attr7 updates: Live cost updates, replayed when the region is loaded.
+
+    :attr8 attached: (size, release function) of every resource attached to the loaded region.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        bounds: tuple[tuple[float, float], tuple[float, float]],
+        serialized_filepath: str,
+        cache_filepath: str = None,
+    ):
+        self.name = name
+        self.map = Map(None, bounds)
+        self.serialized_filepath = serialized_filepath
+        self.cache_filepath = cache_filepath
+        self.routes: Routes = None
+        self.size = 0
+        self.updates = UpdateLog()
+        self.attached: list[tuple[int, Callable[[], None]]] = []
+        self.lock = threading.Lock()
+
+    def contains(self, points: list[tuple[float, float]]) -> bool:
+        """Returns whether every (x, y) point lies within the bounds of the region."""
+        return all(self.map.check_bounds(x, y) for x, y in points)
+
+    def area(self) -> float:
+        """Returns area of the bounds in squared degrees, inf if the region is unbounded."""
+        if self.map.bounds is None:
+            return float("inf")
+        (x0, y0), (x1, y1) = self.map.bounds
+        return abs(x1 - x0) * abs(y1 - y0)
+
+
+class RegionRegistry:
+    """Routes objects of several regions, such as metro areas, loaded on first use and evicted in least recently used order once their estimated memory exceeds a budget.
+
+    Queries are dispatched to the smallest region whose bounds contain all of their points. Evicting a region only drops the registry's reference, queries still running on it finish normally.
+
+    :attr1 regions: Registered regions by name, in registration order.
+
+    :attr2 loaded: Names of loaded regions, least recently used first.
+
+    :attr3 loads: Number of times a region was loaded.
+
+    :attr4 evictions: Number of times a region was evicted.
+    """
+
+    def __init__(self, memory_budget: int = None):
+        """Initializes empty registry, add regions with add.
+
+        :param1 memory_budget: Largest estimated memory in bytes of all loaded regions together, see footprint. The region being queried is always kept loaded, even if it alone exceeds the budget (optional).
+        """
+        self.memory_budget = memory_budget
+        self.regions: dict[str, Region] = {}
+        self.loaded: OrderedDict[str, None] = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __contains__(self, name: str):
+        return name in self.regions
+
+    def add(
+        self,
+        name: str,
+        bounds: tuple[tuple[float, float], tuple[float, float]],
+        serialized_filepath: str,
+        cache_filepath: str = None,
+    ):
+        """Registers a region without loading it.
+
+        :param1 name: Name of the region.
+        :param2 bounds: Bounds of the region given points from top-left to bottom-right in cartesian format, None for a region covering everything.
+        :param3 serialized_filepath: Routes object of the region, as written by Routes.save.
+        :param4 cache_filepath: Precomputed routes loaded along with the region, see saferouting.warmup (optional).
+        """
+        if name in self.regions:
+            raise Exception("Region %s is already registered." % name)
+        self.regions[name] = Region(name, bounds, serialized_filepath, cache_filepath)
+
+    def region_of(self, *points: tuple[float, float]) -> str:
+        """Returns name of the smallest region containing every given (x, y) point, or None if there is none."""
+        regions = [r for r in self.regions.values() if r.contains(points)]
+        if not regions:
+            return None
+        return min(regions, key=Region.area).name
+
+    def routes_for(self, *points: tuple[float, float]) -> Routes:
+        """Returns routes object of the region containing every given (x, y) point, see region_of, loading it if needed, or None if no region contains them."""
+        name = self.region_of(*points)
+        return None if name is None else self.get(name)
+
+    def get(self, name: str) -> Routes:
+        """Returns routes object of a region given its name, loading it on first use and evicting least recently used regions to stay within memory_budget."""
+        region = self.regions[name]
+        with region.lock:
+            routes = loaded = region.routes
+            if routes is None:
+                routes = self._load(region)
+
+            with self.lock:
+                if loaded is None:
+                    self.loads += 1
+                # also reattaches routes if another query evicted the region since
+                region.routes = routes
+                self.loaded[name] = None
+                self.loaded.move_to_end(name)
+                self._evict(keep=name)
+        return routes
+
+    def prewarm(self, names: list[str] = None):
+        """Loads the given regions, or every region if no names are given, in order. Regions loaded later evict earlier ones if they don't fit in memory_budget together."""
+        for name in self.regions if names is None else names:
+            self.get(name)
+
+    def attach(self, name: str, size: int, release: Callable[[], None]):
+        """Attaches resources held for a loaded region, such as worker processes, so they count against memory_budget along with it and are released when it is unloaded. If the region is not loaded, they are released right away.
+
+        :param1 name: Name of the region.
+        :param2 size: Estimated memory taken by the resources in bytes.
+        :param3 release: Function freeing the resources, called once.
+        """
+        region = self.regions[name]
+        with self.lock:
+            if name in self.loaded:
+                region.size += size
+                region.attached.append((size, release))
+                self._evict(keep=name)
+                return
+        release()
+
+    def evict(self, name: str):
+        """Unloads a region given its name, it is loaded again on next use."""
+        with self.lock:
+            if name in self.loaded:
+                self._unload(name)
+
+    def update(
+        self,
+        name: str,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ) -> int:
+        """Applies live cost updates to a region, see Routes.update for the parameters. Updates are also kept in the region and replayed whenever it is loaded again. The region is loaded if needed to check the update first, which raises KeyError on unknown nodes and edges without keeping anything, so replaying never fails.
+
+        :ret: graph version of the region after the update, or None if it was evicted meanwhile
+        """
+        region = self.regions[name]
+        self.get(name).check_update(multipliers, blocked, unblocked)
+        with region.lock:
+            version = None
+            if region.routes is not None:
+                version = region.routes.update(multipliers, blocked, unblocked)
+            region.updates.add(multipliers, blocked, unblocked)
+            return version
+
+    def stats(self) -> dict:
+        """Returns loaded regions, their estimated memory and counters as a dict."""
+        with self.lock:
+            return {
+                "loaded": list(self.loaded),
+                "bytes": sum(self.regions[name].size for name in self.loaded),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def _load(self, region: Region) -> Routes:
+        routes = Routes(serialized_filepath=region.serialized_filepath)
+        if region.cache_filepath:
+            routes.load_cache(region.cache_filepath)
+        # updates are checked when accepted, see update
+        if region.updates:
+            routes.update(**region.updates.replay())
+        region.size = footprint(region.serialized_filepath)
+        return routes
+
+    def _evict(self, keep: str):
+        if self.memory_budget is None:
+            return
+        total = sum(self.regions[name].size for name in self.loaded)
+        for name in list(self.loaded):
+            if total <= self.memory_budget:
+                break
+            if name != keep:
+                total -= self.regions[name].size
+                self._unload(name)
+
+    def _unload(self, name: str):
+        del self.loaded[name]
+        region = self.regions[name]
+        region.routes = None
+        # the routes object may be reattached by a query that got it before, see get
+        for size, release in region.attached:
+            region.size -= size
+            release()
+        region.attached = []
+        self.evictions += 1
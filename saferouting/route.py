@@ -1,4 +1,88 @@
+from .graph.spatial import project
+
 import json
+import struct
+
+import numpy as np
+
+# reused encoder, compact separators and no per-call setup
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+# decimal places of coordinates in text encodings, formatting fixed decimals is much faster than float repr
+COORDINATE_FORMAT = "[%.7f,%.7f]"
+
+# binary layout: magic, flags (bit 0 set if node ids follow), point count, cost, time
+BINARY_MAGIC = b"SRB1"
+BINARY_HEADER = struct.Struct("<4sBIdd")
+
+# coordinates are stored as int32 multiples of 1e-7 degrees (about 1 cm)
+BINARY_SCALE = 10**7
+
+# content types of each encoding, see Route.encode
+CONTENT_TYPES = {
+    "json": "application/json",
+    "polyline": "application/json",
+    "geojson": "application/geo+json",
+    "binary": "application/octet-stream",
+}
+
+
+def _encode_path(path: list[tuple[float, float]]) -> str:
+    return "[" + ",".join([COORDINATE_FORMAT % p for p in path]) + "]"
+
+
+def encode_polyline(points: np.ndarray, precision: int = 5) -> str:
+    """Encodes (x, y) points with the encoded polyline algorithm format, which stores (latitude, longitude) deltas as base64-like characters."""
+    scaled = np.round(np.asarray(points)[:, ::-1] * 10**precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    values = (deltas << 1).ravel()
+    values = np.where(values < 0, ~values, values)
+
+    chars = []
+    for v in values.tolist():
+        while v >= 0x20:
+            chars.append(chr((0x20 | (v & 0x1F)) + 63))
+            v >>= 5
+        chars.append(chr(v + 63))
+    return "".join(chars)
+
+
+def decode_polyline(polyline: str, precision: int = 5) -> list[tuple[float, float]]:
+    """Decodes encoded polyline to a list of (x, y) points."""
+    values, v, shift = [], 0, 0
+    for c in polyline:
+        b = ord(c) - 63
+        v |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(v >> 1) if v & 1 else v >> 1)
+            v, shift = 0, 0
+    coords = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return list(map(tuple, (coords[:, ::-1] / 10**precision).tolist()))
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Returns indices of points kept by Douglas-Peucker simplification, such that no dropped point is farther than tolerance from the simplified line. Endpoints are always kept."""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        segment = points[b] - points[a]
+        offsets = points[a + 1 : b] - points[a]
+        length = segment @ segment
+        t = np.clip(offsets @ segment / length, 0, 1) if length > 0 else 0
+        distances = np.hypot(*(offsets - np.multiply.outer(t, segment)).T)
+
+        k = int(np.argmax(distances))
+        if distances[k] > tolerance:
+            keep[a + 1 + k] = True
+            stack += [(a, a + 1 + k), (a + 1 + k, b)]
+    return np.flatnonzero(keep)
 
 
 class Route:
@@ -11,6 +95,8 @@ class Route:
     :attr3 cost: Cost of traversing this path.
 
     :attr4 time: Time in ms to query this route. If -1, time is unknown (default -1).
+
+    :attr5 misc: Any other keyword arguments, such as an error message and the query stats recorded by Routes.get_path.
     """
 
     def __init__(
@@ -33,15 +119,115 @@ class Route:
     def __len__(self):
         return len(self.nodes)
 
-    def json(self):
-        """Returns Route object as a JSON string."""
-
-        _ = {}
-        _["path"] = self.path
-        _["nodes"] = self.nodes
-        _["cost"] = self.cost
-        _["length"] = len(self)
-        _["time"] = self.time
-        for i in self.misc:
-            _[i] = self.misc[i]
-        return json.dumps(_)
+    def _fields(self) -> str:
+        """Returns cost, length, time and misc as JSON object members."""
+        fields = ',"cost":%s,"length":%d,"time":%s' % (
+            _encode(self.cost),
+            len(self),
+            _encode(self.time),
+        )
+        if self.misc:
+            fields += "," + _encode(self.misc)[1:-1]
+        return fields
+
+    def json(self, nodes=True) -> str:
+        """Returns Route object as a JSON string. Coordinates are rounded to 7 decimal places (about 1 cm).
+
+        :param1 nodes: If False, leaves out node ids (default True).
+        """
+        return (
+            '{"path":'
+            + _encode_path(self.path)
+            + (',"nodes":' + _encode(self.nodes) if nodes else "")
+            + self._fields()
+            + "}"
+        )
+
+    def polyline(self, nodes=True, precision: int = 5) -> str:
+        """Returns Route object as a JSON string, with path stored as an encoded polyline (see encode_polyline) under "polyline" instead of a coordinate list.
+
+        :param1 nodes: If False, leaves out node ids (default True).
+        :param2 precision: Decimal places of coordinates kept (default 5, about 1 m).
+        """
+        return (
+            '{"polyline":'
+            + _encode(encode_polyline(self.path, precision) if self.path else "")
+            + (',"nodes":' + _encode(self.nodes) if nodes else "")
+            + self._fields()
+            + "}"
+        )
+
+    def geojson(self, nodes=True) -> str:
+        """Returns Route object as a GeoJSON Feature with a LineString geometry, everything else is stored in its properties.
+
+        :param1 nodes: If False, leaves out node ids (default True).
+        """
+        return (
+            '{"type":"Feature","geometry":{"type":"LineString","coordinates":'
+            + _encode_path(self.path)
+            + '},"properties":{'
+            + ('"nodes":' + _encode(self.nodes) if nodes else '"nodes":null')
+            + self._fields()
+            + "}}"
+        )
+
+    def binary(self, nodes=True) -> bytes:
+        """Returns path, cost and time (and node ids if nodes) in a compact binary form, read back with Route.from_binary.
+
+        Layout, little endian: BINARY_HEADER (magic, flags, point count, cost, time), then int32 (x, y) pairs in units of 1 / BINARY_SCALE degrees, then int64 node ids if flags & 1. Other fields of misc are not included.
+        """
+        coords = np.round(np.asarray(self.path).reshape(-1, 2) * BINARY_SCALE)
+        data = (
+            BINARY_HEADER.pack(
+                BINARY_MAGIC, int(nodes), len(coords), self.cost, self.time
+            )
+            + coords.astype("<i4").tobytes()
+        )
+        if nodes:
+            data += np.asarray(self.nodes, dtype="<i8").tobytes()
+        return data
+
+    @classmethod
+    def from_binary(cls, data: bytes) -> "Route":
+        magic, flags, n, cost, time = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC:
+            raise Exception("Not a binary route.")
+        offset = BINARY_HEADER.size
+        coords = np.frombuffer(data, dtype="<i4", count=2 * n, offset=offset)
+        nodes = []
+        if flags & 1:
+            nodes = np.frombuffer(
+                data, dtype="<i8", count=n, offset=offset + 8 * n
+            ).tolist()
+        path = list(map(tuple, (coords.reshape(-1, 2) / BINARY_SCALE).tolist()))
+        return cls(path, nodes, cost, time)
+
+    def simplify(self, tolerance: float) -> "Route":
+        """Returns copy of route with path points removed by Douglas-Peucker simplification, keeping the node ids of the remaining points. Cost and time are unchanged.
+
+        :param1 tolerance: Largest distance in meters between a removed point and the simplified path.
+        """
+        if len(self.path) < 3:
+            return self
+        kept = simplify(project(np.asarray(self.path)), tolerance).tolist()
+        return Route(
+            [self.path[i] for i in kept],
+            [self.nodes[i] for i in kept],
+            self.cost,
+            self.time,
+            **self.misc
+        )
+
+    def encode(
+        self, encoding: str = "json", nodes=True, tolerance: float = None
+    ) -> str | bytes:
+        """Returns route in the given encoding, see CONTENT_TYPES for matching content types.
+
+        :param1 encoding: "json", "polyline", "geojson" or "binary" (default "json").
+        :param2 nodes: If False, leaves out node ids (default True).
+        :param3 tolerance: If given, simplifies the path with this tolerance in meters first (optional).
+        """
+        if encoding not in CONTENT_TYPES:
+            raise Exception("Unknown encoding %s." % encoding)
+        route = self if tolerance is None else self.simplify(tolerance)
+        return getattr(route, encoding)(nodes=nodes)
@@ -1,12 +1,21 @@
 from .map import Map
-from .util import FHeap
+from .util import FHeap, ReadWriteLock
 from .route import Route
-from .graph import Graph
-from . import serialize
-from haversine import haversine
+from .graph import Graph, Hierarchy, CompiledGraph
+from .zones import Zones, convex_hull
+from .cache import RouteCache
+from .handlers import is_vectorized
+from .profiler import SamplingProfiler
+from . import metrics, serialize
 
 from typing import Callable
 
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import hashlib
 import time
 import math
 import types
@@ -28,13 +37,21 @@ class Routes(Map):
             ],
             list[float, float],
         ] = None,
+        heuristic: str = "haversine",
+        cache: RouteCache = None,
+        profiler: SamplingProfiler = None,
+        component: int | str = None,
     ):
         """Initializes routes object. Requires either graph or serialized_filepath to create base map. Given both, it defaults to serialized routes object.
 
         :param1 graph: Graph to create map from (Optional given serialized_filepath).
-        :param2 serialized_filepath: Filepath containing serialized routes, used to retrieve object via deserialization (Optional given graph).
+        :param2 serialized_filepath: Filepath containing serialized routes, either a pickle or an array directory written by Routes.save, used to retrieve object via deserialization (Optional given graph).
         :param3 bounds: Bounds for map given points from top-left to bottom-right in cartesian format (optional).
-        :param4 level_handler: Function outputting set of valid points given (neighbor_ids, current_id, source_id, destination_id, graph) for point avoidance. Use Graph.get_coordinate function to get (x, y) tuple (optional). **Warning: Don't make this a lambda, it won't be saved on serialization.**
+        :param4 level_handler: Function outputting set of valid points given (neighbor_ids, current_id, source_id, destination_id, graph) for point avoidance. Use Graph.get_coordinate function to get (x, y) tuple. Handlers marked with saferouting.vectorized are called with NumPy arrays instead, see its docstring (optional). **Warning: Don't make this a lambda, it won't be saved on serialization.**
+        :param5 heuristic: Default A* heuristic, either "haversine" (straight-line distance) or "alt" (landmark bounds, requires Graph.build_landmarks) (default "haversine").
+        :param6 cache: Cache for answered routes, use RouteCache(max_entries=0) to disable caching (default RouteCache()).
+        :param7 profiler: Samples get_path searches and reports slow ones (optional).
+        :param8 component: Only snap query coordinates to nodes of this strongly connected component, "largest" keeps queries off isolated fragments, see Graph.closest_index (optional).
         """
         if not graph and not serialized_filepath:
             raise Exception("Need to pass graph or serialized_filepath argument.")
@@ -43,8 +60,16 @@ class Routes(Map):
 
         else:
             super().__init__(graph, bounds=bounds)
-            self.level_handler = level_handler if level_handler != None else lambda _: _
-            self._cached_routes: dict[int, dict[int, Route]] = {}
+            self.level_handler = level_handler
+            self.heuristic = heuristic
+            self.hierarchy: Hierarchy = None
+            self.zones = Zones(graph)
+            self._customized_version = None
+            self.cache = RouteCache() if cache is None else cache
+            self.profiler = profiler
+            self.component = component
+            self.lock = ReadWriteLock()
+            self.compiled = CompiledGraph()
 
     def __getstate__(self):
         if (
@@ -58,23 +83,40 @@ class Routes(Map):
 
     def __setstate__(self, state):
         map_state, routes_state = state
-        self.__dict__ = routes_state
-        if self.level_handler == None:
-            self.level_handler = lambda _: _
-        Map.__setstate__ = map_state
+        Map.__setstate__(self, map_state)
+        self.__dict__.update(routes_state)
 
     def get_path(
         self,
         source: tuple[float, float],
         destination: tuple[float, float],
         verbose=False,
+        bidirectional=False,
+        heuristic: str = None,
     ) -> Route:
         """Given two coordinates, finds best route between them.
 
         :param1 source: Source coordinate in cartesian format (x, y).
         :param2 destination: Destination coordinate in cartesian format (x, y).
         :param3 verbose: If True, prints debug info (default False).
+        :param4 bidirectional: If True, searches from both ends at once, which settles fewer nodes on long routes. In the backward search level_handler is called with the predecessors of current_id as neighbor_ids, so handlers should prune by node rather than by direction of travel. Vectorized handlers always see edges in travel direction (default False).
+        :param5 heuristic: Overrides the default A* heuristic for this query, "haversine" or "alt". The number of nodes expanded is returned in Route.misc["expanded"] for comparison (optional).
+
+        Runs under a shared lock, so it sees edge values from before or after a concurrent update, never a mix.
+
+        The contraction hierarchy, if built, answers the query unless a level_handler is set or an A* option (bidirectional, heuristic) is requested. Without a hierarchy, queries the hierarchy could answer run on the compiled Dijkstra of scipy if it is installed and the default heuristic is "haversine", see CompiledGraph, and on A* otherwise. Queries between nodes that are not connected at all are answered from the graph's component labels without searching.
+
+        Route.misc holds stats of the query: "snap_ms", "search_ms" and "handler_ms" (time inside level_handler), "cache_hit", "engine" (the search that answered it: "hierarchy", "compiled", "bidirectional", "a_star" or "unreachable"), "path_nodes" (nodes on the returned path), and for A* searches "expanded" and "pushes" (heap pushes), for compiled searches "expanded". They are also recorded in metrics.REGISTRY.
         """
+        with self.lock.read():
+            return self._get_path(
+                source, destination, verbose, bidirectional, heuristic
+            )
+
+    def _get_path(
+        self, source, destination, verbose, bidirectional, heuristic
+    ) -> Route:
+        """Answers get_path while holding the lock."""
         out_of_bounds = {}
         if not (self.check_bounds(*source) and self.check_bounds(*destination)):
             error = "Query is out of bounds."
@@ -82,15 +124,39 @@ class Routes(Map):
                 print(error)
             out_of_bounds["error"] = error
 
-        s = time.time()
-        source_id = self.graph.closest_node(*source)
-        destination_id = self.graph.closest_node(*destination)
+        s = time.perf_counter()
+        source_id = self.graph.closest_index(*source, self.component)
+        destination_id = self.graph.closest_index(*destination, self.component)
+        snapped = time.perf_counter()
+        stats = {"snap_ms": (snapped - s) * 1000, "handler_ms": 0.0}
+
+        # out of bounds queries carry an error, so they are neither served from nor added to the cache
+        key = (source_id, destination_id)
+        if not out_of_bounds:
+            route = self.cache.get(key)
+            if route is not None:
+                route = Route(
+                    route.path,
+                    route.nodes,
+                    route.cost,
+                    **(route.misc | stats | {"search_ms": 0.0, "cache_hit": True}),
+                    time=(time.perf_counter() - s) * 1000,
+                )
+                if verbose:
+                    print(
+                        "Using cached route, returns a path traversing {} nodes".format(
+                            len(route)
+                        )
+                    )
+                metrics.observe(route.misc)
+                return route
 
-        route = Route(
-            **out_of_bounds,
-            **self._modified_a_star(source_id, destination_id, verbose=verbose),
-            time=(time.time() - s)
+        r = self._search(
+            source_id, destination_id, stats, verbose, bidirectional, heuristic
         )
+        done = time.perf_counter()
+        stats |= {"search_ms": (done - snapped) * 1000, "cache_hit": False}
+        route = Route(**(r | out_of_bounds), **stats, time=(done - s) * 1000)
 
         if verbose:
             print(
@@ -99,130 +165,970 @@ class Routes(Map):
                 )
             )
 
-        self._cache_route(route)
+        metrics.observe(route.misc)
+        if not out_of_bounds:
+            self.cache.put(key, route)
         return route
 
+    def _search(
+        self,
+        source_id: int,
+        destination_id: int,
+        stats: dict,
+        verbose=False,
+        bidirectional=False,
+        heuristic: str = None,
+    ) -> dict:
+        """Picks the search answering a query between two node indices as described in get_path, runs it and returns its result."""
+        if not self.graph.reachable(source_id, destination_id):
+            search, engine = self._unreachable, "unreachable"
+        elif (
+            self.hierarchy is not None
+            and self.level_handler is None
+            and not bidirectional
+            and heuristic is None
+            and not self.zones.nodes[destination_id]
+            and self._customized_version == (self.zones.version, self.graph.version)
+        ):
+            search, engine = self._hierarchy_search, "hierarchy"
+        elif (
+            not bidirectional
+            and heuristic is None
+            and self.heuristic == "haversine"
+            and self._compiled(destination_id) is not None
+        ):
+            search, engine = self._compiled_search, "compiled"
+        elif bidirectional:
+            search, engine = self._bidirectional_a_star, "bidirectional"
+        else:
+            search, engine = self._modified_a_star, "a_star"
+        stats["engine"] = engine
+        with self.profiler.sample("get_path") if self.profiler else nullcontext():
+            r = search(
+                source_id,
+                destination_id,
+                verbose=verbose,
+                heuristic=heuristic or self.heuristic,
+                stats=stats,
+            )
+        stats["path_nodes"] = len(r["nodes"])
+        return r
+
+    def get_alternatives(
+        self,
+        source: tuple[float, float],
+        destination: tuple[float, float],
+        k: int = 3,
+        max_similarity: float = 0.7,
+        max_stretch: float = 1.5,
+        penalty: float = 1.4,
+        time_budget: float = None,
+        heuristic: str = None,
+    ) -> list[Route]:
+        """Given two coordinates, finds up to k diverse routes between them, best first, with the penalty method: after every search the nodes of the route found are penalized and A* runs again, until k routes are accepted.
+
+        Searches share their heuristic, level_handler decisions and contracted chains, and penalties only make edges more expensive, so the bounds of the first search stay valid for all of them. A* is used even if the contraction hierarchy is built.
+
+        :param1 source: Source coordinate in cartesian format (x, y).
+        :param2 destination: Destination coordinate in cartesian format (x, y).
+        :param3 k: Largest number of routes returned, including the best one (default 3).
+        :param4 max_similarity: Largest share of a route's cost that may run along the edges of a route accepted before it, between 0 and 1 (default 0.7).
+        :param5 max_stretch: Largest cost of an alternative relative to the best route, searching stops at the first route costing more (default 1.5).
+        :param6 penalty: Multiplier applied to the edges into every node of a route found, per search it appeared in (default 1.4).
+        :param7 time_budget: Milliseconds after which no more alternatives are searched for, a search running over it is given up. The best route is always returned (optional).
+        :param8 heuristic: Overrides the default A* heuristic, "haversine" or "alt" (optional).
+
+        :ret: list of Route objects. Route.misc holds the stats of its search as in get_path, and for alternatives "similarity", its largest share with a route before it.
+        """
+        if not penalty > 1:
+            raise Exception("Penalty must be larger than 1.")
+        if not 0 <= max_similarity <= 1:
+            raise Exception("max_similarity must be between 0 and 1.")
+        if not max_stretch >= 1:
+            raise Exception("max_stretch must be at least 1.")
+
+        out_of_bounds = {}
+        if not (self.check_bounds(*source) and self.check_bounds(*destination)):
+            out_of_bounds["error"] = "Query is out of bounds."
+
+        s = time.perf_counter()
+        source_id = self.graph.closest_index(*source, self.component)
+        destination_id = self.graph.closest_index(*destination, self.component)
+        deadline = None if time_budget is None else s + time_budget / 1000
+        kwargs = {"verbose": False, "heuristic": heuristic or self.heuristic}
+
+        routes, edges = [], []
+        with self.lock.read():
+            if not self.graph.reachable(source_id, destination_id):
+                r = self._unreachable(source_id, destination_id, **kwargs)
+                return [
+                    Route(**(r | out_of_bounds), time=(time.perf_counter() - s) * 1000)
+                ]
+
+            state = {}
+            penalties = np.ones(len(self.graph))
+            for _ in range(4 * k):
+                if (
+                    len(routes) == k
+                    or routes
+                    and deadline
+                    and time.perf_counter() > deadline
+                ):
+                    break
+
+                started = time.perf_counter()
+                stats = {"handler_ms": 0.0}
+                r = self._modified_a_star(
+                    source_id,
+                    destination_id,
+                    state=state,
+                    stats=stats,
+                    penalties=penalties if routes else None,
+                    deadline=deadline if routes else None,
+                    **kwargs,
+                )
+                stats["search_ms"] = (time.perf_counter() - started) * 1000
+                if "error" in r:
+                    if not routes:
+                        routes.append(Route(**(r | out_of_bounds), **stats))
+                    break
+                if routes and r["cost"] > max_stretch * routes[0].cost:
+                    break
+
+                nodes = self.graph.indices_of(r["nodes"])
+                penalties[nodes[1:-1]] *= penalty
+
+                pairs = nodes[:-1] * len(self.graph) + nodes[1:]
+                values = self._edge_values(nodes)
+                total = values.sum()
+                similarity = max(
+                    [
+                        values[np.isin(pairs, e)].sum() / total if total > 0 else 1.0
+                        for e in edges
+                    ],
+                    default=0.0,
+                )
+                if similarity > max_similarity:
+                    continue
+
+                if routes:
+                    stats["similarity"] = similarity
+                routes.append(Route(**(r | out_of_bounds), **stats))
+                edges.append(pairs)
+
+        done = (time.perf_counter() - s) * 1000
+        for route in routes:
+            route.time = done
+        return routes
+
+    def get_matrix(
+        self,
+        sources: list[tuple[float, float]],
+        destinations: list[tuple[float, float]],
+        paths=False,
+        processes: int = None,
+    ) -> dict:
+        """Given lists of coordinates, finds the cost of the best route from every source to every destination.
+
+        Runs one Dijkstra search per source that stops once every destination is settled, respecting avoidance zones and level_handler like get_path. level_handler is called with destination_id None.
+
+        :param1 sources: Source coordinates in cartesian format (x, y).
+        :param2 destinations: Destination coordinates in cartesian format (x, y).
+        :param3 paths: If True, also returns the node ids of every route (default False).
+        :param4 processes: If given, splits sources across this many worker processes. Each worker receives a copy of the routes object, so this only pays off for large matrices (optional).
+
+        :ret: dict with "costs", an array of shape (len(sources), len(destinations)) holding inf where there is no route, "sources" and "destinations", the snapped node ids, and if paths, "paths", a nested list of node id lists (empty where there is no route)
+        """
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        source_ids = self.graph.closest_indices(
+            sources[:, 0], sources[:, 1], self.component
+        )
+        destination_ids = self.graph.closest_indices(
+            destinations[:, 0], destinations[:, 1], self.component
+        )
+
+        with self.lock.read():
+            costs, routes = self._matrix(source_ids, destination_ids, paths, processes)
+
+        r = {
+            "costs": costs,
+            "sources": self.graph.ids[source_ids].tolist(),
+            "destinations": self.graph.ids[destination_ids].tolist(),
+        }
+        if paths:
+            r["paths"] = routes
+        return r
+
+    def _matrix(
+        self,
+        source_ids: np.ndarray,
+        destination_ids: np.ndarray,
+        paths: bool,
+        processes: int,
+    ) -> tuple[np.ndarray, list]:
+        """Returns (costs, paths) of the matrix between node indices, see get_matrix."""
+        if processes and processes > 1 and len(source_ids) > 1:
+            chunks = np.array_split(source_ids, min(processes, len(source_ids)))
+            with ProcessPoolExecutor(
+                len(chunks), initializer=_init_worker, initargs=(self,)
+            ) as executor:
+                rows = list(
+                    executor.map(
+                        _matrix_rows,
+                        chunks,
+                        [destination_ids] * len(chunks),
+                        [paths] * len(chunks),
+                    )
+                )
+            costs = np.concatenate([c for c, _ in rows])
+            routes = [p for _, chunk in rows for p in chunk]
+            return costs, routes
+        return self._matrix_rows(source_ids, destination_ids, paths)
+
+    def get_reachable(
+        self, origin: tuple[float, float], budget: float, boundary=False
+    ) -> dict:
+        """Given a coordinate, finds every node reachable within budget, respecting avoidance zones and level_handler like get_path. level_handler is called with destination_id None.
+
+        :param1 origin: Origin coordinate in cartesian format (x, y).
+        :param2 budget: Largest route cost to include, in edge values (meters for OSM lengths).
+        :param3 boundary: If True, also returns the convex hull of the reachable nodes (default False).
+
+        :ret: dict with "origin", the snapped node id, "nodes", ids of reachable nodes in order of cost, "costs", their route costs, and if boundary, "boundary", a list of (x, y) corners
+        """
+        r = {}
+        if not self.check_bounds(*origin):
+            r["error"] = "Query is out of bounds."
+
+        source_id = self.graph.closest_index(*origin, self.component)
+        with self.lock.read():
+            settled, _ = self._one_to_many(source_id, budget=budget)
+        nodes = np.fromiter(settled.keys(), dtype=np.int64, count=len(settled))
+
+        r |= {
+            "origin": int(self.graph.ids[source_id]),
+            "nodes": self.graph.ids[nodes].tolist(),
+            "costs": list(settled.values()),
+        }
+        if boundary:
+            r["boundary"] = list(
+                map(tuple, convex_hull(self.graph.coords[nodes]).tolist())
+            )
+        return r
+
+    def _matrix_rows(
+        self, source_ids: np.ndarray, destination_ids: np.ndarray, paths: bool
+    ) -> tuple[np.ndarray, list]:
+        """Returns (costs, paths) rows of the matrix for the given source indices, paths holds node id lists if paths is True else it is empty. Destinations the component index shows to be unreachable from a source are not searched for."""
+        component = self.graph.component
+        costs = np.full((len(source_ids), len(destination_ids)), np.inf)
+        routes = []
+        for row, source_id in zip(costs, source_ids.tolist()):
+            reachable = self.graph.reachable_components(component[source_id])
+            targets = np.zeros(len(self.graph), dtype=bool)
+            targets[destination_ids[reachable[component[destination_ids]]]] = True
+            settled, tree = self._one_to_many(source_id, targets)
+            row[:] = [settled.get(i, np.inf) for i in destination_ids.tolist()]
+            if paths:
+                routes.append(
+                    [
+                        self._tree_path(source_id, i, tree) if i in settled else []
+                        for i in destination_ids.tolist()
+                    ]
+                )
+        return costs, routes
+
+    def _one_to_many(
+        self, source_id: int, destinations: np.ndarray = None, budget=math.inf
+    ) -> tuple[dict[int, float], dict[int, tuple[int, float]]]:
+        """Runs Dijkstra from source_id until every node in the boolean mask destinations is settled, or until every node within budget is settled if destinations is None.
+
+        :ret: tuple of (settled node index -> cost, node index -> (predecessor index, value) search tree)
+        """
+        open = FHeap()
+        open.insert(source_id, 0)
+        g = {source_id: 0}
+        paths = {}
+        settled = {}
+        decisions = {}
+
+        remaining = -1 if destinations is None else np.count_nonzero(destinations)
+        if remaining == 0:
+            return {source_id: 0}, {}
+        compiled = self._compiled(destinations)
+        if compiled is not None:
+            return self._compiled_one_to_many(compiled, source_id, budget)
+
+        while len(open) > 0 and open.peek() <= budget:
+            curr_id = open.pop()
+            settled[curr_id] = g[curr_id]
+            if destinations is not None and destinations[curr_id]:
+                remaining -= 1
+                if remaining == 0:
+                    break
+
+            neighbors, costs = self._expand(
+                curr_id, source_id, destinations, open, decisions
+            )
+            for n_id, cost in zip(neighbors.tolist(), costs.tolist()):
+                if n_id in settled:
+                    continue
+
+                g_n = g[curr_id] + cost
+                if g_n >= g.get(n_id, math.inf):
+                    continue
+                g[n_id] = g_n
+                open.insert(n_id, g_n)
+                paths[n_id] = (curr_id, cost)
+
+        return settled, paths
+
+    def _compiled_one_to_many(
+        self, compiled: CompiledGraph, source_id: int, budget: float
+    ) -> tuple[dict[int, float], dict[int, tuple[int, float]]]:
+        """Runs _one_to_many with the compiled Dijkstra of scipy, which settles every node within budget at once. Results are the same as those of the Python search, with every reached node settled."""
+        costs, predecessors = compiled.search(source_id, budget)
+        nodes = np.flatnonzero(np.isfinite(costs))
+        nodes = nodes[np.argsort(costs[nodes], kind="stable")]
+        settled = dict(zip(nodes.tolist(), costs[nodes].tolist()))
+
+        nodes = nodes[nodes != source_id]
+        parents = predecessors[nodes]
+        values = costs[nodes] - costs[parents]
+        paths = dict(zip(nodes.tolist(), zip(parents.tolist(), values.tolist())))
+        return settled, paths
+
+    def _tree_path(
+        self, source_id: int, destination_id: int, paths: dict[int, tuple[int, float]]
+    ) -> list[int]:
+        """Returns node ids along the search tree from source_id to destination_id."""
+        nodes = [destination_id]
+        while nodes[-1] != source_id:
+            nodes.append(paths[nodes[-1]][0])
+        return self.graph.ids[nodes[::-1]].tolist()
+
     def _modified_a_star(self, source_id, destination_id, **kwargs) -> Route:
+        """Runs A* between two dense node indices. Node ids in the returned path are OSM ids.
+
+        Optional keyword arguments used by get_alternatives: penalties, an array of multipliers of at least 1 applied to the edges into every node while searching but not to the returned cost, state, a dict holding the heuristic, handler decisions and chains, filled by the first search and reused by later ones between the same nodes, and deadline, a time.perf_counter() value after which the search gives up.
+        """
         open = FHeap()
         closed = set()
         g = {}
 
-        paths: dict[
-            int, tuple[int, float]
-        ] = {}  # target_id[source_id, cost] (if cost < 0, cached)
+        paths: dict[int, tuple[int, float]] = {}  # target_id[source_id, cost]
 
         g[source_id] = 0
-        h = self._calculate_heuristic(source_id, destination_id)
+        state = kwargs.get("state", {})
+        if not state:
+            state |= {
+                "heuristic": self._heuristic(destination_id, kwargs["heuristic"]),
+                "decisions": {},
+                "chains": self._chains(source_id, destination_id),
+            }
+        heuristic, decisions, chains = (
+            state["heuristic"],
+            state["decisions"],
+            state["chains"],
+        )
+        penalties = kwargs.get("penalties")
+        deadline = kwargs.get("deadline")
 
-        open.insert(source_id, h)
+        open.insert(source_id, heuristic[source_id])
 
         nodes_traversed = 0
         reached = False
         while len(open) > 0:
             curr_id = open.pop()
-            if (
-                kwargs["verbose"]
-                and nodes_traversed
-                % (
-                    10
-                    if nodes_traversed < 100
-                    else (10 ** int(math.log(nodes_traversed, 10)))
-                )
-                == 0
-            ):
-                print(
-                    "Current node: {}, nodes traversed: {}".format(
-                        curr_id, nodes_traversed
-                    )
-                )
             closed.add(curr_id)
             nodes_traversed += 1
 
             if curr_id == destination_id:
                 reached = True
                 break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
 
-            neighbors = self._get_neighbors(curr_id)
-            for n in self.level_handler(
-                neighbors, curr_id, source_id, destination_id, self.graph
+            neighbors, costs = self._expand(
+                curr_id,
+                source_id,
+                destination_id,
+                open,
+                decisions,
+                kwargs["stats"],
+                chains=chains,
+            )
+            values = costs.tolist()
+            keys = (
+                values if penalties is None else (costs * penalties[neighbors]).tolist()
+            )
+            for n_id, cost, key, h in zip(
+                neighbors.tolist(), values, keys, heuristic[neighbors].tolist()
             ):
-                n_id, cost = n
                 if n_id in closed:
                     continue
 
-                g[n_id] = g[curr_id] + cost
-                h = self._calculate_heuristic(n_id, destination_id)
-                f = g[n_id] + h
+                g_n = g[curr_id] + key
+                if g_n >= g.get(n_id, math.inf):
+                    continue
+
+                if h == math.inf:
+                    continue  # destination is unreachable from n_id
+                g[n_id] = g_n
+                f = g_n + h
 
                 open.insert(n_id, f)
                 paths[n_id] = (curr_id, cost)  # id, cost
 
-            open.heapify()
-
-        r = {}
+        r = {"expanded": nodes_traversed, "pushes": open.pushes}
         if not reached:
             paths[destination_id] = (curr_id, float("inf"))
-            r[
-                "error"
-            ] = "A-star did not find a valid path from node {} to node {}. Arbitrarily appended destination to end.".format(
-                source_id, destination_id
+            r |= self._not_found(source_id, destination_id, **kwargs)
+            chains = None
+
+        r |= self._get_path_from_paths(
+            source_id, destination_id, paths, chains=chains, **kwargs
+        )
+
+        return r
+
+    def _bidirectional_a_star(self, source_id, destination_id, **kwargs) -> Route:
+        """Runs A* forward from the source and backward from the destination at once, expanding the smaller frontier first.
+
+        Both searches are keyed by the average potential p(v) = (h(v, destination) - h(source, v)) / 2, forward as g + p and backward as g - p, which keeps the two searches consistent with each other. Every time one search labels a node the other has already labelled, the joined path becomes a candidate, and the search stops once the two smallest keys add up to the best candidate cost.
+        """
+        forward = (FHeap(), set(), {source_id: 0}, {}, {}, False)
+        backward = (FHeap(), set(), {destination_id: 0}, {}, {}, True)
+        with np.errstate(invalid="ignore"):
+            potential = (
+                self._heuristic(destination_id, kwargs["heuristic"])
+                - self._heuristic(source_id, kwargs["heuristic"], reverse=True)
+            ) / 2
+
+        forward[0].insert(source_id, potential[source_id])
+        backward[0].insert(destination_id, -potential[destination_id])
+
+        best, meet_id = (
+            (0, source_id) if source_id == destination_id else (math.inf, None)
+        )
+        chains = self._chains(source_id, destination_id)
+
+        nodes_traversed = 0
+        while len(forward[0]) > 0 and len(backward[0]) > 0:
+            if forward[0].peek() + backward[0].peek() >= best:
+                break
+
+            if len(forward[0]) <= len(backward[0]):
+                side, other_g = forward, backward[2]
+            else:
+                side, other_g = backward, forward[2]
+            open, closed, g, paths, decisions, reverse = side
+            sign = -1 if reverse else 1
+
+            curr_id = open.pop()
+            closed.add(curr_id)
+            nodes_traversed += 1
+
+            neighbors, costs = self._expand(
+                curr_id,
+                source_id,
+                destination_id,
+                open,
+                decisions,
+                kwargs["stats"],
+                reverse=reverse,
+                chains=chains,
             )
-            if kwargs["verbose"]:
-                print("Error: " + r["error"])
+            for n_id, cost, p in zip(
+                neighbors.tolist(), costs.tolist(), potential[neighbors].tolist()
+            ):
+                if n_id in closed:
+                    continue
 
-        r |= self._get_path_from_paths(source_id, destination_id, paths, **kwargs)
+                g_n = g[curr_id] + cost
+                if g_n >= g.get(n_id, math.inf):
+                    continue
+
+                key = g_n + sign * p
+                if not math.isfinite(key):
+                    continue  # no path from the source through n_id to the destination
+                g[n_id] = g_n
+                open.insert(n_id, key)
+                paths[n_id] = (curr_id, cost)
+
+                if n_id in other_g and g_n + other_g[n_id] < best:
+                    best, meet_id = g_n + other_g[n_id], n_id
+
+        if kwargs["verbose"]:
+            print("Bidirectional search traversed {} nodes".format(nodes_traversed))
+
+        r = {
+            "expanded": nodes_traversed,
+            "pushes": forward[0].pushes + backward[0].pushes,
+        }
+        if meet_id is None:
+            r |= self._not_found(source_id, destination_id, **kwargs)
+            paths = {destination_id: (source_id, float("inf"))}
+            chains = None
+        else:
+            # splice the backward tree (node -> successor) onto the forward one
+            paths = forward[3]
+            curr_id = meet_id
+            while curr_id != destination_id:
+                next_id, cost = backward[3][curr_id]
+                paths[next_id] = (curr_id, cost)
+                curr_id = next_id
+
+        r |= self._get_path_from_paths(
+            source_id, destination_id, paths, chains=chains, **kwargs
+        )
 
         return r
 
-    def _calculate_heuristic(self, source_id, destination_id):
-        source = self.graph.get_coordinate(source_id)
-        destination = self.graph.get_coordinate(destination_id)
-        return haversine(
-            source[::-1], destination[::-1]
-        )  # coordinates stored in (x, y) [cartesian], haversine requires (lon, lat) [geographic]
-
-    def _get_neighbors(self, id: int):
-        """Returns list of tuples in the format (neighbor_id, value) given node id. Cached routes have a value of -1."""
-        n = self.graph.get_neighbors(id)
-        if id in self._cached_routes:
-            for target_id in self._cached_routes[id].keys():
-                n.append((target_id, -1))
-        return n
+    def _heuristic(self, target_id: int, heuristic: str, reverse=False) -> np.ndarray:
+        """Returns lower bounds on the cost from every node to target_id, or from target_id to every node if reverse, computed in one vectorized pass at query start."""
+        if heuristic == "alt":
+            return self.graph.landmark_bound(target_id, reverse=reverse)
+        elif heuristic == "haversine":
+            return self.graph.straight_line_bound(target_id)
+        raise Exception("Unknown heuristic %s." % heuristic)
+
+    def _hierarchy_search(self, source_id, destination_id, **kwargs) -> Route:
+        """Answers a query from the customized contraction hierarchy. Only reads it, customization happens under the write lock whenever edge values or zones change."""
+        cost, nodes = self.hierarchy.query(source_id, destination_id)
+
+        r = {}
+        if nodes is None:
+            r |= self._not_found(source_id, destination_id, **kwargs)
+            nodes = [source_id, destination_id]
+
+        return self._path_from_nodes(nodes) | r | {"cost": cost}
+
+    def _compiled_search(self, source_id, destination_id, **kwargs) -> dict:
+        """Answers a query with the compiled Dijkstra of scipy, see CompiledGraph. The search is first limited to twice the heuristic's lower bound on the route cost, which covers most routes. If the destination is not reached within the limit, one unlimited search follows, so a route is never missed because of the limit."""
+        compiled = self._compiled(destination_id)
+        bound = float(self._heuristic(destination_id, kwargs["heuristic"])[source_id])
+        limit = 2 * bound if 0 < bound < math.inf else math.inf
+
+        costs, predecessors = compiled.search(source_id, limit)
+        expanded = int(np.isfinite(costs).sum())
+        if costs[destination_id] == math.inf and limit < math.inf:
+            costs, predecessors = compiled.search(source_id)
+            expanded += int(np.isfinite(costs).sum())
+
+        r = {"expanded": expanded, "cost": float(costs[destination_id])}
+        if r["cost"] == math.inf:
+            r |= self._not_found(source_id, destination_id, **kwargs)
+            nodes = [source_id, destination_id]
+        else:
+            nodes = [destination_id]
+            while nodes[-1] != source_id:
+                nodes.append(int(predecessors[nodes[-1]]))
+            nodes.reverse()
+        return self._path_from_nodes(nodes) | r
+
+    def _compiled(self, destinations) -> CompiledGraph:
+        """Returns the compiled graph prepared for the current edge values and avoidance zones, if a search towards destinations can run on it: scipy is installed, no level_handler is set and no destination is inside an avoidance zone, since edges into destinations are exempt from avoidance. Else returns None.
+
+        :param1 destinations: Destination node index, or boolean mask over nodes, or None.
+        """
+        if not CompiledGraph.available() or self.level_handler is not None:
+            return None
+        if destinations is not None and self.zones.nodes[destinations].any():
+            return None
+        self.compiled.prepare(
+            self.graph.edges,
+            self.zones.edges,
+            (self.graph.version, self.zones.version),
+        )
+        return self.compiled
+
+    def _unreachable(self, source_id, destination_id, **kwargs) -> dict:
+        """Answers a query between nodes with no path between them according to Graph.reachable, without searching."""
+        r = {
+            "error": "No path from node {} to node {}, they are not connected.".format(
+                self.graph.ids[source_id], self.graph.ids[destination_id]
+            ),
+            "expanded": 0,
+            "pushes": 0,
+            "cost": float("inf"),
+        }
+        if kwargs["verbose"]:
+            print("Error: " + r["error"])
+        return self._path_from_nodes([source_id, destination_id]) | r
+
+    def _not_found(self, source_id, destination_id, **kwargs) -> dict:
+        r = {}
+        r[
+            "error"
+        ] = "A-star did not find a valid path from node {} to node {}. Arbitrarily appended destination to end.".format(
+            self.graph.ids[source_id], self.graph.ids[destination_id]
+        )
+        if kwargs["verbose"]:
+            print("Error: " + r["error"])
+        return r
+
+    def _edges_from(
+        self, i: int, destination_id: int, reverse=False
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (neighbor indices, values) given node index, or (predecessor indices, values) if reverse. Edges entering an avoidance zone are left out, unless they lead into a destination.
+
+        :param2 destination_id: Destination node index, or boolean mask over nodes for searches towards several destinations, or None.
+        """
+        edges = self.graph.reverse_edges if reverse else self.graph.edges
+        s, e = edges.indptr[i], edges.indptr[i + 1]
+        indices, weights = edges.indices[s:e], edges.weights[s:e]
+        if len(self.zones) == 0:
+            return indices, weights
+
+        if reverse:
+            # every edge into i enters a zone if i is inside one
+            if self.zones.nodes[i] and not self._is_destination(i, destination_id):
+                return indices[:0], weights[:0]
+            return indices, weights
+
+        keep = ~self.zones.edges[s:e] | self._is_destination(indices, destination_id)
+        return indices[keep], weights[keep]
+
+    @staticmethod
+    def _is_destination(nodes, destination_id):
+        if destination_id is None:
+            return np.zeros(np.shape(nodes), dtype=bool)
+        if isinstance(destination_id, np.ndarray):
+            return destination_id[nodes]
+        return nodes == destination_id
+
+    @staticmethod
+    def _single_destination(destination_id) -> int:
+        """Returns destination_id as passed to level_handler, which is None for searches towards several destinations."""
+        return None if isinstance(destination_id, np.ndarray) else destination_id
+
+    def _expand(
+        self,
+        curr_id: int,
+        source_id: int,
+        destination_id: int,
+        open: FHeap,
+        decisions: dict,
+        stats: dict = None,
+        reverse=False,
+        chains: tuple = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (neighbor indices, values) of curr_id after avoidance zones and level_handler are applied. Time spent in level_handler is added to stats["handler_ms"] if stats is given. Given chains, as returned by _chains, edges come from the contracted adjacency instead, see _expand_chains.
+
+        Results are kept in decisions for the rest of the search, and get_alternatives shares them between its searches. A batched vectorized handler is called for curr_id together with the next nodes queued in open. Handler results only depend on the edges of a node, so deciding early never changes the route.
+        """
+        if chains is not None:
+            return self._expand_chains(
+                curr_id,
+                source_id,
+                destination_id,
+                open,
+                decisions,
+                stats,
+                reverse,
+                *chains,
+            )
+        if not is_vectorized(self.level_handler):
+            if curr_id not in decisions:
+                decisions[curr_id] = self._prune(
+                    *self._edges_from(curr_id, destination_id, reverse=reverse),
+                    curr_id,
+                    source_id,
+                    destination_id,
+                    stats,
+                )
+            return decisions[curr_id]
+
+        if curr_id not in decisions:
+            nodes = [curr_id]
+            if self.level_handler.batch:
+                nodes += [
+                    i
+                    for i in open.front(self.level_handler.batch - 1)
+                    if i not in decisions
+                ]
+            self._decide(nodes, source_id, destination_id, decisions, stats, reverse)
+        return decisions[curr_id]
+
+    def _decide(
+        self,
+        nodes: list[int],
+        source_id: int,
+        destination_id: int,
+        decisions: dict,
+        stats: dict,
+        reverse: bool,
+    ):
+        """Calls the vectorized level_handler once for the edges of all nodes and stores (kept neighbor indices, values) of each node in decisions. The handler always sees edges in travel direction, so in the backward search current holds the predecessors and neighbors the expanded nodes."""
+        edges = [self._edges_from(i, destination_id, reverse=reverse) for i in nodes]
+        if len(edges) == 1:
+            (indices, weights), counts = edges[0], [len(edges[0][0])]
+        else:
+            counts = [len(indices) for indices, _ in edges]
+            indices = np.concatenate([indices for indices, _ in edges])
+            weights = np.concatenate([weights for _, weights in edges])
+        expanded = np.repeat(np.asarray(nodes, dtype=np.int64), counts)
+        tails, heads = (indices, expanded) if reverse else (expanded, indices)
+
+        s = time.perf_counter()
+        result = np.asarray(
+            self.level_handler(
+                heads,
+                self.graph.coords[heads],
+                weights,
+                tails,
+                source_id,
+                self._single_destination(destination_id),
+                self.graph,
+            )
+        )
+        if stats is not None:
+            stats["handler_ms"] += (time.perf_counter() - s) * 1000
+        if result.dtype == bool:
+            keep = result
+        else:
+            weights = weights * result
+            keep = weights < np.inf
+
+        if len(nodes) == 1:
+            decisions[nodes[0]] = (indices[keep], weights[keep])
+            return
+        splits = np.cumsum(counts)[:-1]
+        for i, k, n, w in zip(
+            nodes,
+            np.split(keep, splits),
+            np.split(indices, splits),
+            np.split(weights, splits),
+        ):
+            decisions[i] = (n[k], w[k])
+
+    def _prune(
+        self,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        curr_id: int,
+        source_id: int,
+        destination_id: int,
+        stats: dict = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Applies level_handler to neighbors given by index. The handler itself only sees OSM ids."""
+        if self.level_handler is None:
+            return indices, weights
+
+        ids = self.graph.ids
+        destination_id = self._single_destination(destination_id)
+        s = time.perf_counter()
+        kept = self.level_handler(
+            list(zip(ids[indices].tolist(), weights.tolist())),
+            int(ids[curr_id]),
+            int(ids[source_id]),
+            None if destination_id is None else int(ids[destination_id]),
+            self.graph,
+        )
+        if stats is not None:
+            stats["handler_ms"] += (time.perf_counter() - s) * 1000
+        if len(kept) == 0:
+            return indices[:0], weights[:0]
+
+        kept_ids, kept_weights = zip(*kept)
+        return self.graph.indices_of(kept_ids), np.asarray(kept_weights)
+
+    def _chains(self, source_id: int, destination_id: int) -> tuple[dict, dict]:
+        """Returns (virtual edges, chosen hops) of a search over the contracted adjacency if Graph.contract_chains was called, else None. Chosen hops are filled in while expanding, see _expand_chains."""
+        if self.graph.chains is None:
+            return None
+        return self.graph.chains.virtual_edges(source_id, destination_id), {}
+
+    def _chain_edges_from(
+        self, i: int, destination_id: int, virtual: dict, reverse=False
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Like _edges_from over the contracted adjacency plus the virtual edges of the query, returning (neighbor indices, values, hops, hop counts). Hops are positions in graph.edges of the original edges making up every edge, concatenated. Edges with a hop entering an avoidance zone are left out, unless that hop leads into the destination."""
+        chains = self.graph.chains
+        indices, weights, ids = chains.edges_from(i, reverse=reverse)
+        hops, counts = chains.hops_of(ids)
+        extra = virtual.get((i, reverse))
+        if extra:
+            indices = np.concatenate([indices, [v[0] for v in extra]])
+            weights = np.concatenate([weights, [v[1] for v in extra]])
+            hops = np.concatenate([hops, *[v[2] for v in extra]])
+            counts = np.concatenate([counts, [len(v[2]) for v in extra]])
+        if len(self.zones) == 0 or len(indices) == 0:
+            return indices, weights, hops, counts
+
+        blocked = self.zones.edges[hops] & (
+            self.graph.edges.indices[hops] != destination_id
+        )
+        keep = ~np.logical_or.reduceat(blocked, np.cumsum(counts) - counts)
+        return indices[keep], weights[keep], hops[np.repeat(keep, counts)], counts[keep]
+
+    def _expand_chains(
+        self,
+        curr_id: int,
+        source_id: int,
+        destination_id: int,
+        open: FHeap,
+        decisions: dict,
+        stats: dict,
+        reverse: bool,
+        virtual: dict,
+        via: dict,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Like _expand over the contracted adjacency of Graph.contract_chains. Avoidance zones and level_handler are checked on every hop of an edge, as if its interior nodes were expanded one by one, and an edge is left out if any of its hops is.
+
+        Edge values may then differ from the contracted ones, so the hops of the lowest valued edge between two nodes are kept in via, keyed by (tail, head), for _get_path_from_paths to unpack. Without zones or handler, the contracted values apply as they are.
+        """
+        if len(self.zones) == 0 and self.level_handler is None:
+            indices, weights, _ = self.graph.chains.edges_from(curr_id, reverse=reverse)
+            extra = virtual.get((curr_id, reverse))
+            if extra:
+                indices = np.concatenate([indices, [v[0] for v in extra]])
+                weights = np.concatenate([weights, [v[1] for v in extra]])
+            return indices, weights
+
+        if curr_id in decisions:
+            return decisions[curr_id]
+
+        nodes = [curr_id]
+        if is_vectorized(self.level_handler) and self.level_handler.batch:
+            nodes += [
+                i
+                for i in open.front(self.level_handler.batch - 1)
+                if i not in decisions
+            ]
+        edges = [
+            self._chain_edges_from(i, destination_id, virtual, reverse=reverse)
+            for i in nodes
+        ]
+        if self.level_handler is not None:
+            edges = self._decide_hops(edges, source_id, destination_id, stats)
+
+        for i, (indices, weights, hops, counts) in zip(nodes, edges):
+            best = {}
+            for k, (n, w) in enumerate(zip(indices.tolist(), weights.tolist())):
+                if n not in best or w < weights[best[n]]:
+                    best[n] = k
+            starts = np.cumsum(counts) - counts
+            for n, k in best.items():
+                via[(n, i) if reverse else (i, n)] = hops[
+                    starts[k] : starts[k] + counts[k]
+                ]
+            decisions[i] = (indices, weights)
+        return decisions[curr_id]
+
+    def _decide_hops(
+        self, edges: list[tuple], source_id: int, destination_id: int, stats: dict
+    ) -> list[tuple]:
+        """Calls level_handler on the hops of every (neighbor indices, values, hops, hop counts) edge list at once, and returns the lists with edges left out if any of their hops was and values summed over the hops. Vectorized handlers are called once, others once per hop tail with the hops leaving it."""
+        hops = np.concatenate([e[2] for e in edges])
+        if len(hops) == 0:
+            return edges
+        counts = np.concatenate([e[3] for e in edges])
+        heads = self.graph.edges.indices[hops]
+        tails = np.searchsorted(self.graph.edges.indptr, hops, side="right") - 1
+        weights = self.graph.edges.weights[hops]
+
+        s = time.perf_counter()
+        if is_vectorized(self.level_handler):
+            result = np.asarray(
+                self.level_handler(
+                    heads,
+                    self.graph.coords[heads],
+                    weights,
+                    tails,
+                    source_id,
+                    self._single_destination(destination_id),
+                    self.graph,
+                )
+            )
+            if result.dtype == bool:
+                keep = result
+            else:
+                weights = weights * result
+                keep = weights < np.inf
+        else:
+            keep, weights = self._prune_hops(
+                tails, heads, weights, source_id, destination_id
+            )
+        if stats is not None:
+            stats["handler_ms"] += (time.perf_counter() - s) * 1000
+
+        starts = np.cumsum(counts) - counts
+        keep_edges = np.logical_and.reduceat(keep, starts)
+        values = np.add.reduceat(weights, starts)
+
+        decided = []
+        e = 0
+        for indices, _, node_hops, node_counts in edges:
+            k = keep_edges[e : e + len(indices)]
+            decided.append(
+                (
+                    indices[k],
+                    values[e : e + len(indices)][k],
+                    node_hops[np.repeat(k, node_counts)],
+                    node_counts[k],
+                )
+            )
+            e += len(indices)
+        return decided
+
+    def _prune_hops(
+        self,
+        tails: np.ndarray,
+        heads: np.ndarray,
+        weights: np.ndarray,
+        source_id: int,
+        destination_id: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Applies level_handler to hops given by tail and head index, calling it once per tail. Returns (keep mask, values) of the hops."""
+        ids = self.graph.ids
+        destination_id = self._single_destination(destination_id)
+        keep = np.zeros(len(tails), dtype=bool)
+        values = weights.copy()
+        for tail in np.unique(tails).tolist():
+            at = np.flatnonzero(tails == tail).tolist()
+            head_ids = ids[heads[at]].tolist()
+            slots = {}
+            for k, head in zip(at, head_ids):
+                slots.setdefault(head, []).append(k)
+
+            kept = self.level_handler(
+                list(zip(head_ids, weights[at].tolist())),
+                int(ids[tail]),
+                int(ids[source_id]),
+                None if destination_id is None else int(ids[destination_id]),
+                self.graph,
+            )
+            for head, value in kept:
+                k = slots[head].pop(0)
+                keep[k] = True
+                values[k] = value
+        return keep, values
 
     def _get_path_from_paths(
         self,
         source_id: int,
         destination_id: int,
         paths: dict[int, tuple[int, float]],
+        chains: tuple[dict, dict] = None,
         **kwargs
     ):
-        """:param3 paths: target_id[source_id, cost]"""
+        """:param3 paths: target_id[source_id, cost], keyed by node index
+
+        :param4 chains: (virtual edges, chosen hops) of a search over the contracted adjacency, used to unpack shortcuts into their interior nodes, see _chains (optional).
+        """
         r = {}
         r["cost"] = 0
 
         _nodes_r = [destination_id]
-        _path_r = [self.graph.get_coordinate(_nodes_r[0])]
 
         curr_id = _nodes_r[0]
         count = 0
         while curr_id != source_id:
             _curr_id, cost = paths[curr_id]
-            if cost == -1:
-                route = self._cached_routes[_curr_id][curr_id]
-                _nodes_r += route.nodes[:-1][::-1]
-                _path_r += route.path[:-1][::-1]
-                r["cost"] += route.cost
-
-                if kwargs["verbose"]:
-                    print(
-                        "Using cached route from node {} to node {} with cost {:.2f}".format(
-                            _curr_id, curr_id, route.cost
-                        )
-                    )
-            else:
-                _nodes_r.append(_curr_id)
-                _path_r.append(self.graph.get_coordinate(_curr_id))
-                r["cost"] += cost
+            _nodes_r.append(_curr_id)
+            r["cost"] += cost
 
             curr_id = _curr_id
 
@@ -233,19 +1139,249 @@ class Routes(Map):
                     print("Error: {}".format(error))
                 r["error"] = error
 
-        return {"path": _path_r[::-1], "nodes": _nodes_r[::-1]} | r
+        nodes = _nodes_r[::-1]
+        if chains is not None:
+            virtual, via = chains
+            unpacked = nodes[:1]
+            for tail, head in zip(nodes, nodes[1:]):
+                hops = via.get((tail, head))
+                if hops is None:
+                    hops = self.graph.chains.lowest_hops(tail, head, virtual)
+                unpacked += self.graph.edges.indices[hops[:-1]].tolist()
+                unpacked.append(head)
+            nodes = unpacked
+
+        return self._path_from_nodes(nodes) | r
+
+    def _edge_values(self, nodes: np.ndarray) -> np.ndarray:
+        """Returns value of the lowest valued edge between every pair of consecutive node indices."""
+        positions, pairs = self.graph.edge_positions(nodes[:-1], nodes[1:])
+        values = np.full(len(nodes) - 1, np.inf)
+        np.minimum.at(values, pairs, self.graph.edges.weights[positions])
+        return values
 
-    def _cache_route(self, route: Route):
-        source_id = route.nodes[0]
-        destination_id = route.nodes[-1]
+    def _path_from_nodes(self, nodes: list[int]) -> dict:
+        """Returns path coordinates and OSM node ids given a list of node indices."""
+        return {
+            "path": list(map(tuple, self.graph.coords[nodes].tolist())),
+            "nodes": self.graph.ids[nodes].tolist(),
+        }
+
+    def build_hierarchy(self):
+        """Preprocesses the graph into a contraction hierarchy, which get_path uses instead of A* while no level_handler is set. The hierarchy is saved along with the routes object."""
+        hierarchy = Hierarchy(self.graph)
+        with self.lock.write():
+            self.hierarchy = hierarchy
+            self._customize_hierarchy()
+
+    def customize(self, blocked: list[int] = None, penalties: dict[int, float] = None):
+        """Blocks or penalizes nodes for every search, replacing the customization set before, so calling it without arguments lifts it. Applied to the edge values in place like update, and the contraction hierarchy, if built, is customized again without rebuilding it. Only avoidance that can be expressed as blocked or penalized nodes is supported this way, anything else needs a level_handler (which disables the hierarchy). Avoidance zones are applied on top of this.
+
+        :param1 blocked: Node ids that routes may not pass through, kept apart from the nodes blocked by update (optional).
+        :param2 penalties: Multiplier for the cost of every edge into a node, keyed by node id (optional).
+        """
+        avoided = np.zeros(len(self.graph), dtype=bool)
+        if blocked:
+            avoided[self.graph.indices_of(blocked)] = True
+        multipliers = np.ones(len(self.graph))
+        if penalties:
+            multipliers[self.graph.indices_of(list(penalties.keys()))] = list(
+                penalties.values()
+            )
+        with self.lock.write():
+            self.graph.update(penalties=multipliers, avoided=avoided)
+            if self.hierarchy is not None:
+                self._customize_hierarchy()
+            self.cache.clear()
+
+    def _customize_hierarchy(self):
+        weights = self.graph.edges.weights
+        if len(self.zones):
+            weights = np.where(self.zones.edges, np.inf, weights)
+        self.hierarchy.customize(weights=weights)
+        self._customized_version = (self.zones.version, self.graph.version)
+
+    def avoid_circle(self, x: float, y: float, radius: float) -> int:
+        """Avoids every node within radius meters of (x, y). Routes may still start inside a zone, or end inside one if the destination is.
+
+        :ret: zone id, pass it to remove_avoidance to lift the zone
+        """
+        with self.lock.write():
+            zone_id = self.zones.add_circle(x, y, radius)
+            self._zones_changed()
+        return zone_id
+
+    def avoid_polygon(self, points: list[tuple[float, float]]) -> int:
+        """Avoids every node inside polygon given by its corners in cartesian format (x, y). Routes may still start inside a zone, or end inside one if the destination is.
+
+        :ret: zone id, pass it to remove_avoidance to lift the zone
+        """
+        with self.lock.write():
+            zone_id = self.zones.add_polygon(points)
+            self._zones_changed()
+        return zone_id
+
+    def remove_avoidance(self, zone_id: int = None):
+        """Lifts avoidance zone given its id, or every zone if no id is given."""
+        with self.lock.write():
+            if zone_id is None:
+                self.zones.clear()
+            else:
+                self.zones.remove(zone_id)
+            self._zones_changed()
+
+    def _zones_changed(self):
+        """Customizes the hierarchy, if built, for the new zones and clears the cache, the caller holds the write lock."""
+        if self.hierarchy is not None:
+            self._customize_hierarchy()
+        self.cache.clear()
+
+    def update(
+        self,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ) -> int:
+        """Applies live cost updates, such as new danger levels, to the edge values in place without rebuilding anything, see Graph.update. Waits for running queries to finish and holds new ones back until done.
 
-        if source_id not in self._cached_routes:
-            self._cached_routes[source_id] = {}
+        Only cached routes passing through a node with a changed edge are dropped, unless an edge got cheaper or a node was unblocked, which can improve any route and clears the whole cache. The contraction hierarchy, if built, is customized again.
 
-        self._cached_routes[source_id][destination_id] = route
+        :param1 multipliers: Multiplier of the cost of every edge given by (source node id, target node id), relative to its value in the graph file and replacing the multiplier set before. Parallel edges all get it, inf removes the edge (optional).
+        :param2 blocked: Node ids that routes may not pass through, start or end at until unblocked (optional).
+        :param3 unblocked: Node ids to unblock (optional).
 
-    def save(self, filepath=None):
+        :ret: graph version after the update
+        """
+        edges, values, block, unblock = self._update_arrays(
+            multipliers, blocked, unblocked
+        )
+
+        with self.lock.write():
+            changed, cheaper = self.graph.update(edges, values, block, unblock)
+            if self.hierarchy is not None:
+                self._customize_hierarchy()
+            if cheaper or unblocked:
+                self.cache.clear()
+            else:
+                self.cache.invalidate(self.graph.ids[changed].tolist())
+        return self.graph.version
+
+    def check_update(
+        self,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ):
+        """Raises KeyError with the first node id or (source id, target id) edge of an update that is not in the graph, without applying anything, see update for the parameters."""
+        self._update_arrays(multipliers, blocked, unblocked)
+
+    def _update_arrays(
+        self,
+        multipliers: dict[tuple[int, int], float] = None,
+        blocked: list[int] = None,
+        unblocked: list[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (edge positions, multipliers, nodes to block, nodes to unblock) of an update for Graph.update, None where not given. Raises KeyError on unknown nodes and edges."""
+        edges, values, block, unblock = None, None, None, None
+        if multipliers:
+            pairs = self.graph.indices_of(list(multipliers.keys())).reshape(-1, 2)
+            edges, k = self.graph.edge_positions(pairs[:, 0], pairs[:, 1])
+            values = np.fromiter(multipliers.values(), dtype=np.float64)[k]
+        if blocked:
+            block = self.graph.indices_of(blocked)
+        if unblocked:
+            unblock = self.graph.indices_of(unblocked)
+        return edges, values, block, unblock
+
+    def warm_cache(self, pairs: np.ndarray, processes: int = None) -> list[Route]:
+        """Computes routes between pairs of node indices and adds them to the cache, such as the most frequent queries of a log, see saferouting.warmup. Pairs are added in reverse order, so the first pair is the most recently used.
+
+        :param1 pairs: Array of shape (n, 2) holding (source index, destination index) pairs.
+        :param2 processes: If given, splits pairs across this many worker processes, each receiving a copy of the routes object (optional).
+
+        :ret: list of routes aligned with pairs
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        if processes and processes > 1 and len(pairs) > 1:
+            chunks = np.array_split(pairs, min(4 * processes, len(pairs)))
+            with ProcessPoolExecutor(
+                processes, initializer=_init_worker, initargs=(self,)
+            ) as executor:
+                routes = [r for chunk in executor.map(_routes, chunks) for r in chunk]
+        else:
+            with self.lock.read():
+                routes = self._routes(pairs)
+
+        with self.lock.read():
+            for (source_id, destination_id), route in reversed(
+                list(zip(pairs.tolist(), routes))
+            ):
+                self.cache.put((source_id, destination_id), route)
+        return routes
+
+    def _routes(self, pairs: np.ndarray) -> list[Route]:
+        """Returns routes between pairs of node indices, see warm_cache."""
+        routes = []
+        for source_id, destination_id in pairs.tolist():
+            stats = {"handler_ms": 0.0}
+            s = time.perf_counter()
+            r = self._search(source_id, destination_id, stats)
+            stats["search_ms"] = (time.perf_counter() - s) * 1000
+            routes.append(Route(**r, **stats))
+        return routes
+
+    def save_cache(self, filepath: str):
+        """Writes the cached routes to a compact .npz file, which load_cache reads back into a routes object loaded from the same file, for example at server startup."""
+        with self.lock.read():
+            self.cache.save(filepath, self.graph.ids, self._cache_fingerprint())
+
+    def load_cache(self, filepath: str) -> int:
+        """Adds routes written by save_cache to the cache. Files written from a different graph, edge values, avoidance zones or level_handler are not loaded.
+
+        :ret: number of routes added
+        """
+        with self.lock.write():
+            return self.cache.load(filepath, self.graph, self._cache_fingerprint())
+
+    def _cache_fingerprint(self) -> str:
+        """Returns digest of everything cached routes depend on."""
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (
+            self.graph.ids,
+            self.graph.edges.indices,
+            self.graph.edges.weights,
+            self.zones.nodes,
+        ):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        handler = getattr(self.level_handler, "__qualname__", repr(self.level_handler))
+        digest.update(handler.encode())
+        return digest.hexdigest()
+
+    def save(self, filepath=None, arrays=False):
+        """Serializes routes object to filepath, which Routes(serialized_filepath=filepath) loads.
+
+        :param1 filepath: File or directory to save to (default serialize.DEFAULT_FILE_PATH).
+        :param2 arrays: If True, saves a directory of memory mappable arrays instead of a pickle, see serialize.save_arrays (default False).
+        """
+        save = serialize.save_arrays if arrays else serialize.save
         if filepath:
-            serialize.save(self, filepath)
+            save(self, filepath)
         else:
-            serialize.save(self)
+            save(self)
+
+
+# routes object of a worker process, see Routes.get_matrix and Routes.warm_cache
+_worker_routes: Routes = None
+
+
+def _init_worker(routes: Routes):
+    global _worker_routes
+    _worker_routes = routes
+
+
+def _matrix_rows(source_ids, destination_ids, paths):
+    return _worker_routes._matrix_rows(source_ids, destination_ids, paths)
+
+
+def _routes(pairs):
+    return _worker_routes._routes(pairs)
@@ -1,7 +1,23 @@
+from xml.etree import ElementTree
+
+import importlib
+import io
+import json
+import os
 import pickle
+import types
+
+import numpy as np
 
 DEFAULT_FILE_PATH = ".serialized_routes"
 
+# version of the array directory format, bumped whenever the layout changes
+FORMAT_VERSION = 3
+HEADER_FILE = "header.json"
+
+# arrays up to this many elements are stored in the header instead of their own file
+INLINE_SIZE = 16
+
 
 def save(routes, filepath: str = DEFAULT_FILE_PATH):
     with open(filepath, "wb") as outp:
@@ -9,5 +25,211 @@ def save(routes, filepath: str = DEFAULT_FILE_PATH):
 
 
 def load(filepath: str = DEFAULT_FILE_PATH):
+    """Loads routes object given either a pickle file or an array directory written by save_arrays. Pickles written before graphs were compiled into CSR arrays are upgraded, see _upgrade."""
+    if os.path.isdir(filepath):
+        return load_arrays(filepath)
     with open(filepath, "rb") as inp:
-        return pickle.load(inp)
+        routes = _LegacyUnpickler(inp).load()
+    if not hasattr(routes.graph, "ids"):
+        print(
+            "Warning: {0} was written by an older version, rebuilding its graph. Save it again to skip this step.".format(
+                filepath
+            )
+        )
+        routes = _upgrade(routes)
+    return routes
+
+
+class _LegacyEdges:
+    """Stands in for the Edge and Edges classes of pickles written before graphs were compiled into CSR arrays. Their adjacency was never pickled, it lived in a class attribute."""
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module == "saferouting.graph.edge" and name in ("Edge", "Edges"):
+            return _LegacyEdges
+        return super().find_class(module, name)
+
+
+def _upgrade(routes):
+    """Returns a current routes object given one unpickled from an old pickle. Its graph is rebuilt from the parsed GraphML document old graphs kept in their d attribute, bounds and level_handler are kept, and cached routes are dropped."""
+    from .graph import Graph
+
+    ((tag, document),) = routes.graph.d.items()
+    graphml = io.BytesIO(ElementTree.tostring(_element(tag, document)))
+    return type(routes)(
+        graph=Graph(graphml),
+        bounds=routes.bounds,
+        level_handler=routes.level_handler,
+    )
+
+
+def _element(tag: str, value) -> ElementTree.Element:
+    """Returns XML element given a tag and its xmltodict representation, where "@" keys are attributes, "#text" is text and other keys are children, repeated if their value is a list."""
+    elem = ElementTree.Element(tag)
+    if not isinstance(value, dict):
+        elem.text = None if value is None else str(value)
+        return elem
+    for key, child in value.items():
+        if key.startswith("@"):
+            elem.set(key[1:], str(child))
+        elif key == "#text":
+            elem.text = child
+        else:
+            for c in child if isinstance(child, list) else [child]:
+                elem.append(_element(key, c))
+    return elem
+
+
+def save_arrays(routes, dirpath: str = DEFAULT_FILE_PATH):
+    """Saves routes object as a directory of .npy files plus a JSON header describing how to rebuild the objects around them.
+
+    Unlike pickles, the arrays can be memory mapped by load_arrays, so processes loading the same directory share one copy through the page cache and start without parsing anything but the header.
+    """
+    os.makedirs(dirpath, exist_ok=True)
+    for name in os.listdir(dirpath):
+        if name.endswith(".npy") or name == HEADER_FILE:
+            os.remove(os.path.join(dirpath, name))
+
+    encoder = _Encoder(dirpath)
+    header = {"version": FORMAT_VERSION, "root": encoder.encode(routes, "routes")}
+    with open(os.path.join(dirpath, HEADER_FILE), "w") as outp:
+        json.dump(header, outp)
+
+
+def load_arrays(dirpath: str = DEFAULT_FILE_PATH, mmap=True):
+    """Loads routes object given a directory written by save_arrays.
+
+    :param1 dirpath: Directory to load from.
+    :param2 mmap: If True, arrays are memory mapped copy-on-write, so pages are only read when used and shared between processes until written to. Else arrays are read into memory (default True).
+    """
+    with open(os.path.join(dirpath, HEADER_FILE)) as inp:
+        header = json.load(inp)
+    if header.get("version") != FORMAT_VERSION:
+        raise Exception(
+            "Unsupported array directory version %s, expected %s."
+            % (header.get("version"), FORMAT_VERSION)
+        )
+    return _Decoder(dirpath, "c" if mmap else None).decode(header["root"])
+
+
+class _Encoder:
+    """Encodes an object tree into JSON values, writing arrays to .npy files. Objects referenced more than once are encoded once and referenced by name afterwards."""
+
+    def __init__(self, dirpath: str):
+        self.dirpath = dirpath
+        self.names = {}
+
+    def encode(self, value, name: str):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, np.generic):
+            return value.item()
+
+        if id(value) in self.names:
+            return {"ref": self.names[id(value)]}
+
+        if isinstance(value, np.ndarray):
+            self.names[id(value)] = name
+            if value.size <= INLINE_SIZE and value.dtype != object:
+                return {
+                    "name": name,
+                    "inline": value.tolist(),
+                    "dtype": value.dtype.str,
+                    "shape": value.shape,
+                }
+            np.save(os.path.join(self.dirpath, name + ".npy"), value)
+            return {"name": name, "array": name + ".npy"}
+
+        if isinstance(value, (list, tuple)):
+            return {
+                "tuple"
+                if isinstance(value, tuple)
+                else "list": [
+                    self.encode(v, "%s.%d" % (name, k)) for k, v in enumerate(value)
+                ]
+            }
+        if isinstance(value, dict):
+            return {
+                "dict": [
+                    [self.encode(k, name), self.encode(v, "%s.%s" % (name, k))]
+                    for k, v in value.items()
+                ]
+            }
+
+        if isinstance(value, types.FunctionType):
+            if "<" in value.__qualname__:
+                print(
+                    "Warning: Function %s can't be saved, it is saved as None."
+                    % value.__qualname__
+                )
+                return None
+            return {"function": "%s:%s" % (value.__module__, value.__qualname__)}
+
+        cls = type(value)
+        if not cls.__module__.startswith(__package__):
+            raise Exception("Can't save object of type %s." % cls.__qualname__)
+        self.names[id(value)] = name
+
+        # classes that pick their own state (dict returning __getstate__) get it back through __setstate__
+        state = value.__getstate__()
+        custom = isinstance(state, dict) and state is not value.__dict__
+        if not custom:
+            state = value.__dict__
+        return {
+            "name": name,
+            "class": "%s:%s" % (cls.__module__, cls.__qualname__),
+            "setstate": custom,
+            "state": {k: self.encode(v, "%s.%s" % (name, k)) for k, v in state.items()},
+        }
+
+
+class _Decoder:
+    def __init__(self, dirpath: str, mmap_mode: str):
+        self.dirpath = dirpath
+        self.mmap_mode = mmap_mode
+        self.objects = {}
+
+    def decode(self, value):
+        if not isinstance(value, dict):
+            return value
+        if "ref" in value:
+            return self.objects[value["ref"]]
+        if "tuple" in value:
+            return tuple(map(self.decode, value["tuple"]))
+        if "list" in value:
+            return list(map(self.decode, value["list"]))
+        if "dict" in value:
+            return {self.decode(k): self.decode(v) for k, v in value["dict"]}
+        if "function" in value:
+            return _resolve(value["function"])
+
+        if "inline" in value:
+            obj = np.array(value["inline"], dtype=value["dtype"]).reshape(
+                value["shape"]
+            )
+        elif "array" in value:
+            obj = np.load(
+                os.path.join(self.dirpath, value["array"]), mmap_mode=self.mmap_mode
+            )
+        else:
+            cls = _resolve(value["class"])
+            obj = cls.__new__(cls)
+
+            # registered before decoding state, so objects can reference their owner
+            self.objects[value["name"]] = obj
+            state = {k: self.decode(v) for k, v in value["state"].items()}
+            if value["setstate"]:
+                obj.__setstate__(state)
+            else:
+                obj.__dict__.update(state)
+        self.objects[value["name"]] = obj
+        return obj
+
+
+def _resolve(path: str):
+    module, qualname = path.split(":")
+    obj = importlib.import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
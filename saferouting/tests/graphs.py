@@ -0,0 +1,76 @@
+from benchmarks.graphs import grid, write_graphml
+from saferouting.graph import Graph
+
+import os
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+
+def make_graph(
+    coords, sources, targets, lengths, oneway=None, directory: str = None
+) -> Graph:
+    """Writes edges given by node index to a GraphML file and returns the Graph read from it. Node i gets OSM id 1000 + i.
+
+    :param6 directory: Directory to write the file to, a new temporary directory if not given (optional).
+    """
+    directory = directory or tempfile.mkdtemp()
+    filepath = os.path.join(directory, "graph.graphml")
+    sources, targets = np.asarray(sources), np.asarray(targets)
+    if oneway is None:
+        oneway = np.ones(len(sources), dtype=bool)
+    write_graphml(
+        filepath,
+        np.asarray(coords, dtype=np.float64),
+        sources,
+        targets,
+        np.asarray(lengths, dtype=np.float64),
+        np.asarray(oneway),
+    )
+    return Graph(filepath)
+
+
+def grid_graph(
+    rows: int = 12, seed: int = 0, directory: str = None, drop: float = 0.1
+) -> Graph:
+    """Returns a jittered street grid with some one-way and missing segments, see benchmarks.graphs.grid."""
+    return make_graph(*grid(rows, drop=drop, seed=seed), directory=directory)
+
+
+def reference_costs(
+    graph: Graph, source: int, removed: np.ndarray = None
+) -> dict[int, float]:
+    """Returns cost of the best route from a node index to every node reachable from it, computed with networkx over graph.edges as they currently are.
+
+    :param3 removed: Boolean mask aligned with graph.edges of edges to leave out (optional).
+    """
+    reference = nx.DiGraph()
+    reference.add_nodes_from(range(len(graph)))
+    sources, targets = graph.edges.sources(), graph.edges.indices
+    keep = np.isfinite(graph.edges.weights)
+    if removed is not None:
+        keep &= ~removed
+    for u, v, w in zip(
+        sources[keep].tolist(),
+        targets[keep].tolist(),
+        graph.edges.weights[keep].tolist(),
+    ):
+        if w < reference.get_edge_data(u, v, {"weight": np.inf})["weight"]:
+            reference.add_edge(u, v, weight=w)
+    return nx.single_source_dijkstra_path_length(reference, source)
+
+
+def query_pairs(graph: Graph, count: int, seed: int = 0) -> list[tuple[int, int]]:
+    """Returns seeded random (source, destination) node index pairs."""
+    rng = np.random.default_rng(seed)
+    return [tuple(p) for p in rng.integers(0, len(graph), (count, 2)).tolist()]
+
+
+def path_cost(graph: Graph, node_ids: list[int]) -> float:
+    """Returns sum of the lowest edge values between consecutive OSM node ids of a path."""
+    nodes = graph.indices_of(node_ids)
+    positions, pairs = graph.edge_positions(nodes[:-1], nodes[1:])
+    values = np.full(len(nodes) - 1, np.inf)
+    np.minimum.at(values, pairs, graph.edges.weights[positions])
+    return float(values.sum())
@@ -0,0 +1,121 @@
+from saferouting import Routes
+from saferouting.cache import RouteCache
+from saferouting.route import Route
+
+from .graphs import grid_graph, query_pairs
+
+import threading
+import unittest
+
+
+def route(nodes: list[int]) -> Route:
+    return Route([(float(n), 0.0) for n in nodes], nodes, float(len(nodes)))
+
+
+def run_threads(target, count: int = 8) -> list[Exception]:
+    """Runs target(thread number) on count threads at once and returns the exceptions they raised."""
+    errors = []
+    start = threading.Barrier(count)
+
+    def run(k):
+        try:
+            start.wait()
+            target(k)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class RouteCacheTest(unittest.TestCase):
+    def test_least_recently_used_eviction(self):
+        cache = RouteCache(max_entries=2)
+        cache.put((0, 1), route([0, 1]))
+        cache.put((1, 2), route([1, 2]))
+        cache.get((0, 1))
+        cache.put((2, 3), route([2, 3]))
+        self.assertIn((0, 1), cache)
+        self.assertNotIn((1, 2), cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_invalidate(self):
+        cache = RouteCache()
+        cache.put((0, 2), route([0, 1, 2]))
+        cache.put((3, 4), route([3, 4]))
+        self.assertEqual(cache.invalidate([1]), 1)
+        self.assertNotIn((0, 2), cache)
+        self.assertIn((3, 4), cache)
+        self.assertNotIn(1, cache.keys_by_node)
+
+    def test_concurrent_access(self):
+        cache = RouteCache(max_entries=16)
+
+        def work(k):
+            for i in range(2000):
+                key = ((i * 7 + k) % 40, (i + k) % 40)
+                cache.put(key, route([key[0], 100 + i % 5, key[1]]))
+                cache.get(((i + 3) % 40, (i * 7 + k) % 40))
+                if i % 50 == 0:
+                    cache.invalidate([100 + k % 5])
+
+        self.assertEqual(run_threads(work), [])
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 16)
+        self.assertEqual(
+            stats["bytes"], sum(size for _, size, _ in cache.entries.values())
+        )
+        indexed = {key for keys in cache.keys_by_node.values() for key in keys}
+        self.assertEqual(indexed, set(cache.entries))
+
+    def test_invalidated_by_update(self):
+        graph = grid_graph(8, seed=6)
+        routes = Routes(graph=graph)
+        coords, ids = graph.coords.tolist(), graph.ids.tolist()
+        first, second = [(coords[s], coords[d]) for s, d in [(0, 63), (7, 56)]]
+        route = routes.get_path(*first)
+        routes.get_path(*second)
+        self.assertTrue(routes.get_path(*first).misc["cache_hit"])
+
+        # a more expensive edge only drops routes through its nodes
+        u, v = route.nodes[1], route.nodes[2]
+        self.assertFalse({u, v} & set(routes.get_path(*second).nodes))
+        routes.update({(u, v): 50.0})
+        self.assertNotIn(
+            (ids.index(route.nodes[0]), ids.index(route.nodes[-1])), routes.cache
+        )
+        self.assertTrue(routes.get_path(*second).misc["cache_hit"])
+        updated = routes.get_path(*first)
+        self.assertFalse(updated.misc["cache_hit"])
+        self.assertEqual(
+            updated.cost,
+            Routes(graph=graph, cache=RouteCache(max_entries=0)).get_path(*first).cost,
+        )
+
+        # a cheaper edge can improve any route
+        routes.update({(u, v): 1.0})
+        self.assertEqual(len(routes.cache), 0)
+        self.assertEqual(routes.get_path(*first).cost, route.cost)
+
+    def test_concurrent_queries(self):
+        graph = grid_graph(8)
+        routes = Routes(graph=graph, cache=RouteCache(max_entries=8))
+        pairs = query_pairs(graph, 40)
+        coords = graph.coords.tolist()
+        expected = [routes.get_path(coords[s], coords[d]).cost for s, d in pairs]
+
+        def work(k):
+            for i in range(120):
+                s, d = pairs[(i + k) % len(pairs)]
+                cost = routes.get_path(coords[s], coords[d]).cost
+                assert cost == expected[(i + k) % len(pairs)]
+
+        self.assertEqual(run_threads(work), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+from saferouting import Routes
+from saferouting.cache import RouteCache
+from saferouting.graph import CompiledGraph
+
+from .graphs import grid_graph, make_graph, path_cost, query_pairs, reference_costs
+
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+
+ORIGIN = (-122.45, 37.75)
+
+
+def python_engine():
+    """Runs the block without the compiled backend, as if scipy was not installed."""
+    return mock.patch.object(CompiledGraph, "available", return_value=False)
+
+
+@unittest.skipUnless(CompiledGraph.available(), "scipy is not installed")
+class CompiledSearchTest(unittest.TestCase):
+    def route(self, routes: Routes, source: int, destination: int):
+        coords = routes.graph.coords
+        return routes.get_path(tuple(coords[source]), tuple(coords[destination]))
+
+    def assert_matches_python_engine(self, routes: Routes, pairs):
+        for source, destination in pairs:
+            compiled = self.route(routes, source, destination)
+            with python_engine():
+                python = self.route(routes, source, destination)
+            self.assertAlmostEqual(compiled.cost, python.cost, places=6)
+            self.assertEqual("error" in compiled.misc, "error" in python.misc)
+            if compiled.cost < math.inf:
+                self.assertAlmostEqual(
+                    path_cost(routes.graph, compiled.nodes), compiled.cost, places=6
+                )
+
+    def test_edges_longer_than_straight_line(self):
+        # two nodes 10 m apart joined by 50 m edges, the first limit of 2 * 10 m reaches nothing
+        dx = math.degrees(10 / 6371008.8) / math.cos(math.radians(ORIGIN[1]))
+        coords = [ORIGIN, (ORIGIN[0] + dx, ORIGIN[1])]
+        graph = make_graph(coords, [0, 1], [1, 0], [50.0, 50.0])
+        routes = Routes(graph=graph, cache=RouteCache(max_entries=0))
+
+        route = self.route(routes, 0, 1)
+        self.assertNotIn("error", route.misc)
+        self.assertAlmostEqual(route.cost, 50.0)
+        self.assert_matches_python_engine(routes, [(0, 1), (1, 0)])
+
+    def test_stretched_grid(self):
+        graph = grid_graph(10, seed=3)
+        graph.edges.weights[::7] *= 20  # detours far longer than the straight line
+        routes = Routes(graph=graph, cache=RouteCache(max_entries=0))
+        self.assert_matches_python_engine(routes, query_pairs(graph, 60, seed=3))
+
+    def test_reference_costs(self):
+        graph = grid_graph(12)
+        routes = Routes(graph=graph, cache=RouteCache(max_entries=0))
+        for source, destination in query_pairs(graph, 40):
+            expected = reference_costs(graph, source).get(destination, math.inf)
+            self.assertAlmostEqual(
+                self.route(routes, source, destination).cost, expected, places=6
+            )
+
+    def test_matrix_and_reachable(self):
+        graph = grid_graph(10, seed=1)
+        routes = Routes(graph=graph)
+        points = graph.coords[[0, 17, 55, 80, 99]].tolist()
+        matrix = routes.get_matrix(points[:2], points[2:], paths=True)
+        reachable = routes.get_reachable(points[0], 400)
+        with python_engine():
+            expected = routes.get_matrix(points[:2], points[2:], paths=True)
+            expected_reachable = routes.get_reachable(points[0], 400)
+
+        np.testing.assert_allclose(matrix["costs"], expected["costs"])
+        self.assertEqual(set(reachable["nodes"]), set(expected_reachable["nodes"]))
+        np.testing.assert_allclose(
+            sorted(reachable["costs"]), sorted(expected_reachable["costs"])
+        )
+
+    def test_falls_back_with_level_handler(self):
+        graph = grid_graph(6)
+        routes = Routes(graph=graph, level_handler=lambda ids, *args: ids)
+        self.assertIsNone(routes._compiled(0))
+
+    def test_engine_heuristic(self):
+        graph = grid_graph(6)
+        graph.build_landmarks(2)
+        pairs = query_pairs(graph, 10)
+        for heuristic, engine in [("haversine", "compiled"), ("alt", "a_star")]:
+            routes = Routes(
+                graph=graph, heuristic=heuristic, cache=RouteCache(max_entries=0)
+            )
+            for source, destination in pairs:
+                route = self.route(routes, source, destination)
+                if graph.reachable(source, destination):
+                    self.assertEqual(route.misc["engine"], engine, heuristic)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+from saferouting.graph.util import read_graphml
+
+import io
+import unittest
+
+import numpy as np
+
+GRAPHML = """<?xml version='1.0' encoding='utf-8'?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  {keys}
+  <graph edgedefault="directed">
+    <node id="1"><data key="d0">37.75</data><data key="d1">-122.45</data></node>
+    <node id="2"><data key="d0">37.76</data><data key="d1">-122.45</data></node>
+    <edge source="1" target="2"><data key="d2">50.0</data><data key="d3">True</data></edge>
+  </graph>
+</graphml>
+"""
+
+KEYS = [
+    '<key id="d0" for="node" attr.name="y" />',
+    '<key id="d1" for="node" attr.name="x" />',
+    '<key id="d2" for="edge" attr.name="length" />',
+    '<key id="d3" for="edge" attr.name="reversed" />',
+]
+
+
+def parse(keys: list[str]):
+    return read_graphml(io.BytesIO(GRAPHML.format(keys="\n".join(keys)).encode()))
+
+
+class ReadGraphMLTest(unittest.TestCase):
+    def test_reversed_edges(self):
+        ids, coords, sources, targets, values = parse(KEYS)
+        np.testing.assert_array_equal(ids, [1, 2])
+        np.testing.assert_array_equal(coords[0], [-122.45, 37.75])
+        np.testing.assert_array_equal(sources, [1, 2])
+        np.testing.assert_array_equal(targets, [2, 1])
+        np.testing.assert_array_equal(values, [50.0, 50.0])
+
+    def test_reversed_key_optional(self):
+        ids, coords, sources, targets, values = parse(KEYS[:3])
+        np.testing.assert_array_equal(sources, [1])
+        np.testing.assert_array_equal(targets, [2])
+
+    def test_missing_keys(self):
+        for k in range(3):
+            with self.assertRaises(Exception):
+                parse(KEYS[:k] + KEYS[k + 1 :])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from saferouting import Routes
+from saferouting.cache import RouteCache
+
+from .graphs import grid_graph, query_pairs, reference_costs
+from .test_cache import run_threads
+
+import math
+import unittest
+
+
+class HierarchyTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = grid_graph(10, seed=2)
+        self.routes = Routes(graph=self.graph, cache=RouteCache(max_entries=0))
+        self.routes.build_hierarchy()
+        self.pairs = query_pairs(self.graph, 30, seed=2)
+
+    def cost(self, source: int, destination: int) -> float:
+        coords = self.graph.coords
+        return self.routes.get_path(
+            tuple(coords[source]), tuple(coords[destination])
+        ).cost
+
+    def test_reference_costs(self):
+        for source, destination in self.pairs:
+            expected = reference_costs(self.graph, source).get(destination, math.inf)
+            self.assertAlmostEqual(self.cost(source, destination), expected, places=6)
+
+    def test_customized_after_zone_change(self):
+        center = self.graph.coords.mean(axis=0)
+        self.routes.avoid_circle(*center, 150)
+        self.assertEqual(
+            self.routes._customized_version,
+            (self.routes.zones.version, self.graph.version),
+        )
+        zones = self.routes.zones
+        for source, destination in self.pairs:
+            if zones.nodes[destination]:
+                continue
+            expected = reference_costs(self.graph, source, zones.edges)
+            self.assertAlmostEqual(
+                self.cost(source, destination),
+                expected.get(destination, math.inf),
+                places=6,
+            )
+
+    def test_customize(self):
+        ids = self.graph.ids.tolist()
+        self.routes.customize(blocked=[ids[44], ids[55]], penalties={ids[12]: 3.0})
+        self.assertEqual(
+            self.routes._customized_version,
+            (self.routes.zones.version, self.graph.version),
+        )
+        for source, destination in self.pairs:
+            expected = reference_costs(self.graph, source).get(destination, math.inf)
+            self.assertAlmostEqual(self.cost(source, destination), expected, places=6)
+            route = self.routes.get_path(
+                tuple(self.graph.coords[source]),
+                tuple(self.graph.coords[destination]),
+                bidirectional=True,
+            )
+            self.assertAlmostEqual(route.cost, expected, places=6)
+
+    def test_queries_during_updates(self):
+        ids = self.graph.ids
+        sources, targets = self.graph.edges.sources(), self.graph.edges.indices
+        slower = {
+            (int(ids[u]), int(ids[v])): 4.0
+            for u, v in zip(sources[::3].tolist(), targets[::3].tolist())
+        }
+        before = [self.cost(*pair) for pair in self.pairs]
+        self.routes.update(slower)
+        after = [self.cost(*pair) for pair in self.pairs]
+        self.routes.update({key: 1.0 for key in slower})
+
+        def work(k):
+            if k == 0:
+                for i in range(20):
+                    self.routes.update({key: 4.0 if i % 2 else 1.0 for key in slower})
+                return
+            for i in range(200):
+                j = (i + k) % len(self.pairs)
+                cost = self.cost(*self.pairs[j])
+                assert math.isclose(cost, before[j]) or math.isclose(cost, after[j])
+
+        self.assertEqual(run_threads(work, 6), [])
+
+    def test_queries_during_zone_changes(self):
+        center = self.graph.coords.mean(axis=0)
+        zone = self.routes.avoid_circle(*center, 150)
+        inside = self.routes.zones.nodes.copy()
+        pairs = [p for p in self.pairs if not inside[p[0]] and not inside[p[1]]]
+        avoided = [self.cost(*pair) for pair in pairs]
+        self.routes.remove_avoidance(zone)
+        free = [self.cost(*pair) for pair in pairs]
+
+        def work(k):
+            if k == 0:
+                for i in range(20):
+                    zone = self.routes.avoid_circle(*center, 150)
+                    self.routes.remove_avoidance(zone)
+                return
+            for i in range(200):
+                j = (i + k) % len(pairs)
+                cost = self.cost(*pairs[j])
+                assert math.isclose(cost, avoided[j]) or math.isclose(cost, free[j])
+
+        self.assertEqual(run_threads(work, 6), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from saferouting import Routes
+from saferouting.profiler import SamplingProfiler
+
+from .graphs import grid_graph
+from .test_cache import run_threads
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+
+def slow_query():
+    time.sleep(0.05)
+
+
+class SamplingProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.reports = []
+        self.profiler = SamplingProfiler(
+            threshold_ms=20, interval_ms=1, report=self.record
+        )
+
+    def record(self, name: str, elapsed: float, stacks: str):
+        self.reports.append((name, elapsed, stacks))
+
+    def test_reports_slow_queries(self):
+        with self.profiler.sample("slow"):
+            slow_query()
+        with self.profiler.sample("fast"):
+            pass
+        self.assertEqual([r[0] for r in self.reports], ["slow"])
+        self.assertIn("test_profiler.py:slow_query", self.reports[0][2])
+
+    def test_one_sampler_thread(self):
+        threads = threading.active_count()
+        with self.profiler.sample():
+            pass
+        sampler = self.profiler.sampler
+
+        def work(k):
+            for _ in range(3):
+                with self.profiler.sample("slow"):
+                    slow_query()
+
+        self.assertEqual(run_threads(work, 6), [])
+        self.assertIs(self.profiler.sampler, sampler)
+        self.assertEqual(threading.active_count(), threads + 1)
+        self.assertEqual(len(self.reports), 18)
+        self.assertTrue(all("slow_query" in r[2] for r in self.reports))
+        self.assertEqual(self.profiler.active, {})
+
+    def test_serialization(self):
+        routes = Routes(graph=grid_graph(4), profiler=SamplingProfiler(250))
+        routes.get_path(*routes.graph.coords[[0, 15]].tolist())
+        for arrays in [False, True]:
+            filepath = os.path.join(tempfile.mkdtemp(), "routes")
+            routes.save(filepath, arrays=arrays)
+            profiler = Routes(serialized_filepath=filepath).profiler
+            self.assertEqual(profiler.threshold_ms, 250)
+            self.assertIsNone(profiler.sampler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from saferouting import Routes
+from saferouting.regions import RegionRegistry, footprint
+
+from .graphs import grid_graph
+
+import os
+import tempfile
+import unittest
+
+
+class RegionRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = grid_graph(6, seed=8)
+        filepath = os.path.join(tempfile.mkdtemp(), "routes")
+        Routes(graph=self.graph).save(filepath, arrays=True)
+        self.registry = RegionRegistry()
+        self.registry.add("grid", None, filepath)
+        ids, edges = self.graph.ids.tolist(), self.graph.edges
+        self.edge = (ids[0], ids[int(edges.indices[edges.positions([0])[0]])])
+
+    def test_unknown_ids_are_not_kept(self):
+        for update in [
+            {"multipliers": {(self.edge[0], 1): 2.0}},
+            {"multipliers": {self.edge: 2.0}, "blocked": [1]},
+            {"unblocked": [1]},
+        ]:
+            self.registry.evict("grid")
+            with self.assertRaises(KeyError):
+                self.registry.update("grid", **update)
+            self.assertFalse(self.registry.regions["grid"].updates)
+
+    def test_updates_replayed_after_eviction(self):
+        self.registry.update("grid", multipliers={self.edge: 3.0})
+        self.registry.evict("grid")
+        self.registry.update("grid", blocked=[self.edge[1]])
+        self.registry.evict("grid")
+        graph = self.registry.get("grid").graph
+        self.assertTrue(graph.blocked[graph.indices_of([self.edge[1]])[0]])
+        self.assertEqual(graph.multipliers.max(), 3.0)
+
+    def test_attached_resources(self):
+        filepath = self.registry.regions["grid"].serialized_filepath
+        self.registry = RegionRegistry(memory_budget=int(1.5 * footprint(filepath)))
+        self.registry.add("a", None, filepath)
+        self.registry.add("b", None, filepath)
+        released = []
+        self.registry.attach("a", 1, lambda: released.append("not loaded"))
+        self.assertEqual(released, ["not loaded"])
+
+        self.registry.get("a")
+        self.registry.attach("a", 100, lambda: released.append("a"))
+        self.assertEqual(self.registry.stats()["bytes"], footprint(filepath) + 100)
+        self.registry.get("b")
+        self.assertEqual(released, ["not loaded", "a"])
+        self.assertEqual(self.registry.stats()["loaded"], ["b"])
+
+        # a region is reloaded without the resources released with it
+        self.registry.get("a")
+        self.assertEqual(self.registry.regions["a"].size, footprint(filepath))
+
+
+if __name__ == "__main__":
+    unittest.main()
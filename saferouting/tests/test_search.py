@@ -0,0 +1,142 @@
+from saferouting import Routes, metrics
+from saferouting.cache import RouteCache
+
+from .graphs import grid_graph, path_cost, query_pairs, reference_costs
+from .test_compiled import python_engine
+
+import math
+import unittest
+
+import numpy as np
+
+
+class SearchTest(unittest.TestCase):
+    """Checks every A* search mode against networkx Dijkstra. The compiled backend is left out, see test_compiled."""
+
+    def setUp(self):
+        self.graph = grid_graph(10, seed=5)
+        self.routes = Routes(graph=self.graph, cache=RouteCache(max_entries=0))
+        self.pairs = query_pairs(self.graph, 30, seed=5)
+        self.engine = python_engine()
+        self.engine.start()
+        self.addCleanup(self.engine.stop)
+
+    def route(self, source: int, destination: int, **kwargs):
+        coords = self.graph.coords
+        return self.routes.get_path(
+            tuple(coords[source]), tuple(coords[destination]), **kwargs
+        )
+
+    def assert_reference_costs(self, removed: np.ndarray = None, **kwargs):
+        for source, destination in self.pairs:
+            if removed is not None and self.routes.zones.nodes[destination]:
+                continue
+            expected = reference_costs(self.graph, source, removed)
+            route = self.route(source, destination, **kwargs)
+            self.assertAlmostEqual(
+                route.cost, expected.get(destination, math.inf), places=6
+            )
+            if route.cost < math.inf:
+                self.assertAlmostEqual(
+                    path_cost(self.graph, route.nodes), route.cost, places=6
+                )
+
+    def test_a_star(self):
+        self.assert_reference_costs()
+
+    def test_bidirectional(self):
+        self.assert_reference_costs(bidirectional=True)
+
+    def test_alt(self):
+        self.graph.build_landmarks(4)
+        self.assert_reference_costs(heuristic="alt")
+
+    def test_chains(self):
+        self.graph = grid_graph(10, seed=5, drop=0.4)
+        self.graph.contract_chains()
+        self.routes = Routes(graph=self.graph, cache=RouteCache(max_entries=0))
+        self.assert_reference_costs()
+        self.assert_reference_costs(bidirectional=True)
+
+    def test_zones(self):
+        self.routes.avoid_circle(*self.graph.coords.mean(axis=0), 150)
+        self.assert_reference_costs(self.routes.zones.edges)
+        self.assert_reference_costs(self.routes.zones.edges, bidirectional=True)
+
+    def test_update(self):
+        self.routes.update(
+            {
+                (int(self.graph.ids[u]), int(self.graph.ids[v])): 3.0
+                for u, v in zip(
+                    self.graph.edges.sources()[::4].tolist(),
+                    self.graph.edges.indices[::4].tolist(),
+                )
+            }
+        )
+        self.assert_reference_costs()
+
+    def test_customize(self):
+        weights = self.graph.edges.weights.copy()
+        sources, targets = self.graph.edges.sources(), self.graph.edges.indices
+        ids = self.graph.ids.tolist()
+        blocked, penalized = [44, 45, 54], [33, 66]
+        self.graph.build_landmarks(4)
+        self.routes.customize(
+            blocked=[ids[i] for i in blocked],
+            penalties={ids[i]: 2.5 for i in penalized},
+        )
+        removed = np.isin(sources, blocked) | np.isin(targets, blocked)
+        expected = np.where(np.isin(targets, penalized), 2.5 * weights, weights)
+        np.testing.assert_array_equal(
+            self.graph.edges.weights, np.where(removed, np.inf, expected)
+        )
+        self.assert_reference_costs(removed)
+        self.assert_reference_costs(removed, bidirectional=True)
+        self.assert_reference_costs(removed, heuristic="alt")
+        self.test_matrix()
+
+        # live updates never lift the customization
+        self.routes.update(unblocked=[ids[i] for i in blocked])
+        self.assertTrue(np.isinf(self.graph.edges.weights[removed]).all())
+        self.routes.customize()
+        np.testing.assert_array_equal(self.graph.edges.weights, weights)
+
+    def test_path_nodes(self):
+        histogram = metrics.REGISTRY.histogram(
+            "routing_path_nodes", "", metrics.COUNT_BUCKETS
+        )
+        count, total = sum(histogram.counts), histogram.sum
+        lengths = []
+        for source, destination in self.pairs:
+            route = self.route(source, destination)
+            self.assertEqual(route.misc["path_nodes"], len(route.nodes))
+            lengths.append(len(route.nodes))
+        self.assertEqual(sum(histogram.counts), count + len(self.pairs))
+        self.assertEqual(histogram.sum, total + sum(lengths))
+
+    def test_matrix(self):
+        sources, destinations = [0, 23, 47], [5, 60, 99]
+        coords = self.graph.coords
+        matrix = self.routes.get_matrix(
+            coords[sources].tolist(), coords[destinations].tolist()
+        )
+        for row, source in zip(matrix["costs"], sources):
+            expected = reference_costs(self.graph, source)
+            np.testing.assert_allclose(
+                row, [expected.get(d, math.inf) for d in destinations]
+            )
+
+    def test_reachable(self):
+        reachable = self.routes.get_reachable(tuple(self.graph.coords[0]), 500)
+        expected = {
+            int(self.graph.ids[i]): cost
+            for i, cost in reference_costs(self.graph, 0).items()
+            if cost <= 500
+        }
+        self.assertEqual(set(reachable["nodes"]), set(expected))
+        for node, cost in zip(reachable["nodes"], reachable["costs"]):
+            self.assertAlmostEqual(cost, expected[node], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+from saferouting import Routes
+from saferouting.graph import Graph, edge
+
+from .graphs import grid_graph, query_pairs, reference_costs
+
+import copyreg
+import math
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from xml.etree import ElementTree
+
+import numpy as np
+
+
+class _Pickled:
+    """Pickles as an instance of cls with the given state, the way classes of older versions pickled."""
+
+    def __init__(self, cls, state):
+        self.cls, self.state = cls, state
+
+    def __reduce__(self):
+        return (copyreg._reconstructor, (self.cls, object, None), self.state)
+
+
+class _Edges:
+    pass
+
+
+def _parse(elem: ElementTree.Element):
+    """Returns the xmltodict representation older versions kept of an element without its namespace, see serialize._element."""
+    value = {"@" + key: child for key, child in elem.attrib.items()}
+    for child in elem:
+        tag, parsed = child.tag.split("}")[-1], _parse(child)
+        if tag not in value:
+            value[tag] = parsed
+        elif isinstance(value[tag], list):
+            value[tag].append(parsed)
+        else:
+            value[tag] = [value[tag], parsed]
+    text = elem.text.strip() if elem.text else ""
+    if not value:
+        return text or None
+    if text:
+        value["#text"] = text
+    return value
+
+
+_Edges.__module__, _Edges.__qualname__ = "saferouting.graph.edge", "Edges"
+
+
+class SerializeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.graph = grid_graph(8, seed=4, directory=self.directory)
+        self.pairs = query_pairs(self.graph, 20, seed=4)
+
+    def cost(self, routes: Routes, source: int, destination: int, **kwargs) -> float:
+        coords = self.graph.coords
+        return routes.get_path(
+            tuple(coords[source]), tuple(coords[destination]), **kwargs
+        ).cost
+
+    def assert_round_trip(self, arrays: bool):
+        self.graph.build_landmarks(4)
+        self.graph.contract_chains()
+        routes = Routes(graph=self.graph, bounds=((-180, 90), (180, -90)))
+        routes.build_hierarchy()
+        routes.avoid_circle(*self.graph.coords.mean(axis=0), 120)
+        ids = self.graph.ids
+        routes.update({(int(ids[0]), int(ids[1])): 2.0}, blocked=[int(ids[-1])])
+        expected = {
+            kwargs: [self.cost(routes, *pair, **dict(kwargs)) for pair in self.pairs]
+            for kwargs in [(), (("bidirectional", True),), (("heuristic", "alt"),)]
+        }
+
+        filepath = os.path.join(self.directory, "routes")
+        routes.save(filepath, arrays=arrays)
+        loaded = Routes(serialized_filepath=filepath)
+        self.assertEqual(os.path.isdir(filepath), arrays)
+        self.assertEqual(loaded.bounds, routes.bounds)
+        self.assertEqual(len(loaded.zones), 1)
+        self.assertEqual(
+            loaded._customized_version, (loaded.zones.version, loaded.graph.version)
+        )
+        self.assertEqual(loaded.graph.version, self.graph.version)
+        np.testing.assert_array_equal(
+            loaded.graph.edges.weights, self.graph.edges.weights
+        )
+        for kwargs, costs in expected.items():
+            self.assertEqual(
+                [self.cost(loaded, *pair, **dict(kwargs)) for pair in self.pairs], costs
+            )
+
+    def test_pickle_round_trip(self):
+        self.assert_round_trip(arrays=False)
+
+    def test_array_round_trip(self):
+        self.assert_round_trip(arrays=True)
+
+    def test_legacy_pickle(self):
+        # pickles written before graphs were compiled into CSR arrays hold the parsed GraphML document and Edges objects
+        root = ElementTree.parse(os.path.join(self.directory, "graph.graphml"))
+        namespace, tag = root.getroot().tag[1:].split("}")
+        document = {tag: {"@xmlns": namespace} | _parse(root.getroot())}
+        graph = _Pickled(Graph, {"d": document, "edges": _Pickled(_Edges, {})})
+        state = {"graph": graph, "bounds": None, "points": [], "level_handler": None}
+        filepath = os.path.join(self.directory, "legacy.pkl")
+        with open(filepath, "wb") as out, mock.patch.object(
+            edge, "Edges", _Edges, create=True
+        ):
+            pickle.dump(_Pickled(Routes, (state, state)), out)
+
+        routes = Routes(serialized_filepath=filepath)
+        self.assertEqual(len(routes.graph), len(self.graph))
+        for source, destination in self.pairs:
+            expected = reference_costs(self.graph, source).get(destination, math.inf)
+            self.assertAlmostEqual(
+                self.cost(routes, source, destination), expected, places=6
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+from saferouting import Routes
+from saferouting.cache import RouteCache
+from saferouting.warmup import warmup
+
+from .graphs import grid_graph
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+
+class WarmupTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.graph = grid_graph(6, seed=7)
+        self.filepath = os.path.join(self.directory, "routes")
+        Routes(graph=self.graph, cache=RouteCache(max_entries=3)).save(
+            self.filepath, arrays=True
+        )
+
+    def warmup(self, pairs: list[tuple[int, int]], **kwargs) -> tuple[dict, str]:
+        """Runs warmup on a log querying every pair of node indices in turn, returns its stats and output."""
+        log = os.path.join(self.directory, "queries.log")
+        coords = self.graph.coords.tolist()
+        with open(log, "w") as out:
+            for s, d in pairs:
+                out.write("%r,%r,%r,%r\n" % (*coords[s], *coords[d]))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            stats = warmup(
+                self.filepath, log, os.path.join(self.directory, "cache.npz"), **kwargs
+            )
+        return stats, output.getvalue()
+
+    def test_no_warning_without_dropped_pairs(self):
+        stats, output = self.warmup([(0, 35), (0, 35), (3, 30)])
+        self.assertNotIn("Warning", output)
+        self.assertEqual(stats["cached"], 2)
+        self.assertEqual(stats["coverage"], 1.0)
+
+    def test_warning_when_pairs_are_dropped(self):
+        stats, output = self.warmup([(0, 35), (3, 30), (5, 12), (7, 20), (9, 33)])
+        self.assertIn("Only precomputing 3 of 5 pairs", output)
+        self.assertEqual(stats["cached"], 3)
+
+    def test_top_below_cache_size(self):
+        stats, output = self.warmup([(0, 35), (3, 30), (5, 12)], top=2)
+        self.assertNotIn("Warning", output)
+        self.assertEqual(stats["cached"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
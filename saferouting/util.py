@@ -1,31 +1,109 @@
 import heapq
+import threading
+
+from contextlib import contextmanager
 
 
 class FHeap:
+    """Min-heap of node ids keyed by f value.
+
+    Decreasing the key of a queued id pushes a new entry instead of searching the heap for the old one. Outdated entries stay in the heap and are skipped when they surface, so insert and pop are both O(log n).
+
+    :attr1 pushes: Number of entries pushed so far.
+    """
+
     def __init__(self):
         self.f_values = {}
         self.heap = []
+        self.pushes = 0
 
     def __len__(self):
-        return len(self.heap)
+        return len(self.f_values)
 
     def insert(self, id, val):
-        if id in self.f_values:
-            if self.f_values[id] > val:
-                for i in range(len(self.heap)):
-                    if self.heap[i][1] == id:
-                        self.heap.pop(i)
-                        break
-                self.f_values[id] = val
-                heapq.heappush(self.heap, (val, id))
-        else:
-            self.f_values[id] = val
-            heapq.heappush(self.heap, (val, id))
+        """Queues id with key val, or lowers its key if id is already queued with a larger one."""
+        if id in self.f_values and self.f_values[id] <= val:
+            return
+        self.f_values[id] = val
+        heapq.heappush(self.heap, (val, id))
+        self.pushes += 1
 
     def pop(self):
-        _, id = heapq.heappop(self.heap)
-        self.f_values.pop(id)
-        return id
+        """Removes and returns the queued id with the smallest key."""
+        while True:
+            val, id = heapq.heappop(self.heap)
+            if self.f_values.get(id) == val:
+                del self.f_values[id]
+                return id
+
+    def peek(self) -> float:
+        """Returns the smallest queued key without removing it, or inf if the heap is empty."""
+        while self.heap:
+            val, id = self.heap[0]
+            if self.f_values.get(id) == val:
+                return val
+            heapq.heappop(self.heap)
+        return float("inf")
+
+    def front(self, k: int) -> list:
+        """Returns up to k queued ids with the smallest keys in key order, without removing them."""
+        ids = []
+        candidates = [(self.heap[0], 0)] if self.heap else []
+        while candidates and len(ids) < k:
+            (val, id), i = heapq.heappop(candidates)
+            if self.f_values.get(id) == val:
+                ids.append(id)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    heapq.heappush(candidates, (self.heap[child], child))
+        return ids
+
+
+class ReadWriteLock:
+    """Lock held by any number of readers at once or by a single writer.
+
+    Writers waiting for the lock keep new readers out, so a steady stream of readers can't starve them. Readers must not take the lock again while holding it. Only a fresh lock is kept on serialization.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting = 0
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    @contextmanager
+    def read(self):
+        """Holds the lock shared for the duration of a with block."""
+        with self._condition:
+            while self._writing or self._waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
 
-    def heapify(self):
-        heapq.heapify(self.heap)
+    @contextmanager
+    def write(self):
+        """Holds the lock exclusively for the duration of a with block."""
+        with self._condition:
+            self._waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
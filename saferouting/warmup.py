@@ -0,0 +1,159 @@
+from .routes import Routes
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+# access log lines carry queries as parameters, e.g. GET /api/routing/route/?x0=...&y0=...&x1=...&y1=...
+_PARAMETER = re.compile(r"[?&](x0|y0|x1|y1)=([^&\s\"']+)")
+_SEPARATOR = re.compile(r"[,;\s]+")
+
+
+def read_queries(filepath: str) -> tuple[np.ndarray, int]:
+    """Reads route queries from a log file. A line holds a query if it has x0, y0, x1 and y1 query parameters (access logs), or if its last four comma or whitespace separated fields are numbers (CSV exports, optionally with a timestamp or other fields first). Other lines are skipped.
+
+    :ret: tuple of (array of shape (n, 4) holding x0, y0, x1, y1 of every query, number of lines skipped)
+    """
+    queries = []
+    skipped = 0
+    with open(filepath) as f:
+        for line in f:
+            parameters = dict(_PARAMETER.findall(line))
+            try:
+                if parameters:
+                    queries.append(
+                        [float(parameters[_]) for _ in ("x0", "y0", "x1", "y1")]
+                    )
+                else:
+                    fields = _SEPARATOR.split(line.strip())
+                    if len(fields) < 4:
+                        raise ValueError()
+                    queries.append([float(_) for _ in fields[-4:]])
+            except (KeyError, ValueError):
+                skipped += 1
+    return np.asarray(queries, dtype=np.float64).reshape(-1, 4), skipped
+
+
+def hot_pairs(routes: Routes, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Snaps queries to nodes like Routes.get_path, in one vectorized lookup per side, and counts how often every (source index, destination index) pair occurs. Out of bounds queries are left out, since they are never cached.
+
+    :ret: tuple of (array of shape (m, 2) holding distinct pairs, most frequent first, array of their counts)
+    """
+    graph = routes.graph
+    in_bounds = np.fromiter(
+        (
+            routes.check_bounds(x0, y0) and routes.check_bounds(x1, y1)
+            for x0, y0, x1, y1 in queries.tolist()
+        ),
+        dtype=bool,
+        count=len(queries),
+    )
+    queries = queries[in_bounds]
+    sources = graph.closest_indices(queries[:, 0], queries[:, 1], routes.component)
+    destinations = graph.closest_indices(queries[:, 2], queries[:, 3], routes.component)
+
+    keys, counts = np.unique(
+        sources.astype(np.int64) * len(graph) + destinations, return_counts=True
+    )
+    order = np.argsort(-counts, kind="stable")
+    keys, counts = keys[order], counts[order]
+    return np.stack(np.divmod(keys, len(graph)), axis=1), counts
+
+
+def warmup(
+    serialized_filepath: str,
+    log_filepath: str,
+    output: str,
+    top: int = 10000,
+    processes: int = None,
+) -> dict:
+    """Precomputes the most frequent routes of a query log and writes them to a cache file, which Routes.load_cache reads at startup.
+
+    :param1 serialized_filepath: Routes object to compute routes with, as written by Routes.save. The server must load the same one.
+    :param2 log_filepath: Query log, see read_queries.
+    :param3 output: .npz file to write, see Routes.save_cache.
+    :param4 top: Largest number of pairs to precompute, capped at the cache size (default 10000).
+    :param5 processes: If given, splits the searches across this many worker processes (optional).
+
+    :ret: dict with the number of "queries" read, "skipped" lines, "out_of_bounds" queries, "pairs" (distinct pairs), "cached" (pairs written), "unreachable" (pairs without a route), "seconds" spent searching, and "coverage", the share of logged queries that would have been answered from the cache
+    """
+    routes = Routes(serialized_filepath=serialized_filepath)
+    queries, skipped = read_queries(log_filepath)
+    pairs, counts = hot_pairs(routes, queries)
+    in_bounds, distinct = int(counts.sum()), len(counts)
+
+    # only warn if pairs of the log are actually dropped
+    if min(top, distinct) > routes.cache.max_entries:
+        print(
+            "Warning: Only precomputing {0} of {1} pairs, the size of the route cache".format(
+                routes.cache.max_entries, min(top, distinct)
+            )
+        )
+    top = min(top, routes.cache.max_entries)
+    pairs, counts = pairs[:top], counts[:top]
+
+    s = time.perf_counter()
+    found = routes.warm_cache(pairs, processes)
+    seconds = time.perf_counter() - s
+    routes.save_cache(output)
+
+    # routes with an error are not saved, and max_bytes may have evicted some
+    cached = np.fromiter(
+        (
+            "error" not in route.misc and tuple(pair) in routes.cache
+            for pair, route in zip(pairs.tolist(), found)
+        ),
+        dtype=bool,
+        count=len(found),
+    )
+    return {
+        "queries": len(queries),
+        "skipped": skipped,
+        "out_of_bounds": len(queries) - in_bounds,
+        "pairs": distinct,
+        "cached": int(cached.sum()),
+        "unreachable": sum("error" in route.misc for route in found),
+        "seconds": seconds,
+        "coverage": float(counts[cached].sum() / max(len(queries), 1)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Precomputes the most frequent routes of a query log into a cache file loaded at server startup."
+    )
+    parser.add_argument("routes", help="routes object written by Routes.save")
+    parser.add_argument(
+        "log",
+        help="query log, one query per line as x0=...&y0=...&x1=...&y1=... parameters or x0,y0,x1,y1 fields",
+    )
+    parser.add_argument("output", help=".npz cache file to write")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10000,
+        help="number of most frequent pairs to precompute",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None, help="number of worker processes"
+    )
+    args = parser.parse_args()
+    report = warmup(args.routes, args.log, args.output, args.top, args.processes)
+
+    print(
+        "{queries} queries read, {skipped} lines skipped, {out_of_bounds} queries out of bounds".format(
+            **report
+        )
+    )
+    print(
+        "{cached} of {pairs} distinct pairs cached in {seconds:.1f} s, {unreachable} without a route".format(
+            **report
+        )
+    )
+    print(
+        "Coverage: {0:.1%} of logged queries would be cache hits".format(
+            report["coverage"]
+        )
+    )
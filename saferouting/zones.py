@@ -0,0 +1,120 @@
+from .graph import Graph
+from .graph.spatial import EARTH_RADIUS
+
+import math
+import numpy as np
+
+
+def distances(coords: np.ndarray, x: float, y: float) -> np.ndarray:
+    """Returns great-circle distance in meters from every (x, y) coordinate to (x, y)."""
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    lon0, lat0 = math.radians(x), math.radians(y)
+    a = (
+        np.sin((lat - lat0) / 2) ** 2
+        + np.cos(lat) * math.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def inside(coords: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Returns boolean mask of coordinates inside polygon (even-odd rule)."""
+    x, y = coords[:, 0], coords[:, 1]
+    mask = np.zeros(len(coords), dtype=bool)
+    for (xi, yi), (xj, yj) in zip(polygon, np.roll(polygon, 1, axis=0)):
+        crosses = (yi > y) != (yj > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mask ^= crosses & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return mask
+
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """Returns corners of the convex hull of (x, y) points in counterclockwise order (monotone chain)."""
+    points = np.unique(np.asarray(points, dtype=np.float64).reshape(-1, 2), axis=0)
+    if len(points) < 3:
+        return points
+
+    def chain(points):
+        hull = []
+        for p in points.tolist():
+            while len(hull) >= 2 and (
+                (hull[-1][0] - hull[-2][0]) * (p[1] - hull[-2][1])
+                - (hull[-1][1] - hull[-2][1]) * (p[0] - hull[-2][0])
+                <= 0
+            ):
+                hull.pop()
+            hull.append(p)
+        return hull[:-1]
+
+    return np.asarray(chain(points) + chain(points[::-1]))
+
+
+class Zones:
+    """Avoidance zones compiled into node and edge masks over a graph.
+
+    Each zone is resolved to the nodes it covers through the graph's spatial index when it is added. Nodes keep a count of the zones covering them, so adding or removing a zone only touches its own nodes and the edges into them.
+
+    :attr1 nodes: Boolean mask over nodes, True for nodes inside any zone.
+
+    :attr2 edges: Boolean mask aligned with graph.edges, True for edges entering a zone.
+
+    :attr3 version: Incremented on every change to the zone set.
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.counts = np.zeros(len(graph), dtype=np.int32)
+        self.nodes = np.zeros(len(graph), dtype=bool)
+        self.edges = np.zeros(len(graph.edges), dtype=bool)
+        self.zones: dict[int, np.ndarray] = {}
+        self.version = 0
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.zones)
+
+    def add_circle(self, x: float, y: float, radius: float) -> int:
+        """Adds zone covering all nodes within radius meters of (x, y). Returns zone id."""
+        dy = math.degrees(radius / EARTH_RADIUS)
+        dx = dy / max(math.cos(math.radians(min(abs(y) + dy, 90))), 1e-12)
+        candidates = self.graph.spatial.box(x - dx, y - dy, x + dx, y + dy)
+        return self._add(
+            candidates[distances(self.graph.coords[candidates], x, y) <= radius]
+        )
+
+    def add_polygon(self, points: list[tuple[float, float]]) -> int:
+        """Adds zone covering all nodes inside polygon given by its corners in cartesian format (x, y). Returns zone id."""
+        polygon = np.asarray(points, dtype=np.float64)
+        candidates = self.graph.spatial.box(*polygon.min(axis=0), *polygon.max(axis=0))
+        return self._add(candidates[inside(self.graph.coords[candidates], polygon)])
+
+    def remove(self, zone_id: int):
+        """Removes zone given its id."""
+        self._update(self.zones.pop(zone_id), -1)
+
+    def clear(self):
+        """Removes all zones."""
+        self.counts[:] = 0
+        self.nodes[:] = False
+        self.edges[:] = False
+        self.zones = {}
+        self.version += 1
+
+    def _add(self, nodes: np.ndarray) -> int:
+        zone_id = self._next_id
+        self._next_id += 1
+        self.zones[zone_id] = nodes
+        self._update(nodes, 1)
+        return zone_id
+
+    def _update(self, nodes: np.ndarray, delta: int):
+        self.counts[nodes] += delta
+        covered = self.counts[nodes] > 0
+        changed = nodes[covered != self.nodes[nodes]]
+        self.nodes[changed] = ~self.nodes[changed]
+
+        # only edges into nodes that flipped can change
+        reverse = self.graph.reverse_edges
+        edge_ids = reverse.edge_ids[reverse.positions(changed)]
+        self.edges[edge_ids] = self.nodes[self.graph.edges.indices[edge_ids]]
+
+        self.version += 1